@@ -1,5 +1,4 @@
-from .schema import generate_schema,  write_schema_files
+from .schema import generate_schema,  write_schema_files, merge_schema_files, write_schema_set_files
 from .protocol import generate_protocol, write_protocol_files
-__all__ = ['generate_schema', 'generate_protocol', 'write_schema_files', 'write_protocol_files']
-
-
+__all__ = ['generate_schema', 'generate_protocol', 'write_schema_files', 'write_protocol_files',
+           'merge_schema_files', 'write_schema_set_files']
@@ -1,22 +1,33 @@
 """Usage:
-  python -m avrogen /path/to/protocol.avdl [-o /path/to/output]
+  python -m avrogen /path/to/protocol.avpr [-o /path/to/output]
+  python -m avrogen /path/to/schemas/ [/path/to/other.avsc ...] [-o /path/to/output]
 """
 
 from .protocol import write_protocol_files
+from .schema import write_schema_set_files
 from os.path import join
 from sys import argv
 
+# JSON protocols; .avdl is accepted for compatibility with earlier usage
+PROTOCOL_EXTENSIONS = ('.avpr', '.avdl')
+
 def main():
 
-	if "-o" in argv:
-		avdl, _, output = argv[1:]
+	paths = argv[1:]
+	output = './'
+	if "-o" in paths:
+		i = paths.index("-o")
+		output = paths[i + 1]
+		del paths[i:i + 2]
+	if len(paths) == 1 and paths[0].endswith(PROTOCOL_EXTENSIONS):
+		write_protocol_files(open(paths[0], 'r').read(), output)
 	else:
-		avdl, output = argv[1], './'
-	write_protocol_files(open(avdl, 'r').read(), output)
+		# Schema files and directories are compiled into one package with shared named types
+		write_schema_set_files(paths, output)
 
 if __name__ == '__main__':
 	try:
 		exit(main())
 	except Exception:
 		print(__doc__)
-		raise
\ No newline at end of file
+		raise
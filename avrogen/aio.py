@@ -0,0 +1,186 @@
+import asyncio
+import functools
+
+from avro import datafile, io, schema
+
+from . import container
+from .logical import LogicalDatumReader
+
+
+async def _read_long(stream):
+    """
+    Reads a zig-zag encoded varint from an asyncio stream
+    :param asyncio.StreamReader stream:
+    :return int:
+    """
+    b = (await stream.readexactly(1))[0]
+    n = b & 0x7F
+    shift = 7
+    while b & 0x80:
+        b = (await stream.readexactly(1))[0]
+        n |= (b & 0x7F) << shift
+        shift += 7
+    return (n >> 1) ^ -(n & 1)
+
+
+async def _read_bytes(stream):
+    return await stream.readexactly(await _read_long(stream))
+
+
+class AsyncSpecificReader(object):
+    """
+    Reads avro container data from an asyncio.StreamReader one block at a time.
+
+    Usage:
+        async for record in AsyncSpecificReader(stream, SpecificDatumReader()):
+            ...
+
+    :param asyncio.StreamReader stream: Stream positioned at the container header
+    :param io.DatumReader datum_reader: Reader used to decode records, e.g. generated SpecificDatumReader to get
+                                        instances of the generated classes; LogicalDatumReader, which decodes
+                                        records into dicts, if not given
+    :param concurrent.futures.Executor executor: Executor used when offload is set; None for the loop default
+    :param bool offload: Decompress and decode blocks in the executor instead of on the event loop
+    """
+
+    def __init__(self, stream, datum_reader=None, executor=None, offload=False):
+        self.stream = stream
+        self.datum_reader = datum_reader if datum_reader is not None else LogicalDatumReader()
+        self.executor = executor
+        self.offload = offload
+        self.meta = None
+        self.codec = None
+        self.sync_marker = None
+        self._pending = []
+        self._pos = 0
+
+    async def read_header(self):
+        magic = await self.stream.readexactly(container.MAGIC_SIZE)
+        if magic != container.MAGIC:
+            raise schema.AvroException("Not an Avro data file: %s doesn't match %s." % (magic, container.MAGIC))
+
+        meta = {}
+        count = await _read_long(self.stream)
+        while count != 0:
+            if count < 0:
+                count = -count
+                await _read_long(self.stream)
+            for _ in range(count):
+                key = (await _read_bytes(self.stream)).decode('utf-8')
+                meta[key] = await _read_bytes(self.stream)
+            count = await _read_long(self.stream)
+
+        self.meta = meta
+        self.sync_marker = await self.stream.readexactly(container.SYNC_SIZE)
+        self.codec = meta.get('avro.codec', b'null').decode('utf-8')
+        if self.codec not in container.VALID_CODECS:
+            raise datafile.DataFileException('Unknown codec: %s.' % self.codec)
+        self.datum_reader.writer_schema = schema.parse(meta['avro.schema'].decode('utf-8'))
+
+    async def read_block(self):
+        """
+        Reads and decodes the next block
+        :return: list of records, or None at the end of stream
+        """
+        if self.meta is None:
+            await self.read_header()
+        try:
+            count = await _read_long(self.stream)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return None
+        data = await _read_bytes(self.stream)
+        if await self.stream.readexactly(container.SYNC_SIZE) != self.sync_marker:
+            raise datafile.DataFileException('Sync marker mismatch')
+
+        decode = functools.partial(container.decode_block, self.datum_reader, count, data, self.codec)
+        if self.offload:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, decode)
+        return decode()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while self._pos >= len(self._pending):
+            block = await self.read_block()
+            if block is None:
+                raise StopAsyncIteration
+            self._pending, self._pos = block, 0
+        record = self._pending[self._pos]
+        self._pos += 1
+        return record
+
+
+class AsyncSpecificWriter(object):
+    """
+    Writes avro container data to an asyncio.StreamWriter. Records are buffered and encoded
+    into a block once block_size records are collected. Leaving the context with an exception
+    closes the stream without writing the buffered records.
+
+    Usage:
+        async with AsyncSpecificWriter(stream, SCHEMA) as writer:
+            await writer.append(record)
+
+    :param asyncio.StreamWriter stream: Output stream
+    :param schema.Schema writers_schema: Schema to write records with
+    :param io.DatumWriter datum_writer: Writer used to encode records, e.g. logical.LogicalDatumWriter
+    :param str codec: One of null, deflate, bzip2, xz
+    :param int block_size: Number of records per block
+    :param concurrent.futures.Executor executor: Executor used when offload is set; None for the loop default
+    :param bool offload: Encode and compress blocks in the executor instead of on the event loop
+    """
+
+    def __init__(self, stream, writers_schema, datum_writer=None, codec=container.NULL_CODEC, block_size=1000,
+                 executor=None, offload=False):
+        if codec not in container.VALID_CODECS:
+            raise datafile.DataFileException('Unknown codec: %r' % codec)
+        self.stream = stream
+        self.writers_schema = writers_schema
+        self.datum_writer = datum_writer if datum_writer is not None else io.DatumWriter()
+        self.datum_writer.writer_schema = writers_schema
+        self.codec = codec
+        self.block_size = block_size
+        self.executor = executor
+        self.offload = offload
+        self.sync_marker = container.make_sync_marker()
+        self._header_written = False
+        self._records = []
+
+    async def append(self, record):
+        self._records.append(record)
+        if len(self._records) >= self.block_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._header_written:
+            self.stream.write(container.encode_header(self.writers_schema, self.codec, self.sync_marker))
+            self._header_written = True
+        if self._records:
+            records, self._records = self._records, []
+            encode = functools.partial(container.encode_block, self.datum_writer, records, self.codec,
+                                       self.sync_marker)
+            if self.offload:
+                block = await asyncio.get_running_loop().run_in_executor(self.executor, encode)
+            else:
+                block = encode()
+            self.stream.write(block)
+        await self.stream.drain()
+
+    async def close(self):
+        await self.flush()
+        self.stream.close()
+        await self.stream.wait_closed()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.close()
+            return
+        # Records appended before the error are dropped rather than written as a partial block
+        self._records = []
+        self.stream.close()
+        await self.stream.wait_closed()
@@ -2,55 +2,62 @@ import collections
 import six
 
 from . import logical
+from . import numeric_arrays
+from . import resolution
+from . import validation
 from avro import schema
 from avro import io
 
 if six.PY3:
-    io_validate = io.Validate
+    import collections.abc as collections_abc
 else:
-    io_validate = io.validate
+    collections_abc = collections
 
 _PRIMITIVE_TYPES = set(schema.PRIMITIVE_TYPES)
 
 
 class AvroJsonConverter(object):
-    def __init__(self, use_logical_types=False, logical_types=logical.DEFAULT_LOGICAL_TYPES, schema_types=None):
+    def __init__(self, use_logical_types=False, logical_types=logical.DEFAULT_LOGICAL_TYPES, schema_types=None,
+                 validation_policy=None, plans=None, instrumentation=None, compact_arrays=None):
+        """
+        :param bool use_logical_types: Convert logical types
+        :param dict[str, logical.LogicalTypeProcessor] logical_types: Logical types dict
+        :param dict[str, type] schema_types: Generated classes by schema name
+        :param validation.ValidationPolicy|str validation_policy: Validation of records passed to
+                                                                  to_json_object: full (default), sampled or off
+        :param resolution.PlanCache plans: Cache of schema resolution plans, shared process-wide by default
+        :param instrumentation.Instrumentation instrumentation: Optional per-schema counters
+        :param str compact_arrays: Read arrays of numbers into compact arrays: "array", "numpy" or None for lists,
+                                   overridden per array by the compact schema property
+        """
         self.use_logical_types = use_logical_types
         self.logical_types = logical_types or {}
         self.schema_types = schema_types or {}
         self.fastavro = False
-        
+        self.validation_policy = validation.make_policy(validation_policy)
+        self.plans = plans if plans is not None else resolution.DEFAULT_PLAN_CACHE
+        self.instrumentation = instrumentation
+        self.compact_arrays = compact_arrays
+        self._logical_validators = validation.get_validators(self.logical_types)
+        self._plain_validators = validation.get_validators()
+
         # Register self with all the schema objects.
         for klass in self.schema_types.values():
             klass._json_converter = self
     
     def with_tuple_union(self, enable=True) -> 'AvroJsonConverter':
-        ret = AvroJsonConverter(self.use_logical_types, self.logical_types, self.schema_types)
+        ret = AvroJsonConverter(self.use_logical_types, self.logical_types, self.schema_types,
+                                self.validation_policy, self.plans, self.instrumentation, self.compact_arrays)
         ret.fastavro = enable
         return ret
 
+    def _validator(self, expected_schema, skip_logical_types=False):
+        if self.use_logical_types and not skip_logical_types:
+            return self._logical_validators.get(expected_schema)
+        return self._plain_validators.get(expected_schema)
+
     def validate(self, expected_schema, datum, skip_logical_types=False):
-        if self.use_logical_types and expected_schema.props.get('logicalType') and not skip_logical_types \
-                and expected_schema.props.get('logicalType') in self.logical_types:
-            return self.logical_types[expected_schema.props.get('logicalType')].can_convert(expected_schema) \
-                   and self.logical_types[expected_schema.props.get('logicalType')].validate(expected_schema, datum)
-        schema_type = expected_schema.type
-        if schema_type == 'array':
-            return (isinstance(datum, list) and
-                    False not in [self.validate(expected_schema.items, d, skip_logical_types) for d in datum])
-        elif schema_type == 'map':
-            return (isinstance(datum, dict) and
-                    False not in [isinstance(k, six.string_types) for k in datum.keys()] and
-                    False not in
-                    [self.validate(expected_schema.values, v, skip_logical_types) for v in datum.values()])
-        elif schema_type in ['union', 'error_union']:
-            return True in [self.validate(s, datum, skip_logical_types) for s in expected_schema.schemas]
-        elif schema_type in ['record', 'error', 'request']:
-            return (isinstance(datum, dict) and
-                    False not in
-                    [self.validate(f.type, datum.get(f.name), skip_logical_types) for f in expected_schema.fields])
-
-        return io_validate(expected_schema, datum)
+        return self._validator(expected_schema, skip_logical_types)(datum)
 
     def from_json_object(self, json_obj, writers_schema=None, readers_schema=None):
         if readers_schema is None:
@@ -61,9 +68,14 @@ class AvroJsonConverter(object):
         if writers_schema is None:
             raise Exception('At least one schema must be specified')
 
-        if not io.DatumReader.match_schemas(writers_schema, readers_schema):
+        if not self.plans.get(writers_schema, readers_schema).matches:
             raise io.SchemaResolutionException('Could not match schemas', writers_schema, readers_schema)
 
+        if self.instrumentation is not None:
+            started = self.instrumentation.clock()
+            result = self._generic_from_json(json_obj, writers_schema, readers_schema)
+            self.instrumentation.record_call(readers_schema, started)
+            return result
         return self._generic_from_json(json_obj, writers_schema, readers_schema)
 
     def to_json_object(self, data_obj, writers_schema=None):
@@ -74,9 +86,14 @@ class AvroJsonConverter(object):
             raise Exception("Could not determine writer's schema from the object type and schema was not passed")
         assert isinstance(writers_schema, schema.Schema)
 
-        if not self.validate(writers_schema, data_obj):
+        if not self.validation_policy.check(self._validator(writers_schema), writers_schema, data_obj):
             raise io.AvroTypeException(writers_schema, data_obj)
 
+        if self.instrumentation is not None:
+            started = self.instrumentation.clock()
+            result = self._generic_to_json(data_obj, writers_schema)
+            self.instrumentation.record_call(writers_schema, started)
+            return result
         return self._generic_to_json(data_obj, writers_schema)
 
     def _fullname(self, schema_):
@@ -95,6 +112,8 @@ class AvroJsonConverter(object):
             if lt.can_convert(writers_schema):
                 if lt.validate(writers_schema, data_obj):
                     data_obj = lt.convert(writers_schema, data_obj)
+                    if self.instrumentation is not None:
+                        self.instrumentation.record_logical_conversion(writers_schema)
                 else:
                     raise schema.AvroException(
                         'Wrong object for %s logical type' % writers_schema.props.get('logicalType'))
@@ -127,13 +146,29 @@ class AvroJsonConverter(object):
     def _enum_to_json(self, data_obj, writers_schema):
         return data_obj
 
+    def _logical_type_handler(self, schema_):
+        if self.use_logical_types and schema_.type in _PRIMITIVE_TYPES:
+            logical_type = schema_.props.get('logicalType')
+            if logical_type:
+                return self.logical_types.get(logical_type)  # type: logical.LogicalTypeProcessor
+        return None
+
     def _array_to_json(self, data_obj, writers_schema):
+        if numeric_arrays.is_compact(data_obj):
+            return data_obj.tolist()
+        lt = self._logical_type_handler(writers_schema.items)
+        if lt and lt.can_convert(writers_schema.items):
+            if self.instrumentation is not None:
+                self.instrumentation.record_logical_conversion(writers_schema.items, len(data_obj))
+            return lt.convert_many(writers_schema.items, data_obj)
         return [self._generic_to_json(x, writers_schema.items) for x in data_obj]
 
     def _map_to_json(self, data_obj, writers_schema):
         return {name: self._generic_to_json(x, writers_schema.values) for name, x in six.iteritems(data_obj)}
 
     def _record_to_json(self, data_obj, writers_schema):
+        if self.instrumentation is not None:
+            self.instrumentation.record_datum(writers_schema)
         result = collections.OrderedDict()
 
         for field in writers_schema.fields:
@@ -154,6 +189,8 @@ class AvroJsonConverter(object):
                 break
 
             # Fallback to schema guessing based on validation.
+            if self.instrumentation is not None:
+                self.instrumentation.record_union_probe(writers_schema)
             if self.validate(candidate_schema, data_obj):
                 index_of_schema = i
                 if candidate_schema.type == 'boolean':
@@ -171,9 +208,9 @@ class AvroJsonConverter(object):
     def _generic_from_json(self, json_obj, writers_schema, readers_schema):
         if (writers_schema.type not in ['union', 'error_union']
             and readers_schema.type in ['union', 'error_union']):
-            for s in readers_schema.schemas:
-                if io.DatumReader.match_schemas(writers_schema, s):
-                    return self._generic_from_json(json_obj, writers_schema, s)
+            branch = self.plans.get(writers_schema, readers_schema).reader_branch
+            if branch is not None:
+                return self._generic_from_json(json_obj, writers_schema, branch)
             raise io.SchemaResolutionException('Schemas do not match', writers_schema, readers_schema)
 
         result = None
@@ -202,6 +239,8 @@ class AvroJsonConverter(object):
             lt = self.logical_types.get(readers_schema.props.get('logicalType'))  # type: logical.LogicalTypeProcessor
             if lt and lt.does_match(writers_schema, readers_schema):
                 result = lt.convert_back(writers_schema, readers_schema, result)
+                if self.instrumentation is not None:
+                    self.instrumentation.record_logical_conversion(readers_schema)
         return result
 
     def _primitive_from_json(self, json_obj, writers_schema, readers_schema):
@@ -214,6 +253,15 @@ class AvroJsonConverter(object):
         return json_obj
 
     def _array_from_json(self, json_obj, writers_schema, readers_schema):
+        lt = self._logical_type_handler(readers_schema.items)
+        if lt and writers_schema.items.type in _PRIMITIVE_TYPES \
+                and lt.does_match(writers_schema.items, readers_schema.items):
+            if self.instrumentation is not None:
+                self.instrumentation.record_logical_conversion(readers_schema.items, len(json_obj))
+            return lt.convert_back_many(writers_schema.items, readers_schema.items, json_obj)
+        mode = numeric_arrays.compact_mode(readers_schema, self.compact_arrays)
+        if mode is not None and writers_schema.items.type in numeric_arrays.TYPECODES:
+            return numeric_arrays.from_list(json_obj, readers_schema.items.type, mode)
         return [self._generic_from_json(x, writers_schema.items, readers_schema.items)
                 for x in json_obj]
 
@@ -226,7 +274,7 @@ class AvroJsonConverter(object):
             return None
         value_type = None
         value = None
-        if not self.fastavro and isinstance(json_obj, collections.Mapping):
+        if not self.fastavro and isinstance(json_obj, collections_abc.Mapping):
             items = list(six.iteritems(json_obj))
             if not items:
                 return None
@@ -238,12 +286,13 @@ class AvroJsonConverter(object):
                 value = json_obj[1]
 
         if value_type is not None:
-            for s in writers_schema.schemas:
-                name = self._fullname(s)
-                if name == value_type:
-                    return self._generic_from_json(value, s, readers_schema)
+            s = self.plans.get(writers_schema, readers_schema).writer_branches.get(value_type)
+            if s is not None:
+                return self._generic_from_json(value, s, readers_schema)
 
         for s in writers_schema.schemas:
+            if self.instrumentation is not None:
+                self.instrumentation.record_union_probe(writers_schema)
             if self.validate(s, json_obj, skip_logical_types=True):
                 return self._generic_from_json(json_obj, s, readers_schema)
         raise schema.AvroException('Datum union type not in schema: %s', value_type)
@@ -260,20 +309,16 @@ class AvroJsonConverter(object):
         return decoded_record
 
     def _record_from_json(self, json_obj, writers_schema, readers_schema):
-        writer_fields = writers_schema.fields_dict if six.PY2 else writers_schema.field_map
-
+        if self.instrumentation is not None:
+            self.instrumentation.record_datum(readers_schema)
         result = {}
-        for field in readers_schema.fields:
-            writers_field = writer_fields.get(field.name)
-            if writers_field is None:
-                field_value = self._generic_from_json(field.default, field.type, field.type) \
-                    if field.has_default else None
+        for name, writers_type, readers_type, has_default, default in \
+                self.plans.get(writers_schema, readers_schema).fields:
+            if writers_type is not None and name in json_obj:
+                field_value = self._generic_from_json(json_obj[name], writers_type, readers_type)
+            elif has_default:
+                field_value = self._generic_from_json(default, writers_type or readers_type, readers_type)
             else:
-                if field.name in json_obj:
-                    field_value = self._generic_from_json(json_obj[field.name], writers_field.type, field.type)
-                else:
-                    field_value = self._generic_from_json(writers_field.default,
-                                                          writers_field.type, field.type) \
-                        if writers_field.has_default else None
-            result[field.name] = field_value
+                field_value = None
+            result[name] = field_value
         return self._instantiate_record(result, writers_schema, readers_schema)
@@ -0,0 +1,125 @@
+import bz2
+import io as _io
+import lzma
+import os
+import zlib
+
+from avro import datafile, io
+
+MAGIC = datafile.MAGIC
+MAGIC_SIZE = datafile.MAGIC_SIZE
+SYNC_SIZE = datafile.SYNC_SIZE
+SYNC_INTERVAL = datafile.SYNC_INTERVAL
+META_SCHEMA = datafile.META_SCHEMA
+
+NULL_CODEC = 'null'
+DEFLATE_CODEC = 'deflate'
+BZIP2_CODEC = 'bzip2'
+XZ_CODEC = 'xz'
+
+VALID_CODECS = frozenset([NULL_CODEC, DEFLATE_CODEC, BZIP2_CODEC, XZ_CODEC])
+
+
+def compress_block(codec, data):
+    """
+    Compresses raw block data with one of the stdlib-backed container codecs
+    :param str codec: Codec name as stored under avro.codec
+    :param bytes data: Encoded block contents
+    :return bytes:
+    """
+    if codec == NULL_CODEC:
+        return data
+    elif codec == DEFLATE_CODEC:
+        # zlib header and checksum are not part of the avro deflate block
+        return zlib.compress(data)[2:-1]
+    elif codec == BZIP2_CODEC:
+        return bz2.compress(data)
+    elif codec == XZ_CODEC:
+        return lzma.compress(data)
+    raise datafile.DataFileException('Unknown codec: %r' % codec)
+
+
+def decompress_block(codec, data):
+    """
+    Reverses compress_block
+    :param str codec: Codec name as stored under avro.codec
+    :param bytes data: Compressed block contents
+    :return bytes:
+    """
+    if codec == NULL_CODEC:
+        return data
+    elif codec == DEFLATE_CODEC:
+        return zlib.decompress(data, -15)
+    elif codec == BZIP2_CODEC:
+        return bz2.decompress(data)
+    elif codec == XZ_CODEC:
+        return lzma.decompress(data)
+    raise datafile.DataFileException('Unknown codec: %r' % codec)
+
+
+def make_sync_marker():
+    return os.urandom(SYNC_SIZE)
+
+
+def encode_header(writers_schema, codec, sync_marker, meta=None):
+    """
+    Encodes container file header
+    :param schema.Schema writers_schema: Schema stored in the header
+    :param str codec: Block codec
+    :param bytes sync_marker: 16 byte sync marker
+    :param dict[str, bytes] meta: Additional metadata
+    :return bytes:
+    """
+    if codec not in VALID_CODECS:
+        raise datafile.DataFileException('Unknown codec: %r' % codec)
+    header_meta = dict(meta or {})
+    header_meta['avro.codec'] = codec.encode('utf-8')
+    header_meta['avro.schema'] = str(writers_schema).encode('utf-8')
+    out = _io.BytesIO()
+    io.DatumWriter().write_data(META_SCHEMA, {'magic': MAGIC, 'meta': header_meta, 'sync': sync_marker},
+                                io.BinaryEncoder(out))
+    return out.getvalue()
+
+
+def encode_long(value):
+    """
+    Encodes a long using avro zig-zag varint encoding
+    :param int value:
+    :return bytes:
+    """
+    out = _io.BytesIO()
+    io.BinaryEncoder(out).write_long(value)
+    return out.getvalue()
+
+
+def encode_block(datum_writer, records, codec, sync_marker):
+    """
+    Encodes and compresses a list of records into a complete container block, including the sync marker
+    :param io.DatumWriter datum_writer: Writer with writer's schema set
+    :param list records: Records to encode
+    :param str codec: Block codec
+    :param bytes sync_marker: 16 byte sync marker
+    :return bytes:
+    """
+    buf = _io.BytesIO()
+    encoder = io.BinaryEncoder(buf)
+    for record in records:
+        datum_writer.write(record, encoder)
+    return frame_block(len(records), compress_block(codec, buf.getvalue()), sync_marker)
+
+
+def frame_block(count, compressed, sync_marker):
+    return encode_long(count) + encode_long(len(compressed)) + compressed + sync_marker
+
+
+def decode_block(datum_reader, count, data, codec):
+    """
+    Decompresses and decodes all records of a container block
+    :param io.DatumReader datum_reader: Reader with schemas set
+    :param int count: Number of records in the block
+    :param bytes data: Compressed block contents
+    :param str codec: Block codec
+    :return list:
+    """
+    decoder = io.BinaryDecoder(_io.BytesIO(decompress_block(codec, data)))
+    return [datum_reader.read(decoder) for _ in range(count)]
@@ -2,7 +2,9 @@ import os
 
 from avro import schema
 from . import namespace as ns_
+from . import fingerprint
 from . import logical
+from . import numeric_arrays
 import six
 import keyword
 
@@ -39,33 +41,34 @@ def clean_fullname(fullname):
 
 def convert_default(full_name, idx, do_json=True):
     if do_json:
-        return (f'_json_converter.from_json_object({full_name}Class.RECORD_SCHEMA.fields[{idx}].default,'
-               + f' writers_schema={full_name}Class.RECORD_SCHEMA.fields[{idx}].type)')
+        return (f'_json_converter.from_json_object(self.RECORD_SCHEMA.field_map["{idx}"].default,'
+               + f' writers_schema=self.RECORD_SCHEMA.field_map["{idx}"].type)')
     else:
         return f'self.RECORD_SCHEMA.field_map["{idx}"].default'
 
 
-def get_default(field, use_logical_types, my_full_name=None, f_name=None):
+def get_default(field, use_logical_types, my_full_name=None, f_name=None, compact_arrays=None):
     default_written = False
     f_name = f_name if f_name is not None else field.name
     if keyword.iskeyword(field.name):
         f_name =  field.name + get_field_type_name(field.type, use_logical_types)
 
     default_type, nullable = find_type_of_default(field.type)
+    field_schema_expr = f'self.RECORD_SCHEMA.field_map["{field.name}"].type'
+    if isinstance(field.type, schema.UnionSchema):
+        field_schema_expr += '.schemas[0]'
     if field.has_default:
         if use_logical_types and default_type.props.get('logicalType') \
                 and default_type.props.get('logicalType') in logical.DEFAULT_LOGICAL_TYPES:
             lt = logical.DEFAULT_LOGICAL_TYPES[default_type.props.get('logicalType')]
-            v = lt.initializer(convert_default(my_full_name,
-                                                idx=i,
-                                                do_json=isinstance(default_type,
-                                                schema.RecordSchema)))
-            return v
-        elif isinstance(default_type, schema.RecordSchema):
-            d = convert_default(idx=i, full_name=my_full_name, do_json=True)
-            return f'{field.name}Class({d})'
+            return lt.field_initializer(field_schema_expr,
+                                        convert_default(my_full_name, idx=field.name, do_json=False))
+        elif isinstance(default_type, schema.RecordSchema) or (nullable and field.default is not None):
+            # Record defaults, and union defaults which do not match the null branch, go through the converter
+            # which instantiates generated classes and applies logical types
+            return convert_default(full_name=my_full_name, idx=field.name, do_json=True)
         elif isinstance(default_type, (schema.PrimitiveSchema, schema.EnumSchema, schema.FixedSchema)):
-            d = convert_default(full_name=my_full_name, idx=f_name, do_json=False)
+            d = convert_default(full_name=my_full_name, idx=field.name, do_json=False)
             return d
 
     if not default_written:
@@ -75,7 +78,7 @@ def get_default(field, use_logical_types, my_full_name=None, f_name=None):
         elif use_logical_types and default_type.props.get('logicalType') \
                 and default_type.props.get('logicalType') in logical.DEFAULT_LOGICAL_TYPES:
             lt = logical.DEFAULT_LOGICAL_TYPES[default_type.props.get('logicalType')]
-            return f'{default}'.format(default=lt.initializer())
+            return lt.field_initializer(field_schema_expr)
         elif isinstance(default_type, schema.PrimitiveSchema) and not default_type.props.get('logicalType'):
             d = get_primitive_field_initializer(default_type)
             return d
@@ -86,6 +89,9 @@ def get_default(field, use_logical_types, my_full_name=None, f_name=None):
         elif isinstance(default_type, schema.MapSchema):
             return 'dict()'
         elif isinstance(default_type, schema.ArraySchema):
+            mode = numeric_arrays.requested_mode(default_type, compact_arrays)
+            if mode is not None:
+                return f'numeric_arrays.from_list((), {default_type.items.type!r}, {mode!r})'
             return 'list()'
         elif isinstance(default_type, schema.FixedSchema):
             return 'str()'
@@ -94,23 +100,30 @@ def get_default(field, use_logical_types, my_full_name=None, f_name=None):
             return f'{f}Class()'
     raise AttributeError('cannot get default for field')
 
-def write_defaults(record, writer, my_full_name=None, use_logical_types=False):
+def write_defaults(record, writer, my_full_name=None, use_logical_types=False, lazy_defaults=False,
+                   compact_arrays=None):
     """
     Write concrete record class's constructor part which initializes fields with default values
     :param schema.RecordSchema record: Avro RecordSchema whose class we are generating
     :param TabbedWriter writer: Writer to write to
     :param str my_full_name: Full name of the RecordSchema we are writing. Should only be provided for protocol requests.
+    :param bool lazy_defaults: Skip fields whose defaults are created on first read, see get_lazy_defaults
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
     :return:
     """
     i = 0
     my_full_name = my_full_name or clean_fullname(record.fullname)
+    lazy = get_lazy_defaults(record, use_logical_types) if lazy_defaults else {}
 
     something_written = False
     for field in record.fields:
+        if field.name in lazy:
+            continue
         f_name = field.name
         if keyword.iskeyword(field.name):
             f_name =  field.name + get_field_type_name(field.type, use_logical_types)
-        default = get_default(field, use_logical_types, my_full_name=my_full_name, f_name=f_name)
+        default = get_default(field, use_logical_types, my_full_name=my_full_name, f_name=f_name,
+                              compact_arrays=compact_arrays)
         writer.write(f'\nself.{f_name} = {default}')
         something_written = True
         i += 1
@@ -118,16 +131,62 @@ def write_defaults(record, writer, my_full_name=None, use_logical_types=False):
         writer.write('\npass')
 
 
-def write_fields(record, writer, use_logical_types):
+def get_lazy_defaults(record, use_logical_types, compact_arrays=None):
+    """
+    Finds fields whose default values are records, arrays or maps. Their defaults are not created by the
+    constructor but by the getter on first read, and not at all if a value is assigned first.
+    :param schema.RecordSchema record:
+    :param bool use_logical_types:
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
+    :return dict[str, str]: Default value expressions by field name, in field order
+    """
+    lazy = {}
+    for field in record.fields:
+        if is_mutable_schema(field.type):
+            default = get_default(field, use_logical_types, my_full_name=clean_fullname(record.fullname),
+                                  compact_arrays=compact_arrays)
+            if default != 'None':
+                lazy[field.name] = default
+    return lazy
+
+
+def write_lazy_defaults(record, writer, use_logical_types, compact_arrays=None):
+    """
+    Writes the _LAZY_DEFAULTS table of a record class: functions creating default values by field name
+    :param schema.RecordSchema record:
+    :param TabbedWriter writer:
+    :param bool use_logical_types:
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
+    :return:
+    """
+    lazy = get_lazy_defaults(record, use_logical_types, compact_arrays)
+    if not lazy:
+        return
+    writer.write('\n_LAZY_DEFAULTS: Dict[str, Callable[[Any], Any]] = {')
+    with writer.indent():
+        for name, default in lazy.items():
+            writer.write(f"\n'{name}': lambda self: {default},")
+    writer.write('\n}')
+
+
+def write_fields(record, writer, use_logical_types, frozen=False, copy_on_write=False, lazy_defaults=False,
+                 stubs=False, compact_arrays=None):
     """
     Write field definitions for a given RecordSchema
     :param schema.RecordSchema record: Avro RecordSchema we are generating
     :param TabbedWriter writer: Writer to write to
+    :param bool frozen: Whether setters should refuse to modify a frozen record
+    :param bool copy_on_write: Whether accessors should unshare values of copy-on-write copies
+    :param bool lazy_defaults: Whether getters of fields with record, array and map defaults create them
+    :param bool stubs: Leave out type hints and docs, which are written to a .pyi stub instead
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
     :return:
     """
+    lazy = get_lazy_defaults(record, use_logical_types) if lazy_defaults else {}
     writer.write('\n\n')
     for field in record.fields:  # type: schema.Field
-        write_field(field, writer, use_logical_types)
+        write_field(field, writer, use_logical_types, frozen, copy_on_write, field.name in lazy, stubs,
+                    compact_arrays)
 
 def get_field_name(field, use_logical_types):
     name = field.name
@@ -135,30 +194,146 @@ def get_field_name(field, use_logical_types):
         name =  field.name + get_field_type_name(field.type, use_logical_types)
     return name
 
-def write_field(field, writer, use_logical_types):
+def write_field(field, writer, use_logical_types, frozen=False, copy_on_write=False, lazy_default=False,
+                stubs=False, compact_arrays=None):
     """
     Write a single field definition
     :param field:
     :param writer:
+    :param bool frozen: Whether the setter should refuse to modify a frozen record
+    :param bool copy_on_write: Whether accessors should unshare values of copy-on-write copies
+    :param bool lazy_default: Whether the getter creates the default value if the field was never set
+    :param bool stubs: Leave out type hints and docs, which are written to a .pyi stub instead
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
     :return:
     """
     name = get_field_name(field, use_logical_types)
     doc = field.doc
     get_docstring = f'"""Getter: {doc}"""' if doc else "# No docs available."
     set_docstring = f'"""Setter: {doc}"""' if doc else "# No docs available."
-    writer.write('''
+    getter = "return self._inner_dict.get('{raw_name}')  # type: ignore"
+    setter = "self._inner_dict['{raw_name}'] = value"
+    if lazy_default:
+        getter = """try:
+        return self._inner_dict['{raw_name}']  # type: ignore
+    except KeyError:
+        return self._lazy_default('{raw_name}')"""
+    if copy_on_write and not frozen:
+        if is_mutable_schema(field.type):
+            getter = "return self._get_owned('{raw_name}')  # type: ignore"
+        setter = "self._set('{raw_name}', value)"
+    if frozen:
+        setter = 'self._check_mutable()\n    ' + setter
+    if stubs:
+        get_signature, set_signature = 'def {name}(self):', 'def {name}(self, value):'
+        getter = getter.replace('  # type: ignore', '')
+    else:
+        get_signature = 'def {name}(self) -> {ret_type_name}:\n    {get_docstring}'
+        set_signature = 'def {name}(self, value: {ret_type_name}):\n    {set_docstring}'
+    writer.write(("""
 @property
-def {name}(self) -> {ret_type_name}:
-    {get_docstring}
-    return self._inner_dict.get('{raw_name}')  # type: ignore
+""" + get_signature + """
+    """ + getter + """
 
 
 @{name}.setter
-def {name}(self, value: {ret_type_name}):
-    {set_docstring}
-    self._inner_dict['{raw_name}'] = value
+""" + set_signature + """
+    """ + setter + """
+
+""").format(name=name, get_docstring=get_docstring, set_docstring=set_docstring, raw_name=field.name,
+              ret_type_name=get_field_type_name(field.type, use_logical_types, compact_arrays)))
 
-'''.format(name=name, get_docstring=get_docstring, set_docstring=set_docstring, raw_name=field.name, ret_type_name=get_field_type_name(field.type, use_logical_types)))
+
+def is_mutable_schema(field_schema):
+    """
+    Whether values of the schema can be modified in place: records, arrays, maps and unions containing them
+    :param schema.Schema field_schema:
+    :return bool:
+    """
+    if isinstance(field_schema, schema.UnionSchema):
+        return any(is_mutable_schema(s) for s in field_schema.schemas)
+    return isinstance(field_schema, (schema.RecordSchema, schema.ArraySchema, schema.MapSchema))
+
+
+def find_compact_modes(named_schemas, compact_arrays=None):
+    """
+    Finds how the numeric arrays of record fields are stored compactly
+    :param list[schema.NamedSchema] named_schemas: All named schemas being generated
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
+    :return set[str]: COMPACT_ARRAY and/or COMPACT_NUMPY, empty if all arrays are lists
+    """
+    modes = set()
+
+    def visit(field_schema):
+        if isinstance(field_schema, schema.ArraySchema):
+            mode = numeric_arrays.requested_mode(field_schema, compact_arrays)
+            if mode is not None:
+                modes.add(mode)
+            visit(field_schema.items)
+        elif isinstance(field_schema, schema.MapSchema):
+            visit(field_schema.values)
+        elif isinstance(field_schema, schema.UnionSchema):
+            for s in field_schema.schemas:
+                visit(s)
+
+    for named in named_schemas:
+        if isinstance(named, schema.RecordSchema):
+            for field in named.fields:
+                visit(field.type)
+    return modes
+
+
+def get_copy_expression(field_schema, expr):
+    """
+    Gets a python expression which deep copies a value of the given schema, sharing immutable values
+    :param schema.Schema field_schema:
+    :param str expr: Expression of the value to copy
+    :return str:
+    """
+    if not is_mutable_schema(field_schema):
+        return expr
+    if isinstance(field_schema, schema.ArraySchema) and not is_mutable_schema(field_schema.items):
+        return f'copy_list({expr})'
+    if isinstance(field_schema, schema.MapSchema) and not is_mutable_schema(field_schema.values):
+        return f'copy_dict({expr})'
+    return f'copy_value({expr})'
+
+
+def write_record_copy(record, writer, use_logical_types=False, stubs=False):
+    """
+    Writes copy() of a record class, which copies only fields whose values are mutable. Fields with lazy
+    defaults which were never read or set stay unset in the copy.
+    :param schema.RecordSchema record:
+    :param TabbedWriter writer:
+    :param bool use_logical_types:
+    :param bool stubs: Leave out type hints, which are written to a .pyi stub instead
+    :return:
+    """
+    _, type_name = ns_.split_fullname(record.fullname)
+    lazy = get_lazy_defaults(record, use_logical_types)
+    writer.write('\n\ndef copy(self, deep=False):' if stubs else f'\n\ndef copy(self, deep=False) -> "{type_name}Class":')
+    with writer.indent():
+        writer.write('\nif not deep:')
+        with writer.indent():
+            writer.write('\nreturn self._clone(self._inner_dict.copy())')
+        writer.write('\ninner_dict = self._inner_dict')
+        writer.write('\ncopied = {' if lazy else '\nreturn self._clone({')
+        with writer.indent():
+            for field in record.fields:
+                if field.name not in lazy:
+                    expr = get_copy_expression(field.type, f"inner_dict.get('{field.name}')")
+                    writer.write(f"\n'{field.name}': {expr},")
+        if not lazy:
+            writer.write('\n})')
+            return
+        writer.write('\n}')
+        for name in lazy:
+            field = record.field_map[name]
+            writer.write(f"\nif '{name}' in inner_dict:")
+            with writer.indent():
+                expr = get_copy_expression(field.type, f"inner_dict['{name}']")
+                writer.write(f"\ncopied['{name}'] = {expr}")
+        writer.write('\nreturn self._clone(copied)')
 
 
 def get_primitive_field_initializer(field_schema):
@@ -174,10 +349,11 @@ def get_primitive_field_initializer(field_schema):
     return get_field_type_name(field_schema, False) + "()"
 
 
-def get_field_type_name(field_schema, use_logical_types):
+def get_field_type_name(field_schema, use_logical_types, compact_arrays=None):
     """
     Gets a python type-hint for a given schema
     :param schema.Schema field_schema:
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
     :return: String containing python type hint
     """
     if use_logical_types and field_schema.props.get('logicalType'):
@@ -195,12 +371,17 @@ def get_field_type_name(field_schema, use_logical_types):
     elif isinstance(field_schema, schema.NamedSchema):
         return f'"{field_schema.name}Class"'
     elif isinstance(field_schema, schema.ArraySchema):
-        return 'List[' + get_field_type_name(field_schema.items, use_logical_types) + ']'
+        mode = numeric_arrays.requested_mode(field_schema, compact_arrays)
+        if mode == numeric_arrays.COMPACT_ARRAY:
+            return 'array.array'
+        elif mode == numeric_arrays.COMPACT_NUMPY:
+            return '"numpy.ndarray"'
+        return 'List[' + get_field_type_name(field_schema.items, use_logical_types, compact_arrays) + ']'
     elif isinstance(field_schema, schema.MapSchema):
-        return 'Dict[str, ' + get_field_type_name(field_schema.values, use_logical_types) + ']'
+        return 'Dict[str, ' + get_field_type_name(field_schema.values, use_logical_types, compact_arrays) + ']'
     elif isinstance(field_schema, schema.UnionSchema):
-        type_names = [get_field_type_name(x, use_logical_types) for x in field_schema.schemas if
-                      get_field_type_name(x, use_logical_types)]
+        type_names = [get_field_type_name(x, use_logical_types, compact_arrays) for x in field_schema.schemas if
+                      get_field_type_name(x, use_logical_types, compact_arrays)]
         if len(type_names) > 1:
             return 'Union[' + ', '.join(type_names) + ']'
         elif len(type_names) == 1:
@@ -256,12 +437,15 @@ def start_namespace(current, target, writer):
         writer.write('\n')
 
 
-def write_preamble(writer, use_logical_types, custom_imports):
+def write_preamble(writer, use_logical_types, custom_imports, compact_modes=()):
     """
     Writes a preamble of the file containing schema classes
     :param  writer:
+    :param set[str] compact_modes: Storage modes of the compact numeric arrays, see find_compact_modes
     :return:
     """
+    if compact_modes:
+        writer.write('import array\n')
     writer.write('import json\n')
     writer.write('import os.path\n')
     writer.write('import decimal\n')
@@ -270,14 +454,47 @@ def write_preamble(writer, use_logical_types, custom_imports):
 
     for cs in (custom_imports or []):
         writer.write(f'import {cs}\n')
-    writer.write('from avrogen.dict_wrapper import DictWrapper\n')
-    writer.write('from avrogen import avrojson\n')
+    writer.write('from avrogen.dict_wrapper import DictWrapper, FrozenDictWrapper, CopyOnWriteDictWrapper\n')
+    writer.write('from avrogen.dict_wrapper import copy_value, copy_list, copy_dict\n')
+    writer.write('from avrogen import avrojson, schema_cache\n')
     if use_logical_types:
         writer.write('from avrogen import logical\n')
+    if compact_modes:
+        writer.write('from avrogen import numeric_arrays\n')
     writer.write('from avro.schema import RecordSchema, SchemaFromJSONData as make_avsc_object\n')
     writer.write('from avro import schema as avro_schema\n')
-    writer.write('from typing import List, Dict, Union, Optional, overload\n')
+    writer.write('from typing import Any, Callable, List, Dict, Union, Optional, overload\n')
+    if numeric_arrays.COMPACT_NUMPY in compact_modes:
+        writer.write('from typing import TYPE_CHECKING\n')
+        writer.write('if TYPE_CHECKING:\n')
+        writer.write('    import numpy\n')
+    writer.write('\n')
+
+
+def write_stub_preamble(writer, custom_imports, compact_modes=()):
+    """
+    Writes a preamble of the .pyi stub of the file containing schema classes
+    :param TabbedWriter writer:
+    :param list[str] custom_imports: Additional import modules, which may provide logical type hints
+    :param set[str] compact_modes: Storage modes of the compact numeric arrays, see find_compact_modes
+    :return:
+    """
+    if compact_modes:
+        writer.write('import array\n')
+    writer.write('import datetime\n')
+    writer.write('import decimal\n')
+    if numeric_arrays.COMPACT_NUMPY in compact_modes:
+        writer.write('import numpy\n')
+    for cs in (custom_imports or []):
+        writer.write(f'import {cs}\n')
+    writer.write('from avrogen.dict_wrapper import DictWrapper, FrozenDictWrapper, CopyOnWriteDictWrapper\n')
+    writer.write('from avrogen import avrojson\n')
+    writer.write('from avro.schema import RecordSchema, Names, Schema\n')
+    writer.write('from typing import Dict, FrozenSet, List, Optional, Union, overload\n')
     writer.write('\n')
+    writer.write('SCHEMA_JSON_STR: str\n')
+    writer.write('SCHEMA: Schema\n')
+    writer.write('\n\ndef get_schema_type(fullname: str) -> RecordSchema: ...\n')
 
 
 def write_read_file(writer):
@@ -305,15 +522,18 @@ def write_get_schema(writer):
         writer.write('\nreturn __SCHEMAS.get(fullname)\n\n')
 
 
-def write_reader_impl(record_types, writer, use_logical_types):
+def write_reader_impl(record_types, writer, use_logical_types, compact_arrays=None, compact=False):
     """
     Write specific reader implementation
     :param list[schema.RecordSchema] record_types:
     :param writer:
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
+    :param bool compact: Whether any numeric arrays are stored compactly, by default or by their schema
     :return:
     """
-    writer.write('\n\n\nclass SpecificDatumReader(%s):' % (
-        'DatumReader' if not use_logical_types else 'logical.LogicalDatumReader'))
+    writer.write('\n\n\nclass SpecificDatumReader(reuse.RecordReuseMixin, %s%s):' % (
+        'numeric_arrays.CompactArrayReaderMixin, ' if compact else '',
+        'resolution.PlannedDatumReader' if not use_logical_types else 'logical.LogicalDatumReader'))
     with writer.indent():
         writer.write('\nSCHEMA_TYPES = {')
         with writer.indent():
@@ -324,6 +544,9 @@ def write_reader_impl(record_types, writer, use_logical_types):
                 writer.write('\n"{f_class}": {t_class}Class,'.format(t_class=t_class, f_class=t))
 
         writer.write('\n}')
+        if compact:
+            writer.write('\ncompact_arrays = %r' % compact_arrays)
+        writer.write('\n_decoders = None')
         writer.write('\n\n\ndef __init__(self, readers_schema=None, **kwargs):')
         with writer.indent():
             writer.write('\nwriters_schema = kwargs.pop("writers_schema", readers_schema)')
@@ -339,6 +562,42 @@ def write_reader_impl(record_types, writer, use_logical_types):
                 writer.write('\nresult = SpecificDatumReader.SCHEMA_TYPES[readers_schema.fullname](result)')
             writer.write('\n\nreturn result')
 
+        writer.write('\n\n\n@classmethod')
+        writer.write('\ndef for_writer(cls, writers_schema, readers_schema=None):')
+        with writer.indent():
+            writer.write('\n"""')
+            writer.write('\nReturns a prepared reader resolving the writer\'s schema (schema object or JSON text)')
+            writer.write('\nto the reader\'s schema. Readers are cached by the writer\'s schema fingerprint and JSON.')
+            writer.write('\n"""')
+            writer.write('\nif cls._decoders is None:')
+            with writer.indent():
+                writer.write('\ncls._decoders = resolution.DecoderCache(lambda w, r: cls(r, writers_schema=w))')
+            writer.write('\nreturn cls._decoders.get(writers_schema, readers_schema)')
+
+
+def write_writer_impl(writer, use_logical_types, compact=False):
+    """
+    Write container file writer implementation compressing blocks in parallel
+    :param writer:
+    :param bool use_logical_types:
+    :param bool compact: Whether any numeric arrays are stored compactly, which only LogicalDatumWriter encodes
+    :return:
+    """
+    writer.write('\n\n\nclass SpecificDataFileWriter(parallel.ParallelDataFileWriter):')
+    with writer.indent():
+        writer.write('\ndef __init__(self, fo, writers_schema, datum_writer=None, **kwargs):')
+        with writer.indent():
+            writer.write('\nif datum_writer is None:')
+            with writer.indent():
+                if use_logical_types:
+                    writer.write('\ndatum_writer = logical.LogicalDatumWriter()')
+                elif compact:
+                    writer.write('\ndatum_writer = logical.LogicalDatumWriter(logical_types=None)')
+                else:
+                    writer.write('\ndatum_writer = DatumWriter()')
+            writer.write(
+                '\nsuper(SpecificDataFileWriter, self).__init__(fo, writers_schema, datum_writer, **kwargs)')
+
 
 def generate_namespace_modules(names, output_folder):
     """
@@ -367,40 +626,141 @@ def generate_namespace_modules(names, output_folder):
     return ns_dict
 
 
-def write_schema_record(record, writer, use_logical_types):
+def write_schema_record(record, writer, use_logical_types, frozen=False, copy_on_write=False, stubs=False,
+                        compact_arrays=None):
     """
     Writes class representing Avro record schema
     :param avro.schema.RecordSchema record:
     :param TabbedWriter writer:
+    :param bool frozen: Generate an immutable, hashable record class
+    :param bool copy_on_write: Generate a record class whose deep copies are copy-on-write
+    :param bool stubs: Leave out overloads, type hints and field docs, which are written to a .pyi stub instead
+                       by write_record_stub
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
     :return:
     """
 
     _, type_name = ns_.split_fullname(record.fullname)
-    writer.write('''\nclass {name}Class(DictWrapper):'''.format(name=type_name))
+    if frozen:
+        base = 'FrozenDictWrapper'
+    elif copy_on_write:
+        base = 'CopyOnWriteDictWrapper'
+    else:
+        base = 'DictWrapper'
+    writer.write('''\nclass {name}Class({base}):'''.format(name=type_name, base=base))
 
     with writer.indent():
         writer.write('\n')
         if record.doc:
             writer.write(f'"""{record.doc}"""')
-        else:
+        elif not stubs:
             writer.write('# No docs available.')
-        writer.write('\n\nRECORD_SCHEMA = get_schema_type("%s")' % (record.namespace + '.' + record.name))
-
-        write_record_init(record, writer, use_logical_types)
+        writer.write('\n\nRECORD_SCHEMA = get_schema_type("%s")' % clean_fullname(record.fullname))
+        write_fingerprints(record, writer)
+        if copy_on_write and not frozen:
+            mutable_fields = ', '.join(repr(f.name) for f in record.fields if is_mutable_schema(f.type))
+            writer.write(f'\nMUTABLE_FIELDS = frozenset([{mutable_fields}])')
+        # Frozen and copy-on-write records keep eager defaults
+        lazy_defaults = not frozen and not copy_on_write
+        if lazy_defaults:
+            write_lazy_defaults(record, writer, use_logical_types, compact_arrays)
+
+        write_record_init(record, writer, use_logical_types, frozen, lazy_defaults, stubs, compact_arrays)
 
         write_serialization_stubs(record, writer, use_logical_types)
 
-        write_fields(record, writer, use_logical_types)
+        if not frozen and not copy_on_write:
+            write_record_copy(record, writer, use_logical_types, stubs)
+
+        write_fields(record, writer, use_logical_types, frozen, copy_on_write, lazy_defaults, stubs, compact_arrays)
+
+
+def write_record_stub(record, writer, use_logical_types, frozen=False, copy_on_write=False, compact_arrays=None):
+    """
+    Writes the .pyi stub of a record class: its constants, typed constructor overloads and typed, documented
+    field properties
+    :param avro.schema.RecordSchema record:
+    :param TabbedWriter writer:
+    :param bool frozen: Whether the record class is immutable
+    :param bool copy_on_write: Whether the record class's deep copies are copy-on-write
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
+    :return:
+    """
+    _, type_name = ns_.split_fullname(record.fullname)
+    if frozen:
+        base = 'FrozenDictWrapper'
+    elif copy_on_write:
+        base = 'CopyOnWriteDictWrapper'
+    else:
+        base = 'DictWrapper'
+    writer.write(f'\nclass {type_name}Class({base}):')
+
+    with writer.indent():
+        if record.doc:
+            writer.write(f'\n"""{record.doc}"""\n')
+        writer.write('\nRECORD_SCHEMA: RecordSchema')
+        write_fingerprint_stubs(writer)
+        if copy_on_write and not frozen:
+            writer.write('\nMUTABLE_FIELDS: FrozenSet[str]')
+
+        write_init_overloads(record, writer, use_logical_types, compact_arrays)
 
+        if not frozen and not copy_on_write:
+            writer.write(f'\n\ndef copy(self, deep: bool=...) -> "{type_name}Class": ...')
 
-def write_record_init(record, writer, use_logical_types):
+        writer.write('\n')
+        for field in record.fields:  # type: schema.Field
+            name = get_field_name(field, use_logical_types)
+            type_hint = get_field_type_name(field.type, use_logical_types, compact_arrays)
+            writer.write(f'\n\n@property\ndef {name}(self) -> {type_hint}:')
+            with writer.indent():
+                writer.write(f'\n"""{field.doc}"""' if field.doc else '\n...')
+            writer.write(f'\n\n@{name}.setter\ndef {name}(self, value: {type_hint}) -> None: ...')
+        writer.write('\n')
+
+
+def write_fingerprint_stubs(writer):
+    """
+    Writes the type hints of the constants written by write_fingerprints
+    :param TabbedWriter writer:
+    :return:
+    """
+    writer.write('\nCANONICAL_FORM: str')
+    writer.write('\nFINGERPRINT_CRC64: bytes')
+    writer.write('\nFINGERPRINT_MD5: bytes')
+    writer.write('\nFINGERPRINT_SHA256: bytes')
+
+
+def write_fingerprints(named_schema, writer):
+    """
+    Writes Parsing Canonical Form and fingerprints of a named schema as class constants
+    :param schema.NamedSchema named_schema:
+    :param TabbedWriter writer:
+    :return:
+    """
+    canonical_form = fingerprint.parsing_canonical_form(named_schema)
+    writer.write('\nCANONICAL_FORM = %r' % canonical_form)
+    writer.write('\nFINGERPRINT_CRC64 = %r' % fingerprint.fingerprint(canonical_form, fingerprint.CRC_64_AVRO))
+    writer.write('\nFINGERPRINT_MD5 = %r' % fingerprint.fingerprint(canonical_form, fingerprint.MD5))
+    writer.write('\nFINGERPRINT_SHA256 = %r' % fingerprint.fingerprint(canonical_form, fingerprint.SHA_256))
+
+
+def write_init_overloads(record, writer, use_logical_types, compact_arrays=None):
+    """
+    Writes the typed @overload signatures of a record class's constructor, for type checkers and IDEs
+    :param schema.RecordSchema record:
+    :param TabbedWriter writer:
+    :param bool use_logical_types:
+    :param str compact_arrays: Default storage of numeric arrays, see numeric_arrays.requested_mode
+    :return:
+    """
     writer.write('\n\n@overload')
     writer.write('\ndef __init__(self,')
     with writer.indent():
         for field in record.fields:  # type: schema.Field
             name = get_field_name(field, use_logical_types)
             # default = get_default(field, use_logical_types)
-            ret_type_name = get_field_type_name(field.type, use_logical_types)
+            ret_type_name = get_field_type_name(field.type, use_logical_types, compact_arrays)
             # We can actually skip setting real defaults here. It won't actually
             # make a difference because this is an overload method and not
             # a real one. However, we need to set them to something so that
@@ -417,25 +777,35 @@ def write_record_init(record, writer, use_logical_types):
     with writer.indent():
         writer.write('\n...')
 
+
+def write_record_init(record, writer, use_logical_types, frozen=False, lazy_defaults=False, stubs=False,
+                      compact_arrays=None):
+    if not stubs:
+        write_init_overloads(record, writer, use_logical_types, compact_arrays)
+
     writer.write('\n\ndef __init__(self, _inner_dict=None, **kwargs):')
     with writer.indent():
         writer.write('\n')
         writer.write('super({name}Class, self).__init__({{}})'.format(name=record.name))
 
-        write_defaults(record, writer, use_logical_types=use_logical_types)
+        write_defaults(record, writer, use_logical_types=use_logical_types, lazy_defaults=lazy_defaults,
+                       compact_arrays=compact_arrays)
 
+        # Unknown fields are rejected by looking the property up on the class, which does not run the getter
         writer.write('\nif _inner_dict is not None:')
         with writer.indent():
             writer.write('\nfor key, value in _inner_dict.items():')
             with writer.indent():
-                writer.write('\ngetattr(self, key)')
+                writer.write('\ngetattr(type(self), key)')
                 writer.write('\nsetattr(self, key, value)')
         writer.write('\nfor key, value in kwargs.items():')
         with writer.indent():
             writer.write('\nif value is not None:')
             with writer.indent():
-                writer.write('\ngetattr(self, key)')
+                writer.write('\ngetattr(type(self), key)')
                 writer.write('\nsetattr(self, key, value)')
+        if frozen:
+            writer.write('\nself._freeze()')
 
 
 def write_serialization_stubs(record, writer, use_logical_types):
@@ -467,7 +837,28 @@ def write_enum(enum, writer):
         else:
             writer.write('# No docs available.')
 
+        write_fingerprints(enum, writer)
         writer.write('\n\n')
         for field in enum.symbols:
             writer.write('{name} = "{name}"\n'.format(name=field))
         writer.write('\n')
+
+
+def write_enum_stub(enum, writer):
+    """
+    Writes the .pyi stub of a class representing Avro enum schema
+    :param schema.EnumSchema enum:
+    :param TabbedWriter writer:
+    :return:
+    """
+    _, type_name = ns_.split_fullname(enum.fullname)
+    writer.write(f'\nclass {type_name}Class(object):')
+
+    with writer.indent():
+        if enum.doc:
+            writer.write(f'\n"""{enum.doc}"""\n')
+        write_fingerprint_stubs(writer)
+        writer.write('\n')
+        for symbol in enum.symbols:
+            writer.write(f'\n{symbol}: str')
+        writer.write('\n')
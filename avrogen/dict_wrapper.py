@@ -1,14 +1,22 @@
-from typing import NoReturn, TypeVar, Type
+import collections.abc
+from typing import Any, Callable, Dict, FrozenSet, Iterator, NoReturn, TypeVar, Type
 import six
 
+from . import json_text, ndjson, numeric_arrays, single_object, sort_order
 from .avrojson import AvroJsonConverter
 
 TC = TypeVar('TC', bound='DictWrapper')
+TCOW = TypeVar('TCOW', bound='CopyOnWriteDictWrapper')
 
 
 class DictWrapper(dict):
     __slots__ = ['_inner_dict']
 
+    # Functions creating the default values of record, array and map fields by field name. Generated classes
+    # leave these fields unset until they are first read, so records which are filled in right after
+    # construction never build defaults only to drop them.
+    _LAZY_DEFAULTS = {}  # type: Dict[str, Callable[[Any], Any]]
+
     def __init__(self, inner_dict=None):
         super(DictWrapper, self).__init__()
         self._inner_dict = {} if inner_dict is None else inner_dict  # type: dict
@@ -27,26 +35,113 @@ class DictWrapper(dict):
         conv = self._get_json_converter().with_tuple_union(tuples)
         return conv.to_json_object(self, self.RECORD_SCHEMA)
 
+    @classmethod
+    def read_ndjson(cls: Type[TC], path, workers=None, chunk_bytes=ndjson.DEFAULT_CHUNK_BYTES, tuples=False,
+                    output=ndjson.OUTPUT_RECORDS, codec='null', sync_marker=None) -> Iterator[TC]:
+        """
+        Reads newline delimited JSON in parallel, see ndjson.read_ndjson
+        """
+        return ndjson.read_ndjson(cls, path, workers, chunk_bytes, tuples, output, codec, sync_marker)
+
+    def to_json_str(self, tuples=False) -> str:
+        """
+        Serializes the record straight to compact JSON text, equivalent to json.dumps of to_obj()
+        """
+        return json_text.to_json_str(self, tuples)
+
+    @classmethod
+    def from_bytes(cls: Type[TC], data) -> TC:
+        record = single_object.get_codec(cls._get_json_converter()).decode(data)
+        if not isinstance(record, cls):
+            raise ValueError('Expected %s, got single object encoded %s' % (cls.__name__, type(record).__name__))
+        return record
+
+    def to_bytes(self) -> bytes:
+        return single_object.get_codec(self._get_json_converter()).encode(self)
+
+    @classmethod
+    def compare_encoded(cls, a: bytes, b: bytes) -> int:
+        """
+        Compares two binary encoded records of this class following the Avro sort order, without decoding them
+        """
+        return sort_order.compare_encoded(cls.RECORD_SCHEMA, a, b)
+
+    @classmethod
+    def sort_key_encoded(cls):
+        """
+        Returns a key function which sorts binary encoded records of this class following the Avro sort order
+        """
+        return sort_order.sort_key_encoded(cls.RECORD_SCHEMA)
+
+    def _lazy_default(self, key):
+        """
+        Creates the default value of a field which was never set, and stores it in the record
+        """
+        value = self._inner_dict[key] = self._LAZY_DEFAULTS[key](self)
+        return value
+
+    def _fill_defaults(self):
+        """
+        Creates the lazy defaults of all fields which were never set
+        :return dict: The wrapped dict
+        """
+        inner_dict = self._inner_dict
+        for key in self._LAZY_DEFAULTS:
+            if key not in inner_dict:
+                self._lazy_default(key)
+        return inner_dict
+
+    def _unset_defaults(self):
+        """
+        :return list[str]: Names of the fields with lazy defaults which were never set
+        """
+        inner_dict = self._inner_dict
+        return [key for key in self._LAZY_DEFAULTS if key not in inner_dict]
+
+    def _with_defaults(self):
+        """
+        Returns the field values including lazy defaults without storing the defaults in the record, for
+        read-only use
+        :return dict:
+        """
+        unset = self._unset_defaults()
+        if not unset:
+            return self._inner_dict
+        result = dict(self._inner_dict)
+        for key in unset:
+            result[key] = self._LAZY_DEFAULTS[key](self)
+        return result
+
     def __getitem__(self, item):
-        return self._inner_dict.__getitem__(item)
+        try:
+            return self._inner_dict[item]
+        except KeyError:
+            if item not in self._LAZY_DEFAULTS:
+                raise
+            return self._lazy_default(item)
 
     def __iter__(self):
-        return self._inner_dict.__iter__()
+        unset = self._unset_defaults()
+        if not unset:
+            return self._inner_dict.__iter__()
+        return iter(list(self._inner_dict) + unset)
 
     def __len__(self):
-        return self._inner_dict.__len__()
+        return len(self._inner_dict) + len(self._unset_defaults())
 
     def __setitem__(self, key, value) -> NoReturn:
         raise NotImplementedError()
 
     def items(self):
-        return self._inner_dict.items()
+        return self._fill_defaults().items()
 
     def keys(self):
-        return self._inner_dict.keys()
+        if not self._unset_defaults():
+            return self._inner_dict.keys()
+        return collections.abc.KeysView(self)
 
     def values(self):
-        return self._inner_dict.values()
+        return self._fill_defaults().values()
 
     def fromkeys(self, v=None) -> NoReturn:
         raise NotImplementedError
@@ -54,20 +149,48 @@ class DictWrapper(dict):
     def clear(self) -> NoReturn:
         raise NotImplementedError
 
-    def copy(self):
-        return DictWrapper(self._inner_dict.copy())
+    @classmethod
+    def _clone(cls: Type[TC], inner_dict) -> TC:
+        # Skips the generated constructor, which would compute defaults only to overwrite them
+        result = cls.__new__(cls)
+        DictWrapper.__init__(result, inner_dict)
+        return result
+
+    def copy(self: TC, deep=False) -> TC:
+        """
+        Returns a copy of the record. A deep copy also copies nested records, arrays and maps.
+        Generated classes override this with a copy that knows the type of every field.
+        """
+        if not deep:
+            return self._clone(self._inner_dict.copy())
+        return self._clone({k: copy_value(v) for k, v in six.iteritems(self._inner_dict)})
+
+    def __reduce__(self):
+        # dict's default pickling would restore fields through __setitem__, which records don't support
+        return type(self)._clone, (dict(self._inner_dict),)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy(deep=True)
 
     def get(self, k, d=None):
-        return self._inner_dict.get(k, d)
+        try:
+            return self._inner_dict[k]
+        except KeyError:
+            if k not in self._LAZY_DEFAULTS:
+                return d
+            return self._lazy_default(k)
 
     def __contains__(self, item):
-        return self._inner_dict.__contains__(item)
+        return self._inner_dict.__contains__(item) or item in self._LAZY_DEFAULTS
 
     def __str__(self):
-        return self._inner_dict.__str__()
+        return self._with_defaults().__str__()
 
     def __repr__(self):
-        return self._inner_dict.__repr__()
+        return self._with_defaults().__repr__()
 
     def __sizeof__(self):
         return self._inner_dict.__sizeof__()
@@ -85,10 +208,22 @@ class DictWrapper(dict):
         raise NotImplementedError()
 
     def __eq__(self, other):
-        return self._inner_dict.__eq__(other)
+        if isinstance(other, DictWrapper):
+            other = other._with_defaults()
+        inner_dict = self._with_defaults()
+        try:
+            result = inner_dict.__eq__(other)
+        except ValueError:
+            # NumPy arrays compare element-wise
+            return numeric_arrays.values_equal(inner_dict, other)
+        if result is False and isinstance(other, dict):
+            # Compact arrays equal lists of the same numbers
+            return numeric_arrays.values_equal(inner_dict, other)
+        return result
 
     def __ne__(self, other):
-        return self._inner_dict.__ne__(other)
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
 
     def __le__(self, other):
         return self._inner_dict.__le__(other)
@@ -103,4 +238,236 @@ class DictWrapper(dict):
         return self._inner_dict.__gt__(other)
 
     def __hash__(self):
-        return self._inner_dict.__hash__()
\ No newline at end of file
+        return self._inner_dict.__hash__()
+
+def copy_value(value):
+    """
+    Deep copies a field value of unknown type: records, lists, compact arrays and dicts are copied, anything else is
+    shared
+    """
+    if isinstance(value, DictWrapper):
+        return value.copy(deep=True)
+    if numeric_arrays.is_compact(value):
+        return numeric_arrays.copy_array(value)
+    if isinstance(value, list):
+        if isinstance(value, FrozenList):
+            return value
+        return [copy_value(v) for v in value]
+    if isinstance(value, dict):
+        if isinstance(value, FrozenDict):
+            return value
+        return {k: copy_value(v) for k, v in six.iteritems(value)}
+    return value
+
+
+def copy_list(value):
+    """
+    Copies an array whose items are immutable, keeping compact arrays compact
+    """
+    if value is None or isinstance(value, FrozenList):
+        return value
+    if numeric_arrays.is_compact(value):
+        return numeric_arrays.copy_array(value)
+    return list(value)
+
+
+def copy_dict(value):
+    """
+    Copies a map whose values are immutable
+    """
+    return value if value is None or isinstance(value, FrozenDict) else dict(value)
+
+
+def _frozen(self, *args, **kwargs) -> NoReturn:
+    raise TypeError('%s is frozen' % type(self).__name__)
+
+
+class FrozenList(list):
+    """
+    Immutable list used for array fields of frozen records. Hash is computed once and cached.
+    """
+    __slots__ = ['_hash']
+
+    def __init__(self, iterable=()):
+        super(FrozenList, self).__init__(iterable)
+        self._hash = None
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self))
+        return self._hash
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen
+    append = extend = insert = pop = remove = clear = sort = reverse = _frozen
+
+
+class FrozenDict(dict):
+    """
+    Immutable dict used for map fields of frozen records. Hash is computed once and cached.
+    """
+    __slots__ = ['_hash']
+
+    def __init__(self, *args, **kwargs):
+        super(FrozenDict, self).__init__(*args, **kwargs)
+        self._hash = None
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(six.iteritems(self)))
+        return self._hash
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+    __setitem__ = __delitem__ = __ior__ = _frozen
+    pop = popitem = clear = update = setdefault = _frozen
+
+
+def freeze_value(value):
+    """
+    Returns an immutable, hashable equivalent of a field value: lists become FrozenList and dicts
+    become FrozenDict, recursively. Records and immutable values are returned as they are.
+    """
+    if isinstance(value, list):
+        if isinstance(value, FrozenList):
+            return value
+        return FrozenList(freeze_value(v) for v in value)
+    if isinstance(value, dict) and not isinstance(value, (DictWrapper, FrozenDict)):
+        return FrozenDict((k, freeze_value(v)) for k, v in six.iteritems(value))
+    return value
+
+
+class FrozenDictWrapper(DictWrapper):
+    """
+    Base class of frozen generated records. Generated constructors call _freeze() when they are done, after
+    which setters raise TypeError. Frozen records are hashable: the hash is computed on first use and cached,
+    and equality between frozen records compares hashes first.
+    """
+    __slots__ = ['_frozen', '_hash']
+
+    def __init__(self, inner_dict=None):
+        super(FrozenDictWrapper, self).__init__(inner_dict)
+        self._frozen = False
+        self._hash = None
+
+    def _check_mutable(self):
+        if self._frozen:
+            raise TypeError('%s is frozen' % type(self).__name__)
+
+    def _freeze(self):
+        inner_dict = self._inner_dict
+        for key, value in inner_dict.items():
+            inner_dict[key] = freeze_value(value)
+        self._frozen = True
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((type(self).__name__, tuple(self._inner_dict.items())))
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, FrozenDictWrapper) and hash(self) != hash(other):
+            return False
+        return super(FrozenDictWrapper, self).__eq__(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def copy(self: TC, deep=False) -> TC:
+        # Frozen records are immutable, so they can be shared instead of copied
+        return self
+
+    def __reduce__(self):
+        return type(self), (dict(self._inner_dict),)
+
+
+class CopyOnWriteDictWrapper(DictWrapper):
+    """
+    Base class of generated records with copy-on-write copies. A copy shares the wrapped dict and all nested
+    values with the original until either of them is modified: generated setters copy the wrapped dict before
+    the first write, and generated getters and the dict accessors take a private copy of fields listed in
+    MUTABLE_FIELDS (records, arrays, maps) before handing them out. Shallow and deep copies are the same, so
+    every copy is isolated from the others.
+    """
+    __slots__ = ['_shared', '_borrowed']
+
+    MUTABLE_FIELDS = frozenset()  # type: FrozenSet[str]
+
+    def __init__(self, inner_dict=None):
+        super(CopyOnWriteDictWrapper, self).__init__(inner_dict)
+        self._shared = False
+        self._borrowed = None
+
+    @classmethod
+    def _clone(cls: Type[TCOW], inner_dict) -> TCOW:
+        result = super(CopyOnWriteDictWrapper, cls)._clone(inner_dict)
+        result._shared = False
+        result._borrowed = None
+        return result
+
+    def copy(self: TCOW, deep=False) -> TCOW:
+        result = self._clone(self._inner_dict)
+        result._shared = self._shared = True
+        if self.MUTABLE_FIELDS:
+            result._borrowed = set(self.MUTABLE_FIELDS)
+            if self._borrowed is None:
+                self._borrowed = set(self.MUTABLE_FIELDS)
+            else:
+                self._borrowed.update(self.MUTABLE_FIELDS)
+        return result
+
+    def _unshare(self):
+        if self._shared:
+            self._inner_dict = self._inner_dict.copy()
+            self._shared = False
+
+    def _get_owned(self, key):
+        """
+        Returns a field value after making sure it is not shared with another copy
+        """
+        borrowed = self._borrowed
+        if borrowed is not None and key in borrowed:
+            self._unshare()
+            self._inner_dict[key] = copy_value(self._inner_dict.get(key))
+            borrowed.discard(key)
+            if not borrowed:
+                self._borrowed = None
+        return self._inner_dict.get(key)
+
+    def _own_all(self):
+        """
+        Takes private copies of all fields still shared with another copy
+        """
+        if self._borrowed is not None:
+            for key in list(self._borrowed):
+                self._get_owned(key)
+        return self._inner_dict
+
+    def __getitem__(self, item):
+        if self._borrowed is not None and item in self._borrowed:
+            return self._get_owned(item)
+        return super(CopyOnWriteDictWrapper, self).__getitem__(item)
+
+    def get(self, k, d=None):
+        if self._borrowed is not None and k in self._borrowed:
+            return self._get_owned(k)
+        return super(CopyOnWriteDictWrapper, self).get(k, d)
+
+    def items(self):
+        return self._own_all().items()
+
+    def values(self):
+        return self._own_all().values()
+
+    def _set(self, key, value):
+        if self._shared:
+            self._unshare()
+        if self._borrowed is not None:
+            self._borrowed.discard(key)
+        self._inner_dict[key] = value
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import struct
+
+import six
+
+CRC_64_AVRO = 'CRC-64-AVRO'
+MD5 = 'MD5'
+SHA_256 = 'SHA-256'
+
+_HASHLIB_NAMES = {
+    MD5: 'md5',
+    SHA_256: 'sha256',
+}
+
+EMPTY64 = 0xc15d213aa4d7a795
+
+
+def _make_fp_table():
+    table = []
+    for i in range(256):
+        fp = i
+        for _ in range(8):
+            fp = (fp >> 1) ^ (EMPTY64 & -(fp & 1))
+        table.append(fp)
+    return table
+
+
+_FP_TABLE = _make_fp_table()
+
+
+def crc64_avro(data):
+    """
+    Computes the 64-bit Rabin fingerprint defined by the Avro specification
+    :param bytes data:
+    :return int:
+    """
+    fp = EMPTY64
+    table = _FP_TABLE
+    for b in bytearray(data):
+        fp = (fp >> 8) ^ table[(fp ^ b) & 0xff]
+    return fp
+
+
+def _fullname(schema_):
+    return schema_.fullname.lstrip('.')
+
+
+def _write_canonical_form(schema_, names, out):
+    schema_type = schema_.type
+    if schema_type == 'error':
+        schema_type = 'record'
+
+    if schema_type in ('union', 'error_union'):
+        out.append('[')
+        for i, s in enumerate(schema_.schemas):
+            if i:
+                out.append(',')
+            _write_canonical_form(s, names, out)
+        out.append(']')
+    elif schema_type == 'array':
+        out.append('{"type":"array","items":')
+        _write_canonical_form(schema_.items, names, out)
+        out.append('}')
+    elif schema_type == 'map':
+        out.append('{"type":"map","values":')
+        _write_canonical_form(schema_.values, names, out)
+        out.append('}')
+    elif schema_type in ('record', 'enum', 'fixed'):
+        name = json.dumps(_fullname(schema_))
+        if name in names:
+            out.append(name)
+            return
+        names.add(name)
+        out.append('{"name":%s,"type":"%s"' % (name, schema_type))
+        if schema_type == 'record':
+            out.append(',"fields":[')
+            for i, field in enumerate(schema_.fields):
+                if i:
+                    out.append(',')
+                out.append('{"name":%s,"type":' % json.dumps(field.name))
+                _write_canonical_form(field.type, names, out)
+                out.append('}')
+            out.append(']')
+        elif schema_type == 'enum':
+            out.append(',"symbols":[%s]' % ','.join(json.dumps(s) for s in schema_.symbols))
+        else:
+            out.append(',"size":%d' % schema_.size)
+        out.append('}')
+    else:
+        out.append('"%s"' % schema_type)
+
+
+def parsing_canonical_form(schema_):
+    """
+    Returns Parsing Canonical Form of a schema as defined by the Avro specification
+    :param schema.Schema schema_:
+    :return str:
+    """
+    out = []
+    _write_canonical_form(schema_, set(), out)
+    return ''.join(out)
+
+
+def fingerprint(canonical_form, algorithm=CRC_64_AVRO):
+    """
+    Fingerprints Parsing Canonical Form of a schema
+    :param str canonical_form: Result of parsing_canonical_form()
+    :param str algorithm: One of CRC-64-AVRO, MD5, SHA-256
+    :return bytes: For CRC-64-AVRO, the 8 byte little-endian fingerprint used by single object encoding
+    """
+    data = canonical_form.encode('utf-8') if isinstance(canonical_form, six.text_type) else canonical_form
+    if algorithm == CRC_64_AVRO:
+        return struct.pack('<Q', crc64_avro(data))
+    if algorithm not in _HASHLIB_NAMES:
+        raise ValueError('Unknown fingerprint algorithm: %r' % algorithm)
+    return hashlib.new(_HASHLIB_NAMES[algorithm], data).digest()
+
+
+def schema_fingerprint(schema_, algorithm=CRC_64_AVRO):
+    return fingerprint(parsing_canonical_form(schema_), algorithm)
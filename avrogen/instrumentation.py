@@ -0,0 +1,134 @@
+import threading
+import time
+
+from avro import schema
+
+from .weak_cache import SchemaWeakCache
+
+COUNTER_NAMES = ('calls', 'datums', 'time', 'union_probes', 'logical_conversions')
+
+_RECORD_TYPES = ('record', 'error', 'request')
+_UNION_TYPES = ('union', 'error_union')
+
+
+def schema_key(schema_):
+    """
+    Name counters of schemas outside records are kept under: the full name of named schemas, the logical type of
+    schemas that have one and the type otherwise
+    :param schema.Schema schema_:
+    :return str:
+    """
+    if isinstance(schema_, schema.NamedSchema):
+        return schema_.fullname.lstrip('.')
+    return schema_.props.get('logicalType') or schema_.type
+
+
+class SchemaCounters(object):
+    """
+    Counters of a single schema name or field path:
+
+    calls: top-level conversions, reads and writes of the schema
+    datums: records converted, read or written, including nested ones
+    time: cumulative seconds spent in top-level calls
+    union_probes: validations of branch candidates of the union, when the branch is not known up front
+    logical_conversions: values converted to or from a logical type
+    """
+
+    __slots__ = COUNTER_NAMES
+
+    def __init__(self):
+        self.calls = 0
+        self.datums = 0
+        self.time = 0.0
+        self.union_probes = 0
+        self.logical_conversions = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in COUNTER_NAMES}
+
+
+class Instrumentation(object):
+    """
+    Collects per-schema counters from converters, readers and writers it is passed to. Instrumentation is
+    disabled by default, in which case the instrumented code only checks for None.
+
+    Named schemas are counted under their full name. Unnamed schemas of record fields are counted under the
+    field path, e.g. org.sample.Event.day, followed by [] for array items and {} for map values; branches of a
+    union share the path of the union. Other unnamed schemas are counted under their logical type or type.
+
+    Counters are updated without locking, so they are approximate when several threads share an instance.
+
+    :param clock: Function returning the current time in seconds
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._counters = {}
+        self._by_schema = SchemaWeakCache()
+        self._paths = SchemaWeakCache()
+        self._lock = threading.Lock()
+
+    def counters(self, schema_):
+        """
+        Returns the counters of the schema's name or field path, creating them on first use
+        :param schema.Schema schema_:
+        :return SchemaCounters:
+        """
+        counters = self._by_schema.get(schema_)
+        if counters is None:
+            key = self._paths.get(schema_) or schema_key(schema_)
+            with self._lock:
+                counters = self._counters.get(key)
+                if counters is None:
+                    counters = self._counters[key] = SchemaCounters()
+            self._by_schema.set(schema_, counters)
+            if schema_.type in _RECORD_TYPES:
+                # Records are counted before their fields are converted, read or written
+                for field in schema_.fields:
+                    self._add_path(field.type, key + '.' + field.name)
+        return counters
+
+    def _add_path(self, schema_, path):
+        """
+        Keys the counters of an unnamed schema of a record field, and of the unnamed schemas nested in it, by path
+        """
+        if isinstance(schema_, schema.NamedSchema) or schema_ in self._paths:
+            return
+        self._paths.set(schema_, path)
+        if schema_.type == 'array':
+            self._add_path(schema_.items, path + '[]')
+        elif schema_.type == 'map':
+            self._add_path(schema_.values, path + '{}')
+        elif schema_.type in _UNION_TYPES:
+            for branch in schema_.schemas:
+                self._add_path(branch, path)
+
+    def record_call(self, schema_, started):
+        counters = self.counters(schema_)
+        counters.calls += 1
+        counters.time += self.clock() - started
+
+    def record_datum(self, schema_):
+        self.counters(schema_).datums += 1
+
+    def record_union_probe(self, schema_):
+        self.counters(schema_).union_probes += 1
+
+    def record_logical_conversion(self, schema_, count=1):
+        self.counters(schema_).logical_conversions += count
+
+    def snapshot(self):
+        """
+        Returns a copy of all counters
+        :return dict[str, dict[str, int|float]]: Counters by schema name or field path
+        """
+        with self._lock:
+            return {key: counters.as_dict() for key, counters in self._counters.items()}
+
+    def reset(self):
+        """
+        Sets all counters back to zero
+        """
+        with self._lock:
+            self._counters = {}
+            self._by_schema = SchemaWeakCache()
@@ -0,0 +1,303 @@
+import numbers
+import threading
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import six
+from avro import io
+from json.encoder import encode_basestring_ascii
+
+from . import avrojson
+from . import numeric_arrays
+from . import validation
+from .weak_cache import CompiledSchemaCache
+
+_MISSING = object()
+_INFINITY = float('inf')
+
+
+def _float_text(value):
+    if value != value:
+        return 'NaN'
+    if value == _INFINITY:
+        return 'Infinity'
+    if value == -_INFINITY:
+        return '-Infinity'
+    return float.__repr__(float(value))
+
+
+def _null(value, parts):
+    parts.append('null')
+
+
+def _boolean(value, parts):
+    parts.append('true' if value else 'false')
+
+
+def _integer(value, parts):
+    # bool passes int validation, and json.dumps writes it as true or false
+    if value is True or value is False:
+        parts.append('true' if value else 'false')
+    else:
+        # int() also takes the numpy integer scalars convert_many returns for arrays
+        parts.append(str(int(value)))
+
+
+def _float(value, parts):
+    # Ints are valid floats and doubles, and json.dumps writes them without a fraction
+    if isinstance(value, numbers.Integral):
+        _integer(value, parts)
+    else:
+        parts.append(_float_text(value))
+
+
+def _string(value, parts):
+    parts.append(encode_basestring_ascii(value))
+
+
+def _bytes(value, parts):
+    # Avro JSON encoding maps every byte to the code point of the same value
+    parts.append(encode_basestring_ascii(value.decode('latin-1')))
+
+
+_PRIMITIVE_ENCODERS = {
+    'null': _null,
+    'boolean': _boolean,
+    'int': _integer,
+    'long': _integer,
+    'float': _float,
+    'double': _float,
+    'string': _string,
+    'enum': _string,
+    'bytes': _bytes,
+    'fixed': _bytes,
+}
+
+
+def _union_branch_name(schema_):
+    fullname = getattr(schema_, 'fullname', None)
+    return fullname.lstrip('.') if fullname else schema_.type
+
+
+class JsonTextEncoders(object):
+    """
+    Compiles schemas into functions which append compact JSON text of a datum to a list of string parts, in one
+    pass over the data and without building intermediate dicts. The text is what json.dumps would produce for
+    AvroJsonConverter.to_json_object output with separators=(',', ':'), except that bytes and fixed values are
+    written as strings following the Avro JSON encoding. Compiled functions are cached per schema object.
+
+    :param avrojson.AvroJsonConverter converter: Converter whose logical types to follow
+    :param bool tuples: Write unions as ["type", value] instead of {"type": value}
+    """
+
+    def __init__(self, converter, tuples=False):
+        self.converter = converter
+        self.logical_types = converter.logical_types if converter.use_logical_types else {}
+        self.tuples = tuples
+        self._validators = validation.get_validators(self.logical_types or None)
+        self._encoders = CompiledSchemaCache(self._compile)
+
+    def get(self, schema_):
+        return self._encoders.get(schema_)
+
+    def _compile(self, schema_):
+        logical_type = schema_.props.get('logicalType') if self.logical_types else None
+        if logical_type:
+            lt = self.logical_types.get(logical_type)
+            if lt is not None and lt.can_convert(schema_):
+                return self._compile_logical(schema_, lt)
+
+        schema_type = schema_.type
+        if schema_type in _PRIMITIVE_ENCODERS:
+            return _PRIMITIVE_ENCODERS[schema_type]
+        elif schema_type == 'array':
+            return self._compile_array(schema_)
+        elif schema_type == 'map':
+            return self._compile_map(schema_)
+        elif schema_type in ('union', 'error_union'):
+            return self._compile_union(schema_)
+        elif schema_type in ('record', 'error', 'request'):
+            return self._compile_record(schema_)
+        raise ValueError('Invalid schema type: %s' % schema_type)
+
+    def _compile_logical(self, schema_, lt):
+        encode = _PRIMITIVE_ENCODERS[schema_.type]
+
+        def encode_logical(value, parts):
+            encode(lt.convert(schema_, value), parts)
+
+        return encode_logical
+
+    def _compile_array(self, schema_):
+        items_schema = schema_.items
+        logical_type = items_schema.props.get('logicalType') if self.logical_types else None
+        lt = self.logical_types.get(logical_type) if logical_type else None
+        if lt is not None and lt.can_convert(items_schema) and items_schema.type in _PRIMITIVE_ENCODERS:
+            encode = _PRIMITIVE_ENCODERS[items_schema.type]
+
+            def encode_logical_array(value, parts):
+                parts.append('[')
+                for i, item in enumerate(lt.convert_many(items_schema, value)):
+                    if i:
+                        parts.append(',')
+                    encode(item, parts)
+                parts.append(']')
+
+            return encode_logical_array
+
+        items = self.get(items_schema)
+        numeric = items_schema.type in numeric_arrays.TYPECODES
+
+        def encode_array(value, parts):
+            if numeric and numeric_arrays.is_compact(value):
+                value = value.tolist()
+            parts.append('[')
+            first = True
+            for item in value:
+                if first:
+                    first = False
+                else:
+                    parts.append(',')
+                items(item, parts)
+            parts.append(']')
+
+        return encode_array
+
+    def _compile_map(self, schema_):
+        values = self.get(schema_.values)
+
+        def encode_map(value, parts):
+            parts.append('{')
+            first = True
+            for key, item in six.iteritems(value):
+                if first:
+                    first = False
+                else:
+                    parts.append(',')
+                parts.append(encode_basestring_ascii(key))
+                parts.append(':')
+                values(item, parts)
+            parts.append('}')
+
+        return encode_map
+
+    def _compile_union(self, schema_):
+        branches = []
+        for s in schema_.schemas:
+            name = _union_branch_name(s)
+            if self.tuples:
+                prefix, suffix = '[' + encode_basestring_ascii(name) + ',', ']'
+            else:
+                prefix, suffix = '{' + encode_basestring_ascii(name) + ':', '}'
+            branches.append((getattr(s, 'namespace', None), getattr(s, 'name', None), s.type,
+                             self._validators.get(s), self.get(s), prefix, suffix))
+
+        def encode_union(value, parts):
+            # Same branch selection as AvroJsonConverter._union_to_json
+            selected = None
+            value_schema = getattr(type(value), 'RECORD_SCHEMA', None)
+            for branch in branches:
+                if value_schema is not None and branch[0] == value_schema.namespace and \
+                        branch[1] == value_schema.name:
+                    selected = branch
+                    break
+                if branch[3](value):
+                    selected = branch
+                    if branch[2] == 'boolean':
+                        break
+            if selected is None:
+                raise io.AvroTypeException(schema_, value)
+            if selected[2] == 'null':
+                parts.append('null')
+                return
+            parts.append(selected[5])
+            selected[4](value, parts)
+            parts.append(selected[6])
+
+        return encode_union
+
+    def _compile_record(self, schema_):
+        fields = tuple((field, ('{' if i == 0 else ',') + encode_basestring_ascii(field.name) + ':',
+                        self.get(field.type))
+                       for i, field in enumerate(schema_.fields))
+
+        def encode_record(value, parts):
+            get = value.get
+            for field, key, encode in fields:
+                field_value = get(field.name, _MISSING)
+                if field_value is _MISSING:
+                    field_value = self.converter.from_json_object(field.default, field.type) \
+                        if field.has_default else None
+                parts.append(key)
+                encode(field_value, parts)
+            parts.append('}' if fields else '{}')
+
+        return encode_record
+
+
+_SHARED = {}  # type: Dict[Tuple[Optional[FrozenSet], bool], JsonTextEncoders]
+_SHARED_LOCK = threading.Lock()
+
+
+def get_encoders(converter, tuples=False):
+    """
+    Returns process-wide JsonTextEncoders for converters with the same logical types and union style. Logical
+    types are compared by value, and the shared encoders convert defaults with a converter of their own, so
+    they keep no generated package alive.
+    :param avrojson.AvroJsonConverter converter:
+    :param bool tuples: Write unions as ["type", value] instead of {"type": value}
+    :return JsonTextEncoders:
+    """
+    logical_types = converter.logical_types if converter.use_logical_types else None
+    key = (validation.logical_types_key(logical_types), bool(tuples))
+    encoders = _SHARED.get(key)
+    if encoders is None:
+        with _SHARED_LOCK:
+            encoders = _SHARED.get(key)
+            if encoders is None:
+                defaults_converter = avrojson.AvroJsonConverter(use_logical_types=bool(logical_types),
+                                                                logical_types=logical_types)
+                encoders = _SHARED[key] = JsonTextEncoders(defaults_converter, tuples)
+    return encoders
+
+
+def to_json_str(record, tuples=False):
+    """
+    Serializes a generated record to compact JSON text
+    :param dict_wrapper.DictWrapper record:
+    :param bool tuples: Write unions as ["type", value] instead of {"type": value}
+    :return str:
+    """
+    parts = []
+    _append_record(record, tuples, parts)
+    return ''.join(parts)
+
+
+def _append_record(record, tuples, parts):
+    converter = record._get_json_converter()
+    schema_ = record.RECORD_SCHEMA
+    if not converter.validation_policy.check(converter._validator(schema_), schema_, record):
+        raise io.AvroTypeException(schema_, record)
+    get_encoders(converter, tuples).get(schema_)(record, parts)
+
+
+def write_ndjson(fo, records, tuples=False, batch_size=1000):
+    """
+    Writes generated records to a text file object as newline delimited JSON, one record per line
+    :param fo: Text file object
+    :param records: Iterable of generated records, possibly of different classes
+    :param bool tuples: Write unions as ["type", value] instead of {"type": value}
+    :param int batch_size: Number of records joined into a single write
+    :return int: Number of records written
+    """
+    parts = []
+    count = 0
+    for record in records:
+        _append_record(record, tuples, parts)
+        parts.append('\n')
+        count += 1
+        if count % batch_size == 0:
+            fo.write(''.join(parts))
+            parts = []
+    if parts:
+        fo.write(''.join(parts))
+    return count
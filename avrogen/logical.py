@@ -1,28 +1,112 @@
 from __future__ import division
 from avro import schema, io
-import functools
 import abc
+import binascii
 import six
 import collections
 import frozendict
 import datetime
 import decimal
 import struct
-import time
 import pytz
 import tzlocal
 
+from . import numeric_arrays
+from . import resolution
+from . import validation
+from .weak_cache import SchemaWeakCache
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
 if six.PY3:
     long = int
 
+_UNRESOLVED = object()
+
 EPOCH_DATE = datetime.date(1970, 1, 1)
 SECONDS_IN_DAY = 24 * 60 * 60
 
-# below doesn't work for time zones which are ahead of UTC,
-# so will need to switch to datetime arithmetic
-#EPOCH_TT = time.mktime((1970, 1, 1, 0, 0, 0, 0, 0, 0))
+EPOCH_ORDINAL = EPOCH_DATE.toordinal()
+EPOCH_DATETIME = datetime.datetime(1970, 1, 1)
+EPOCH_DATETIME_UTC = datetime.datetime(1970, 1, 1, tzinfo=pytz.UTC)
+
+# python 2 decimals have no precision limit constant
+_MAX_PREC = getattr(decimal, 'MAX_PREC', 999999999999999999)
+_EXACT_CONTEXT = decimal.Context(prec=_MAX_PREC)
+
+_LOCAL_TIMEZONE = []  # type: list
+
+
+def local_timezone():
+    """
+    Resolves local time zone once per process
+    """
+    if not _LOCAL_TIMEZONE:
+        _LOCAL_TIMEZONE.append(tzlocal.get_localzone())
+    return _LOCAL_TIMEZONE[0]
+
+
+def _localize(tz, value):
+    # pytz zones need localize() to pick the right DST offset, zoneinfo zones work with replace()
+    if hasattr(tz, 'localize'):
+        return tz.localize(value)
+    return value.replace(tzinfo=tz)
+
+
+def _total_microseconds(delta):
+    # timedelta // timedelta is not available on python 2
+    return (delta.days * SECONDS_IN_DAY + delta.seconds) * 1000000 + delta.microseconds
+
+
+# Offset of the local time zone at the epoch in seconds, kept for code which used it for its own conversions
+EPOCH_TT = -_localize(local_timezone(), EPOCH_DATETIME).utcoffset().total_seconds()
+
+
+def _processor_for(logical_types, schema_):
+    """
+    Looks up the logical type processor registered for a schema's logicalType, None when there is none
+    :param dict[str, LogicalTypeProcessor] logical_types:
+    :param schema.Schema schema_:
+    :return LogicalTypeProcessor:
+    """
+    logical_type = schema_.props.get('logicalType')
+    return logical_types.get(logical_type) if logical_type else None
+
+
+def _int_to_bytes(value, size):
+    """
+    Big-endian two's complement encoding of an integer, int.to_bytes is not available on python 2
+    :param int value:
+    :param int size: Number of bytes
+    :return bytes:
+    """
+    bits = size * 8
+    if not -(1 << (bits - 1)) <= value < (1 << (bits - 1)):
+        raise OverflowError('int too big to convert')
+    if value < 0:
+        value += 1 << bits
+    return binascii.unhexlify('%0*x' % (size * 2, value))
+
+
+def _int_from_bytes(data):
+    """
+    Decodes a big-endian two's complement integer, int.from_bytes is not available on python 2
+    :param bytes data:
+    :return int:
+    """
+    if not data:
+        return 0
+    value = int(binascii.hexlify(data), 16)
+    if bytearray(data[:1])[0] & 0x80:
+        value -= 1 << (len(data) * 8)
+    return value
+
 
-EPOCH_TT = -datetime.datetime(1970, 1, 1).astimezone(tzlocal.get_localzone()).utcoffset().total_seconds()
+def _is_array_of(values, kinds):
+    return numpy is not None and isinstance(values, numpy.ndarray) and values.dtype.kind in kinds
 
 
 class LogicalTypeProcessor(object, six.with_metaclass(abc.ABCMeta)):
@@ -54,10 +138,64 @@ class LogicalTypeProcessor(object, six.with_metaclass(abc.ABCMeta)):
     def initializer(self, value=None):
         pass
 
+    def field_initializer(self, field_schema_expr, value=None):
+        """
+        Returns python code initializing a generated field of this logical type
+
+        :param str field_schema_expr: Expression evaluating to the field's schema in generated code
+        :param str value: Expression evaluating to the field's JSON default, if there is one
+        :return str:
+        """
+        return self.initializer(value)
+
+    def convert_many(self, writers_schema, values):
+        """
+        Converts a batch of values. Processors with NumPy support return an array when given an array,
+        other inputs are converted one by one into a list.
+
+        :param schema.Schema writers_schema:
+        :param values: Iterable or numpy.ndarray of values
+        """
+        return [self.convert(writers_schema, v) for v in values]
+
+    def convert_back_many(self, writers_schema, readers_schema, values):
+        """
+        Batch counterpart of convert_back, see convert_many
+        """
+        return [self.convert_back(writers_schema, readers_schema, v) for v in values]
+
 
 class DecimalLogicalTypeProcessor(LogicalTypeProcessor):
+    """
+    Decimal logical type. Supports string encoding as well as the standard two's complement
+    bytes/fixed encoding with precision and scale.
+    """
+    _binary_types = {'bytes', 'fixed'}
+
+    def __init__(self):
+        self._formats = SchemaWeakCache()
+
+    def _get_format(self, writers_schema):
+        """
+        Returns (scale, 10 ** scale, fixed size, quantization exponent, context, 10 ** precision) for a binary
+        decimal schema, computed once per schema object. The last item is None when the schema sets no precision.
+        :param schema.Schema writers_schema:
+        :return tuple:
+        """
+        fmt = self._formats.get(writers_schema)
+        if fmt is None:
+            scale = int(writers_schema.props.get('scale', 0))
+            precision = writers_schema.props.get('precision')
+            size = writers_schema.size if isinstance(writers_schema, schema.FixedSchema) else None
+            context = decimal.Context(prec=_MAX_PREC if precision is None else int(precision),
+                                      rounding=decimal.ROUND_HALF_EVEN)
+            fmt = self._formats.set(writers_schema, (scale, 10 ** scale, size, decimal.Decimal(1).scaleb(-scale),
+                                                     context, None if precision is None else 10 ** int(precision)))
+        return fmt
+
     def can_convert(self, writers_schema):
-        return isinstance(writers_schema, schema.PrimitiveSchema) and writers_schema.type == 'string'
+        return (isinstance(writers_schema, schema.PrimitiveSchema) and writers_schema.type in ('string', 'bytes')) \
+               or isinstance(writers_schema, schema.FixedSchema)
 
     def validate(self, expected_schema, datum):
         return isinstance(datum, (int, float, long, decimal.Decimal))
@@ -65,16 +203,40 @@ class DecimalLogicalTypeProcessor(LogicalTypeProcessor):
     def convert(self, writers_schema, value):
         if not isinstance(value, (int, float, long, decimal.Decimal)):
             raise Exception('Wrong type for decimal conversion')
-        return str(value)
+        if writers_schema.type not in DecimalLogicalTypeProcessor._binary_types:
+            return str(value)
+
+        scale, factor, size, exponent, context, limit = self._get_format(writers_schema)
+        if isinstance(value, (int, long)):
+            unscaled = value * factor
+            # Same precision check as quantize() does for decimals
+            if limit is not None and not -limit < unscaled < limit:
+                raise decimal.InvalidOperation([decimal.InvalidOperation])
+        else:
+            if not isinstance(value, decimal.Decimal):
+                value = decimal.Decimal(repr(value))
+            unscaled = int(value.quantize(exponent, context=context).scaleb(scale, context))
+
+        if size is None:
+            size = ((unscaled if unscaled >= 0 else ~unscaled).bit_length() + 8) // 8
+        return _int_to_bytes(unscaled, size)
 
     def convert_back(self, writers_schema, readers_schema, value):
-        return decimal.Decimal(value)
+        writers_schema = writers_schema or readers_schema
+        if writers_schema is None or writers_schema.type not in DecimalLogicalTypeProcessor._binary_types:
+            return decimal.Decimal(value)
+
+        if isinstance(value, six.text_type):
+            # JSON encoded defaults represent bytes as unicode code points
+            value = value.encode('latin-1')
+        scale = self._get_format(writers_schema)[0]
+        return decimal.Decimal(_int_from_bytes(value)).scaleb(-scale, _EXACT_CONTEXT)
 
     def does_match(self, writers_schema, readers_schema):
         if isinstance(writers_schema, schema.PrimitiveSchema):
-            if writers_schema.type == 'string':
+            if writers_schema.type in ('string', 'bytes'):
                 return True
-        return False
+        return isinstance(writers_schema, schema.FixedSchema)
 
     def typename(self):
         return 'decimal.Decimal'
@@ -82,6 +244,11 @@ class DecimalLogicalTypeProcessor(LogicalTypeProcessor):
     def initializer(self, value=None):
         return 'decimal.Decimal(%s)' % (0 if value is None else value)
 
+    def field_initializer(self, field_schema_expr, value=None):
+        if value is None:
+            return self.initializer()
+        return 'logical.DECIMAL_PROCESSOR.convert_back(%s, None, %s)' % (field_schema_expr, value)
+
 
 class DateLogicalTypeProcessor(LogicalTypeProcessor):
     _matching_types = {'int', 'long', 'float', 'double'}
@@ -95,10 +262,20 @@ class DateLogicalTypeProcessor(LogicalTypeProcessor):
     def convert(self, writers_schema, value):
         if not isinstance(value, datetime.date):
             raise Exception("Wrong type for date conversion")
-        return (value - EPOCH_DATE).total_seconds() // SECONDS_IN_DAY
+        return value.toordinal() - EPOCH_ORDINAL
 
     def convert_back(self, writers_schema, readers_schema, value):
-        return EPOCH_DATE + datetime.timedelta(days=int(value))
+        return datetime.date.fromordinal(int(value) + EPOCH_ORDINAL)
+
+    def convert_many(self, writers_schema, values):
+        if _is_array_of(values, 'M'):
+            return values.astype('datetime64[D]').astype(numpy.int32)
+        return super(DateLogicalTypeProcessor, self).convert_many(writers_schema, values)
+
+    def convert_back_many(self, writers_schema, readers_schema, values):
+        if _is_array_of(values, 'iu'):
+            return values.astype('datetime64[D]')
+        return super(DateLogicalTypeProcessor, self).convert_back_many(writers_schema, readers_schema, values)
 
     def does_match(self, writers_schema, readers_schema):
         if isinstance(writers_schema, schema.PrimitiveSchema):
@@ -117,6 +294,8 @@ class DateLogicalTypeProcessor(LogicalTypeProcessor):
 
 class TimeMicrosLogicalTypeProcessor(LogicalTypeProcessor):
     _matching_types = {'int', 'long', 'float', 'double'}
+    _unit = 'us'
+    _dtype = 'int64'
 
     def can_convert(self, writers_schema):
         return isinstance(writers_schema, schema.PrimitiveSchema) and writers_schema.type == 'long'
@@ -133,17 +312,29 @@ class TimeMicrosLogicalTypeProcessor(LogicalTypeProcessor):
         _, hours, minutes, seconds, microseconds = TimeMicrosLogicalTypeProcessor.extract_time_parts(value)
         return datetime.time(hours, minutes, seconds, microseconds)
 
+    def convert_many(self, writers_schema, values):
+        """
+        Accepts numpy.timedelta64 arrays holding time since midnight
+        """
+        if _is_array_of(values, 'm'):
+            return values.astype('timedelta64[%s]' % self._unit).astype(self._dtype)
+        return super(TimeMicrosLogicalTypeProcessor, self).convert_many(writers_schema, values)
+
+    def convert_back_many(self, writers_schema, readers_schema, values):
+        """
+        Integer arrays are returned as numpy.timedelta64 arrays holding time since midnight, as numpy has no time of
+        day type; other inputs are converted one by one into a list of datetime.time
+        """
+        if _is_array_of(values, 'iu'):
+            return values.astype('timedelta64[%s]' % self._unit)
+        return super(TimeMicrosLogicalTypeProcessor, self).convert_back_many(writers_schema, readers_schema, values)
+
     @staticmethod
     def extract_time_parts(value):
-        value = long(value)
-        days = value // 86400000000
-        hours = value % 86400000000
-        minutes = hours % 3600000000
-        hours = hours // 3600000000
-        seconds = minutes % 60000000
-        minutes = minutes // 60000000
-        microseconds = seconds % 1000000
-        seconds = seconds // 1000000
+        days, value = divmod(long(value), 86400000000)
+        hours, value = divmod(value, 3600000000)
+        minutes, value = divmod(value, 60000000)
+        seconds, microseconds = divmod(value, 1000000)
         return days, hours, minutes, seconds, microseconds
 
     def does_match(self, writers_schema, readers_schema):
@@ -162,16 +353,20 @@ class TimeMicrosLogicalTypeProcessor(LogicalTypeProcessor):
 
 
 class TimeMillisLogicalTypeProcessor(TimeMicrosLogicalTypeProcessor):
+    _unit = 'ms'
+    _dtype = 'int32'
+
     def can_convert(self, writers_schema):
         return isinstance(writers_schema, schema.PrimitiveSchema) and writers_schema.type == 'int'
 
     def convert(self, writers_schema, value):
         if not isinstance(value, datetime.time):
             raise Exception('Wrong type for time conversion')
-        return int(super(TimeMillisLogicalTypeProcessor, self).convert(writers_schema, value) // 1000)
+        return super(TimeMillisLogicalTypeProcessor, self).convert(writers_schema, value) // 1000
 
     def convert_back(self, writers_schema, readers_schema, value):
-        return super(TimeMillisLogicalTypeProcessor, self).convert_back(writers_schema, readers_schema, value * 1000)
+        return super(TimeMillisLogicalTypeProcessor, self).convert_back(writers_schema, readers_schema,
+                                                                        long(value) * 1000)
 
     def initializer(self, value=None):
         return ((
@@ -181,6 +376,15 @@ class TimeMillisLogicalTypeProcessor(TimeMicrosLogicalTypeProcessor):
 
 class TimestampMicrosLogicalTypeProcessor(LogicalTypeProcessor):
     _matching_types = {'int', 'long', 'float', 'double'}
+    _unit = 'us'
+
+    def __init__(self, utc=False):
+        """
+        :param bool utc: Treat naive datetimes as UTC and return naive UTC datetimes instead of converting
+                         through the local time zone
+        """
+        self.utc = utc
+        self._tz = None if utc else local_timezone()
 
     def can_convert(self, writers_schema):
         return isinstance(writers_schema, schema.PrimitiveSchema) and writers_schema.type == 'long'
@@ -190,19 +394,46 @@ class TimestampMicrosLogicalTypeProcessor(LogicalTypeProcessor):
 
     def convert(self, writers_schema, value):
         if not isinstance(value, datetime.datetime):
-            if isinstance(value, datetime.date):
-                value = tzlocal.get_localzone().localize(
-                    datetime.datetime(value.year, value.month, value.day, 0, 0, 0, 0))
+            if not isinstance(value, datetime.date):
+                raise Exception('Wrong type for timestamp conversion')
+            value = datetime.datetime(value.year, value.month, value.day)
 
         if value.tzinfo is None:
-            value = tzlocal.get_localzone().localize(value)
-        value = (time.mktime(value.utctimetuple()) - EPOCH_TT) + value.microsecond / 1000000.0
-        return long(value * 1000000)
+            if self.utc:
+                return _total_microseconds(value - EPOCH_DATETIME)
+            value = _localize(self._tz, value)
+        return _total_microseconds(value - EPOCH_DATETIME_UTC)
 
     def convert_back(self, writers_schema, readers_schema, value):
-        value = long(value) / 1000000.0
-        utc = datetime.datetime.utcfromtimestamp(value).replace(tzinfo=pytz.UTC)
-        return utc.astimezone(tzlocal.get_localzone()).replace(tzinfo=None)
+        if self.utc:
+            return EPOCH_DATETIME + datetime.timedelta(microseconds=long(value))
+        utc = EPOCH_DATETIME_UTC + datetime.timedelta(microseconds=long(value))
+        return utc.astimezone(self._tz).replace(tzinfo=None)
+
+    def convert_many(self, writers_schema, values):
+        """
+        Accepts numpy.datetime64 arrays, which carry no time zone and are treated like naive datetimes: as UTC in a
+        single vectorized operation when utc is set, otherwise as local time one by one
+        """
+        if _is_array_of(values, 'M'):
+            if self.utc:
+                return values.astype('datetime64[%s]' % self._unit).astype(numpy.int64)
+            return numpy.array([self.convert(writers_schema, v) for v in values.astype('datetime64[us]').tolist()],
+                               dtype=numpy.int64)
+        return super(TimestampMicrosLogicalTypeProcessor, self).convert_many(writers_schema, values)
+
+    def convert_back_many(self, writers_schema, readers_schema, values):
+        """
+        Integer arrays are returned as numpy.datetime64 arrays of naive datetimes, in UTC when utc is set, otherwise
+        in local time
+        """
+        if _is_array_of(values, 'iu'):
+            if self.utc:
+                return values.astype(numpy.int64).astype('datetime64[%s]' % self._unit)
+            return numpy.array([self.convert_back(writers_schema, readers_schema, v) for v in values.tolist()],
+                               dtype='datetime64[%s]' % self._unit)
+        return super(TimestampMicrosLogicalTypeProcessor, self).convert_back_many(writers_schema, readers_schema,
+                                                                                  values)
 
     def does_match(self, writers_schema, readers_schema):
         if isinstance(writers_schema, schema.PrimitiveSchema):
@@ -213,28 +444,30 @@ class TimestampMicrosLogicalTypeProcessor(LogicalTypeProcessor):
     def typename(self):
         return 'datetime.datetime'
 
+    def _constructor(self):
+        return 'logical.%s(%s)' % (type(self).__name__, 'utc=True' if self.utc else '')
+
     def initializer(self, value=None):
-        return ((
-                    'logical.TimestampMicrosLogicalTypeProcessor().convert_back(None, None, %s)' % value) if value is not None
-                else 'datetime.datetime.now()')
+        if value is not None:
+            return '%s.convert_back(None, None, %s)' % (self._constructor(), value)
+        return 'datetime.datetime.utcnow()' if self.utc else 'datetime.datetime.now()'
 
 
 class TimestampMillisLogicalTypeProcessor(TimestampMicrosLogicalTypeProcessor):
+    _unit = 'ms'
+
     def convert(self, writers_schema, value):
         return super(TimestampMillisLogicalTypeProcessor, self).convert(writers_schema, value) // 1000
 
     def convert_back(self, writers_schema, readers_schema, value):
         return super(TimestampMillisLogicalTypeProcessor, self).convert_back(writers_schema, readers_schema,
-                                                                             value * 1000)
+                                                                             long(value) * 1000)
 
-    def initializer(self, value=None):
-        return ((
-                    'logical.TimestampMillisLogicalTypeProcessor().convert_back(None, None, %s)' % value) if value is not None
-                else 'datetime.datetime.now()')
 
+DECIMAL_PROCESSOR = DecimalLogicalTypeProcessor()
 
 DEFAULT_LOGICAL_TYPES = frozendict.frozendict(**{
-    'decimal': DecimalLogicalTypeProcessor(),
+    'decimal': DECIMAL_PROCESSOR,
     'date': DateLogicalTypeProcessor(),
     'time-millis': TimeMillisLogicalTypeProcessor(),
     'time-micros': TimeMicrosLogicalTypeProcessor(),
@@ -242,18 +475,50 @@ DEFAULT_LOGICAL_TYPES = frozendict.frozendict(**{
     'timestamp-micros': TimestampMicrosLogicalTypeProcessor(),
 })
 
+UTC_LOGICAL_TYPES = frozendict.frozendict(DEFAULT_LOGICAL_TYPES, **{
+    'timestamp-millis': TimestampMillisLogicalTypeProcessor(utc=True),
+    'timestamp-micros': TimestampMicrosLogicalTypeProcessor(utc=True),
+})
+
 
-class LogicalDatumReader(io.DatumReader):
-    def __init__(self, writers_schema=None, readers_schema=None, logical_types=DEFAULT_LOGICAL_TYPES):
+class LogicalDatumReader(resolution.PlannedDatumReader):
+    def __init__(self, writers_schema=None, readers_schema=None, logical_types=DEFAULT_LOGICAL_TYPES,
+                 instrumentation=None):
         """
         Initializes DatumReader with logical type support
 
         :param schema.Schema writers_schema: Writer's schema
         :param schema.Schema readers_schema: Optional reader's schema
         :param dict[str, LogicalTypeProcessor] logical_types: Optional logical types dict
+        :param instrumentation.Instrumentation instrumentation: Optional per-schema counters
         """
-        super(LogicalDatumReader, self).__init__(writers_schema=writers_schema, readers_schema=readers_schema)
+        super(LogicalDatumReader, self).__init__(writers_schema, readers_schema)
         self.logical_types = logical_types or {}
+        self.instrumentation = instrumentation
+        self._handlers = SchemaWeakCache()
+
+    def read(self, decoder):
+        if self.instrumentation is None:
+            return super(LogicalDatumReader, self).read(decoder)
+        started = self.instrumentation.clock()
+        result = super(LogicalDatumReader, self).read(decoder)
+        self.instrumentation.record_call(self.reader_schema, started)
+        return result
+
+    def read_record(self, writers_schema, readers_schema, decoder):
+        if self.instrumentation is not None:
+            self.instrumentation.record_datum(readers_schema)
+        return super(LogicalDatumReader, self).read_record(writers_schema, readers_schema, decoder)
+
+    def _resolve_handler(self, readers_schema):
+        """
+        Resolves logical type processor for the reader's schema once and caches it along with a cache of whether
+        it matches each writer's schema, None when there is no processor
+        :param schema.Schema readers_schema:
+        :return tuple[LogicalTypeProcessor, SchemaWeakCache]:
+        """
+        handler = _processor_for(self.logical_types, readers_schema)
+        return self._handlers.set(readers_schema, None if handler is None else (handler, SchemaWeakCache()))
 
     def read_data(self, writers_schema, readers_schema, decoder):
         """
@@ -264,12 +529,21 @@ class LogicalDatumReader(io.DatumReader):
         :param io.BinaryDecoder decoder:
         :return:
         """
+        entry = self._handlers.get(readers_schema, _UNRESOLVED)
+        if entry is _UNRESOLVED:
+            entry = self._resolve_handler(readers_schema)
+        if entry is None:
+            return super(LogicalDatumReader, self).read_data(writers_schema, readers_schema, decoder)
+
+        handler, matches = entry
         result = super(LogicalDatumReader, self).read_data(writers_schema, readers_schema, decoder)
-        logical_type = readers_schema.props.get('logicalType')
-        if logical_type:
-            logical_type_handler = self.logical_types.get(logical_type)
-            if logical_type_handler and logical_type_handler.does_match(writers_schema, readers_schema):
-                result = logical_type_handler.convert_back(writers_schema, readers_schema, result)
+        does_match = matches.get(writers_schema)
+        if does_match is None:
+            does_match = matches.set(writers_schema, handler.does_match(writers_schema, readers_schema))
+        if does_match:
+            result = handler.convert_back(writers_schema, readers_schema, result)
+            if self.instrumentation is not None:
+                self.instrumentation.record_logical_conversion(readers_schema)
         return result
 
 
@@ -279,56 +553,80 @@ class LogicalDatumWriter(io.DatumWriter):
 
        :param schema.Schema writers_schema: Writer's schema
        :param dict[str, LogicalTypeProcessor] logical_types: Optional logical types dict
+       :param validation.ValidationPolicy|str validation_policy: Validation of written records: full (default),
+                                                                 sampled or off
+       :param instrumentation.Instrumentation instrumentation: Optional per-schema counters
        """
 
-    def __init__(self, writers_schema=None, logical_types=DEFAULT_LOGICAL_TYPES):
-        super(LogicalDatumWriter, self).__init__(writers_schema=writers_schema)
-        self.logical_types = logical_types
+    def __init__(self, writers_schema=None, logical_types=DEFAULT_LOGICAL_TYPES, validation_policy=None,
+                 instrumentation=None):
+        super(LogicalDatumWriter, self).__init__(writers_schema)
+        self.logical_types = logical_types or {}
+        self.validation_policy = validation.make_policy(validation_policy)
+        self.instrumentation = instrumentation
+        self._handlers = SchemaWeakCache()
+        self._validators = validation.get_validators(self.logical_types)
+
+    def _resolve_handler(self, writers_schema):
+        """
+        Resolves logical type processor which can convert data for the writer's schema once and caches it,
+        None when there is none
+        :param schema.Schema writers_schema:
+        :return LogicalTypeProcessor:
+        """
+        handler = _processor_for(self.logical_types, writers_schema)
+        if handler is not None and not handler.can_convert(writers_schema):
+            handler = None
+        return self._handlers.set(writers_schema, handler)
 
     def write_data(self, writers_schema, datum, encoder):
-        logical_type = writers_schema.props.get('logicalType')
-        if logical_type:
-            logical_type_handler = self.logical_types.get(logical_type)
-            if logical_type_handler and logical_type_handler.can_convert(writers_schema):
-                return super(LogicalDatumWriter, self).write_data(writers_schema,
-                                                                  logical_type_handler.convert(writers_schema, datum),
-                                                                  encoder)
+        handler = self._handlers.get(writers_schema, _UNRESOLVED)
+        if handler is _UNRESOLVED:
+            handler = self._resolve_handler(writers_schema)
+        if handler is not None:
+            datum = handler.convert(writers_schema, datum)
+            if self.instrumentation is not None:
+                self.instrumentation.record_logical_conversion(writers_schema)
         return super(LogicalDatumWriter, self).write_data(writers_schema, datum, encoder)
 
-    def __validate(self, writers_schema, datum):
-        logical_type = writers_schema.props.get('logicalType')
-        if logical_type:
-            lt = self.logical_types.get(logical_type)
-            if lt:
-                if lt.can_convert(writers_schema):
-                    if lt.validate(writers_schema, datum):
-                        return True
-                    return False
-
-        schema_type = writers_schema.type
-        if schema_type == 'array':
-            return (isinstance(datum, list) and
-                    False not in [self.__validate(writers_schema.items, d) for d in datum])
-        elif schema_type == 'map':
-            return (isinstance(datum, dict) and
-                    False not in [isinstance(k, basestring) for k in datum.keys()] and
-                    False not in
-                    [self.__validate(writers_schema.values, v) for v in datum.values()])
-        elif schema_type in ['union', 'error_union']:
-            return True in [self.__validate(s, datum) for s in writers_schema.schemas]
-        elif schema_type in ['record', 'error', 'request']:
-            return (isinstance(datum, dict) and
-                    False not in
-                    [self.__validate(f.type, datum.get(f.name)) for f in writers_schema.fields])
-
-        return io.validate(writers_schema, datum)
+    def write_record(self, writers_schema, datum, encoder):
+        if self.instrumentation is not None:
+            self.instrumentation.record_datum(writers_schema)
+        return super(LogicalDatumWriter, self).write_record(writers_schema, datum, encoder)
+
+    def write_array(self, writers_schema, datum, encoder):
+        items = writers_schema.items
+        if numeric_arrays.is_compact(datum) and items.type in numeric_arrays.TYPECODES \
+                and not items.props.get('logicalType'):
+            return numeric_arrays.write_array(datum, items.type, encoder)
+        return super(LogicalDatumWriter, self).write_array(writers_schema, datum, encoder)
+
+    def write_union(self, writers_schema, datum, encoder):
+        # the base implementation validates the raw datum, which fails for logical types
+        index_of_schema = -1
+        for i in range(len(writers_schema.schemas) - 1, -1, -1):
+            if self.instrumentation is not None:
+                self.instrumentation.record_union_probe(writers_schema)
+            if self._validators.get(writers_schema.schemas[i])(datum):
+                index_of_schema = i
+                break
+        if index_of_schema < 0:
+            raise io.AvroTypeException(writers_schema, datum)
+
+        encoder.write_long(index_of_schema)
+        self.write_data(writers_schema.schemas[index_of_schema], datum, encoder)
 
     def write(self, datum, encoder):
         # validate datum
-        if not self.__validate(self.writers_schema, datum):
-            raise io.AvroTypeException(self.writers_schema, datum)
-
-        self.write_data(self.writers_schema, datum, encoder)
+        if not self.validation_policy.check(self._validators.get(self.writer_schema), self.writer_schema, datum):
+            raise io.AvroTypeException(self.writer_schema, datum)
+
+        if self.instrumentation is None:
+            self.write_data(self.writer_schema, datum, encoder)
+            return
+        started = self.instrumentation.clock()
+        self.write_data(self.writer_schema, datum, encoder)
+        self.instrumentation.record_call(self.writer_schema, started)
 
 
 def patch_logical_types():
@@ -0,0 +1,119 @@
+import collections
+import concurrent.futures
+import json
+import os
+
+from . import container
+from .logical import LogicalDatumWriter
+
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
+OUTPUT_RECORDS = 'records'
+OUTPUT_BLOCKS = 'blocks'
+
+
+def split_chunks(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Splits a file into chunks of about chunk_bytes which end on line boundaries
+    :param str path:
+    :param int chunk_bytes:
+    :return: Iterator of (offset, length)
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset < size:
+            f.seek(min(offset + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield offset, end - offset
+            offset = end
+
+
+def convert_chunk(klass, path, offset, length, tuples=False, output=OUTPUT_RECORDS, codec=container.NULL_CODEC,
+                  sync_marker=None):
+    """
+    Parses the lines of a chunk and converts them into records of a generated class
+    :param type klass: Generated record class
+    :param str path:
+    :param int offset: Offset of the chunk, at the start of a line
+    :param int length: Length of the chunk, ending at the end of a line
+    :param bool tuples: Unions are written as ["type", value] instead of {"type": value}
+    :param str output: records for a list of records, blocks for an encoded container block
+    :param str codec: Block codec
+    :param bytes sync_marker: Sync marker ending the block
+    :return list|bytes: Records, or the encoded block, None if the chunk holds blank lines only
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    records = [klass.from_obj(json.loads(line), tuples) for line in data.splitlines() if line.strip()]
+    if output == OUTPUT_RECORDS:
+        return records
+    if not records:
+        # A block of no records would end the container data
+        return None
+
+    converter = klass._get_json_converter()
+    datum_writer = LogicalDatumWriter(klass.RECORD_SCHEMA,
+                                      converter.logical_types if converter.use_logical_types else None,
+                                      converter.validation_policy)
+    return container.encode_block(datum_writer, records, codec, sync_marker)
+
+
+def read_ndjson(klass, path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES, tuples=False, output=OUTPUT_RECORDS,
+                codec=container.NULL_CODEC, sync_marker=None):
+    """
+    Reads newline delimited JSON into records of a generated class. The file is split on line boundaries and
+    chunks are parsed and converted with from_obj in a process pool; results are yielded in file order.
+
+    With output='blocks', every chunk is yielded as an encoded container block (count, size, data and sync
+    marker) ready to be written after container.encode_header(klass.RECORD_SCHEMA, codec, sync_marker).
+
+    :param type klass: Generated record class, importable by worker processes
+    :param str path:
+    :param int workers: Number of worker processes, None for one per CPU, 0 to convert in this process
+    :param int chunk_bytes: Approximate size of the chunks handed to workers
+    :param bool tuples: Unions are written as ["type", value] instead of {"type": value}
+    :param str output: records or blocks
+    :param str codec: Block codec when output is blocks
+    :param bytes sync_marker: Sync marker when output is blocks, a new one if not given
+    :return: Iterator of records or of encoded blocks
+    """
+    if output not in (OUTPUT_RECORDS, OUTPUT_BLOCKS):
+        raise ValueError('Unknown output: %r' % output)
+    if output == OUTPUT_BLOCKS and sync_marker is None:
+        sync_marker = container.make_sync_marker()
+
+    def results(convert):
+        for offset, length in split_chunks(path, chunk_bytes):
+            yield convert(klass, path, offset, length, tuples, output, codec, sync_marker)
+
+    if workers == 0:
+        chunks = results(convert_chunk)
+    else:
+        chunks = _ordered_results(results, workers)
+
+    if output == OUTPUT_BLOCKS:
+        for block in chunks:
+            if block is not None:
+                yield block
+    else:
+        for records in chunks:
+            for record in records:
+                yield record
+
+
+def _ordered_results(results, workers):
+    """
+    Runs conversions in a process pool, keeping a bounded number of chunks in flight and yielding them in order
+    """
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        in_flight = collections.deque()
+        limit = 2 * (workers or os.cpu_count() or 1)
+        for future in results(lambda *args: pool.submit(convert_chunk, *args)):
+            in_flight.append(future)
+            if len(in_flight) >= limit:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
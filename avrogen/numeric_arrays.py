@@ -0,0 +1,219 @@
+import array
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
+COMPACT_ARRAY = 'array'
+COMPACT_NUMPY = 'numpy'
+COMPACT_MODES = (COMPACT_ARRAY, COMPACT_NUMPY)
+
+# Schema property of array schemas which overrides the package-wide mode for one field: "array", "numpy" or false
+COMPACT_PROPERTY = 'compact'
+
+_INT_TYPECODE = 'i' if array.array('i').itemsize == 4 else 'l'
+
+TYPECODES = {
+    'int': _INT_TYPECODE,
+    'long': 'q',
+    'float': 'f',
+    'double': 'd',
+}
+
+_TYPES_BY_TYPECODE = {code: items_type for items_type, code in TYPECODES.items()}
+
+DTYPES = {
+    'int': '<i4',
+    'long': '<i8',
+    'float': '<f4',
+    'double': '<f8',
+}
+
+# array.array type codes whose values are valid for the item type
+_VALID_TYPECODES = {
+    'int': frozenset('bBhH' + _INT_TYPECODE),
+    'long': frozenset('bBhHiIlq'),
+    'float': frozenset('fd'),
+    'double': frozenset('fd'),
+}
+
+_SWAP_BYTES = sys.byteorder != 'little'
+
+
+def requested_mode(array_schema, default=None):
+    """
+    Returns how an array schema asks to be stored: COMPACT_ARRAY, COMPACT_NUMPY, or None for lists. Only arrays of
+    int, long, float and double without logical type can be compact.
+    :param schema.ArraySchema array_schema:
+    :param str default: Package-wide mode, overridden by the schema's compact property
+    :return str:
+    """
+    items = array_schema.items
+    if items.type not in TYPECODES or items.props.get('logicalType'):
+        return None
+    mode = array_schema.props.get(COMPACT_PROPERTY, default)
+    if mode is True:
+        mode = COMPACT_ARRAY
+    return mode if mode in COMPACT_MODES else None
+
+
+def compact_mode(array_schema, default=None):
+    """
+    Returns how an array schema is stored, see requested_mode. Arrays asking for NumPy are stored as array.array
+    when NumPy is not installed.
+    :param schema.ArraySchema array_schema:
+    :param str default: Package-wide mode, overridden by the schema's compact property
+    :return str:
+    """
+    mode = requested_mode(array_schema, default)
+    if mode == COMPACT_NUMPY and numpy is None:
+        return COMPACT_ARRAY
+    return mode
+
+
+def is_compact(datum):
+    """
+    Whether a value is a compact numeric array rather than a list
+    """
+    return isinstance(datum, array.array) or (numpy is not None and isinstance(datum, numpy.ndarray))
+
+
+def matches(datum, items_type):
+    """
+    Whether a compact array holds values which are valid for the item type, so that its items need no checks
+    :param datum: array.array or numpy.ndarray
+    :param str items_type: int, long, float or double
+    :return bool:
+    """
+    if isinstance(datum, array.array):
+        return datum.typecode in _VALID_TYPECODES.get(items_type, ())
+    if numpy is not None and isinstance(datum, numpy.ndarray):
+        if datum.ndim != 1 or items_type not in TYPECODES:
+            return False
+        kind, size = datum.dtype.kind, datum.dtype.itemsize
+        if items_type in ('float', 'double'):
+            return kind == 'f' and size <= 8
+        limit = 4 if items_type == 'int' else 8
+        return (kind == 'i' and size <= limit) or (kind == 'u' and size < limit)
+    return False
+
+
+def from_list(values, items_type, mode):
+    """
+    Builds a compact array from a sequence of numbers, an array.array if NumPy is asked for but not installed
+    :param values:
+    :param str items_type: int, long, float or double
+    :param str mode: COMPACT_ARRAY or COMPACT_NUMPY
+    """
+    if mode == COMPACT_NUMPY and numpy is not None:
+        return numpy.array(values, dtype=DTYPES[items_type])
+    return array.array(TYPECODES[items_type], values)
+
+
+def read_array(decoder, writers_items_type, readers_items_type, mode):
+    """
+    Decodes an Avro array of numbers into a compact array. Blocks of floats and doubles are copied in one go.
+    :param io.BinaryDecoder decoder:
+    :param str writers_items_type: int, long, float or double
+    :param str readers_items_type: int, long, float or double, a promotion of the writer's item type
+    :param str mode: COMPACT_ARRAY or COMPACT_NUMPY
+    """
+    result = array.array(TYPECODES[readers_items_type])
+    if writers_items_type == readers_items_type or (writers_items_type in ('int', 'long') and
+                                                    readers_items_type in ('int', 'long')):
+        block = result
+    else:
+        block = array.array(TYPECODES[writers_items_type])
+    block_count = decoder.read_long()
+    while block_count != 0:
+        if block_count < 0:
+            block_count = -block_count
+            decoder.read_long()
+        if writers_items_type in ('float', 'double'):
+            data = decoder.read(block_count * block.itemsize)
+            if _SWAP_BYTES:
+                chunk = array.array(block.typecode, data)
+                chunk.byteswap()
+                block.extend(chunk)
+            else:
+                block.frombytes(data)
+        else:
+            read_long = decoder.read_long
+            block.extend(read_long() for _ in range(block_count))
+        block_count = decoder.read_long()
+    if block is not result:
+        # Promotion of ints to floats or doubles, or floats to doubles
+        result.extend(iter(block))
+    if mode == COMPACT_NUMPY:
+        # Shares the buffer of the array.array
+        return numpy.frombuffer(result, dtype=DTYPES[_TYPES_BY_TYPECODE[result.typecode]])
+    return result
+
+
+def write_array(datum, items_type, encoder):
+    """
+    Encodes a compact array as one Avro array block. Floats and doubles are copied in one go.
+    :param datum: array.array or numpy.ndarray
+    :param str items_type: int, long, float or double
+    :param io.BinaryEncoder encoder:
+    """
+    if len(datum):
+        encoder.write_long(len(datum))
+        if items_type in ('float', 'double'):
+            if isinstance(datum, array.array):
+                if datum.typecode != TYPECODES[items_type] or _SWAP_BYTES:
+                    datum = array.array(TYPECODES[items_type], datum)
+                    if _SWAP_BYTES:
+                        datum.byteswap()
+                encoder.write(datum.tobytes())
+            else:
+                encoder.write(numpy.ascontiguousarray(datum, dtype=DTYPES[items_type]).tobytes())
+        else:
+            write_long = encoder.write_long
+            for value in datum.tolist():
+                write_long(value)
+    encoder.write_long(0)
+
+
+def copy_array(datum):
+    """
+    Copies a compact array
+    """
+    if isinstance(datum, array.array):
+        return array.array(datum.typecode, datum)
+    return datum.copy()
+
+
+def values_equal(a, b):
+    """
+    Compares field values which may contain compact arrays. NumPy arrays, which == compares element-wise, and
+    array.array values, which never equal lists, are equal to lists holding the same numbers.
+    """
+    if numpy is not None and (isinstance(a, numpy.ndarray) or isinstance(b, numpy.ndarray)):
+        return bool(numpy.array_equal(a, b))
+    if isinstance(a, array.array) or isinstance(b, array.array):
+        if isinstance(a, (array.array, list)) and isinstance(b, (array.array, list)):
+            return len(a) == len(b) and list(a) == list(b)
+        return a == b
+    if type(a) is dict and type(b) is dict:
+        return a.keys() == b.keys() and all(values_equal(value, b[key]) for key, value in a.items())
+    if type(a) is list and type(b) is list:
+        return len(a) == len(b) and all(values_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+class CompactArrayReaderMixin(object):
+    """
+    Mixin of datum readers which decodes arrays of numbers into compact arrays, for all such arrays if
+    compact_arrays is set or for arrays whose schema has the compact property
+    """
+
+    compact_arrays = None
+
+    def read_array(self, writers_schema, readers_schema, decoder):
+        mode = compact_mode(readers_schema, self.compact_arrays)
+        if mode is not None and writers_schema.items.type in TYPECODES:
+            return read_array(decoder, writers_schema.items.type, readers_schema.items.type, mode)
+        return super(CompactArrayReaderMixin, self).read_array(writers_schema, readers_schema, decoder)
@@ -0,0 +1,131 @@
+import collections
+import concurrent.futures
+import io as _io
+import os
+
+from avro import datafile, io
+
+from . import container
+
+
+class _Ready(object):
+    """
+    Stands in for a future of a block which needs no compression
+    """
+    __slots__ = ['_value']
+
+    def __init__(self, value):
+        self._value = value
+
+    def done(self):
+        return True
+
+    def result(self):
+        return self._value
+
+
+class ParallelDataFileWriter(object):
+    """
+    Writes avro container files, encoding records on the calling thread while full blocks are compressed by an
+    executor. Blocks are cut once their encoded size reaches block_bytes, so the number of records per block
+    follows the size of the records, and are written in order, each followed by the file's sync marker.
+
+    Usage:
+        with ParallelDataFileWriter(open('out.avro', 'wb'), SCHEMA, codec='deflate') as writer:
+            for record in records:
+                writer.append(record)
+
+    zlib, bz2 and lzma release the GIL while compressing, so the default thread pool runs in parallel with the
+    producer. A concurrent.futures.ProcessPoolExecutor may be passed as well.
+
+    :param fo: File object open for writing in binary mode, closed by close()
+    :param schema.Schema writers_schema: Schema to write records with
+    :param io.DatumWriter datum_writer: Writer used to encode records, e.g. logical.LogicalDatumWriter
+    :param str codec: One of null, deflate, bzip2, xz
+    :param int block_bytes: Target size of the encoded records of a block, before compression
+    :param concurrent.futures.Executor executor: Executor compressing blocks; a thread pool owned by the writer
+                                                 if not given
+    :param int workers: Number of threads of the owned thread pool, None for the executor default. Pass it with
+                        an executor of your own to size max_pending to that executor.
+    :param int max_pending: Number of blocks compressed at once before append() waits for the oldest one, twice
+                            workers (or the number of CPUs if workers is None) by default
+    :param dict[str, bytes] meta: Additional metadata stored in the header
+    """
+
+    def __init__(self, fo, writers_schema, datum_writer=None, codec=container.DEFLATE_CODEC,
+                 block_bytes=container.SYNC_INTERVAL, executor=None, workers=None, max_pending=None, meta=None):
+        if codec not in container.VALID_CODECS:
+            raise datafile.DataFileException('Unknown codec: %r' % codec)
+        self.fo = fo
+        self.writers_schema = writers_schema
+        self.datum_writer = datum_writer if datum_writer is not None else io.DatumWriter()
+        self.datum_writer.writer_schema = writers_schema
+        self.codec = codec
+        self.block_bytes = block_bytes
+        self.sync_marker = container.make_sync_marker()
+        self._owns_executor = executor is None and codec != container.NULL_CODEC
+        if self._owns_executor:
+            executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.executor = executor
+        if max_pending is None:
+            max_pending = 2 * (workers or os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._pending = collections.deque()
+        self._new_block()
+        self.fo.write(container.encode_header(writers_schema, codec, self.sync_marker, meta))
+
+    def _new_block(self):
+        self._buffer = _io.BytesIO()
+        self._encoder = io.BinaryEncoder(self._buffer)
+        self._count = 0
+
+    def append(self, record):
+        """
+        Encodes a record into the current block, handing the block over for compression once it is full
+        """
+        self.datum_writer.write(record, self._encoder)
+        self._count += 1
+        if self._buffer.tell() >= self.block_bytes:
+            self._submit_block()
+            self._write_blocks(self.max_pending)
+
+    def _submit_block(self):
+        count, data = self._count, self._buffer.getvalue()
+        self._new_block()
+        if self.codec == container.NULL_CODEC:
+            compressed = _Ready(data)
+        else:
+            compressed = self.executor.submit(container.compress_block, self.codec, data)
+        self._pending.append((count, compressed))
+
+    def _write_blocks(self, max_pending):
+        """
+        Writes compressed blocks in order, waiting for the oldest ones while more than max_pending are in flight
+        """
+        pending = self._pending
+        while pending and (pending[0][1].done() or len(pending) > max_pending):
+            count, compressed = pending.popleft()
+            self.fo.write(container.frame_block(count, compressed.result(), self.sync_marker))
+
+    def flush(self):
+        """
+        Writes the current block and waits for all blocks to be written
+        """
+        if self._count:
+            self._submit_block()
+        self._write_blocks(0)
+        self.fo.flush()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._owns_executor:
+                self.executor.shutdown()
+            self.fo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -11,11 +11,13 @@ from avro import protocol, schema
 from . import namespace as ns_
 from .tabbed_writer import TabbedWriter
 from .core_writer import write_preamble, write_get_schema, start_namespace, write_reader_impl, clean_fullname
+from .core_writer import write_writer_impl
 from .core_writer import write_schema_record, write_enum, write_read_file, generate_namespace_modules
 from .protocol_writer import write_protocol_request
 
 
-def generate_protocol(protocol_json, use_logical_types=False, custom_imports=None, avro_json_converter=None):
+def generate_protocol(protocol_json, use_logical_types=False, custom_imports=None, avro_json_converter=None,
+                      frozen=False, copy_on_write=False):
     """
     Generate content of the file which will contain concrete classes for RecordSchemas and requests contained
     in the avro protocol
@@ -23,6 +25,8 @@ def generate_protocol(protocol_json, use_logical_types=False, custom_imports=Non
     :param bool use_logical_types: Use logical types extensions if true
     :param list[str] custom_imports: Add additional import modules
     :param str avro_json_converter: AvroJsonConverter type to use for default values
+    :param bool frozen: Generate immutable, hashable record classes (request classes stay mutable)
+    :param bool copy_on_write: Generate record classes whose deep copies share nested values until modified
     :return:
     """
 
@@ -99,14 +103,15 @@ def generate_protocol(protocol_json, use_logical_types=False, custom_imports=Non
             for idx, record in namespaces[ns]['records']:
                 schema_names.add(clean_fullname(record.fullname))
                 if isinstance(record, schema.RecordSchema):
-                    write_schema_record(record, writer, use_logical_types)
+                    write_schema_record(record, writer, use_logical_types, frozen, copy_on_write)
                 elif isinstance(record, schema.EnumSchema):
                     write_enum(record, writer)
 
             for message in namespaces[ns]['responses']:
                 schema_names.add(clean_fullname(message.response.fullname))
                 if isinstance(message.response, schema.RecordSchema):
-                    write_schema_record(message.response, writer, use_logical_types)
+                    write_schema_record(message.response, writer, use_logical_types, frozen,
+                                        copy_on_write)
                 elif isinstance(message.response, schema.EnumSchema):
                     write_enum(message.response, writer)
 
@@ -189,32 +194,38 @@ def write_protocol_preamble(writer, use_logical_types, custom_imports):
 def write_populate_schemas(writer):
     """
     Write code which will look through the protocol and populate __SCHEMAS dict which will be used by get_type_schema()
+    Types are rebuilt through the process-wide schema cache, so identical types of other packages, including the
+    named types nested in them, are shared.
     :param writer:
     :return:
     """
     writer.write('\nfor rec in PROTOCOL.types:')
     with writer.indent():
-        writer.write('\n__SCHEMAS[rec.fullname] = rec')
+        writer.write('\n__SCHEMAS[rec.fullname] = schema_cache.DEFAULT_SCHEMA_CACHE.parse(rec.to_json())[1]')
 
     writer.write('\nfor resp in (six.itervalues(PROTOCOL.messages) if six.PY2 else PROTOCOL.messages):')
     with writer.indent():
         writer.write('\nif isinstance(resp.response, (avro_schema.RecordSchema, avro_schema.EnumSchema)):')
         with writer.indent():
-            writer.write('\n__SCHEMAS[resp.response.fullname] = resp.response')
+            writer.write('\n__SCHEMAS[resp.response.fullname] = schema_cache.DEFAULT_SCHEMA_CACHE.parse(resp.response.to_json())[1]')
 
     writer.write('\nPROTOCOL_MESSAGES = {m.name.lstrip("."):m for m in (six.itervalues(PROTOCOL.messages) if six.PY2 else PROTOCOL.messages)}\n')
 
 
-def write_protocol_files(protocol_json, output_folder, use_logical_types=False, custom_imports=None):
+def write_protocol_files(protocol_json, output_folder, use_logical_types=False, custom_imports=None, frozen=False,
+                         copy_on_write=False):
     """
     Generates concrete classes for RecordSchemas and requests and a SpecificReader for types and messages contained
     in the avro protocol.
     :param str protocol_json: JSON containing avro protocol
     :param str output_folder: Folder to write generated files to.
     :param list[str] custom_imports: Add additional import modules
+    :param bool frozen: Generate immutable, hashable record classes
+    :param bool copy_on_write: Generate record classes whose deep copies share nested values until modified
     :return:
     """
-    proto_py, record_names, request_names = generate_protocol(protocol_json, use_logical_types, custom_imports)
+    proto_py, record_names, request_names = generate_protocol(protocol_json, use_logical_types, custom_imports,
+                                                              frozen=frozen, copy_on_write=copy_on_write)
     names = sorted(list(record_names) + list(request_names))
     if not os.path.isdir(output_folder):
         os.mkdir(output_folder)
@@ -244,9 +255,13 @@ def write_specific_reader(record_types, output_folder, use_logical_types):
     with open(os.path.join(output_folder, "__init__.py"), "a+") as f:
         writer = TabbedWriter(f)
         writer.write('\n\nfrom .schema_classes import SchemaClasses, PROTOCOL as my_proto, get_schema_type')
-        writer.write('\nfrom avro.io import DatumReader')
+        writer.write('\nfrom avro.io import DatumReader, DatumWriter')
+        writer.write('\nfrom avrogen import parallel, resolution, reuse')
+        if use_logical_types:
+            writer.write('\nfrom avrogen import logical')
 
         write_reader_impl(record_types, writer, use_logical_types)
+        write_writer_impl(writer, use_logical_types)
 
 
 def write_namespace_modules(ns_dict, request_names, output_folder):
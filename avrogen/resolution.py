@@ -0,0 +1,256 @@
+import collections
+import json
+import threading
+
+import six
+from avro import io, schema
+
+from . import fingerprint
+from .weak_cache import SchemaWeakCache
+
+_UNION_TYPES = ('union', 'error_union')
+_RECORD_TYPES = ('record', 'error', 'request')
+
+
+def union_branch_name(schema_):
+    if isinstance(schema_, schema.NamedSchema):
+        return schema_.fullname if six.PY2 else schema_.fullname.lstrip('.')
+    return schema_.type
+
+
+class ResolutionPlan(object):
+    """
+    Precomputed resolution between a writer's and a reader's schema:
+
+    - matches: whether the schemas can be resolved at all
+    - reader_branch: branch of a reader's union a non-union writer's schema resolves to
+    - fields: for record pairs, a tuple of (name, writer's field type or None, reader's field type,
+      has_default, default) for every reader's field. Default comes from the writer's field when it exists,
+      otherwise from the reader's field. Writer's fields absent from the reader are skipped.
+    - writer_branches: for a writer's union, dict of branch name to branch schema
+    """
+
+    __slots__ = ['writers_schema', 'readers_schema', 'matches', 'reader_branch', 'fields', 'writer_branches']
+
+    def __init__(self, writers_schema, readers_schema):
+        self.writers_schema = writers_schema
+        self.readers_schema = readers_schema
+        self.matches = io.DatumReader.match_schemas(writers_schema, readers_schema)
+        self.reader_branch = None
+        self.fields = None
+        self.writer_branches = None
+
+        if writers_schema.type not in _UNION_TYPES and readers_schema.type in _UNION_TYPES:
+            for s in readers_schema.schemas:
+                if io.DatumReader.match_schemas(writers_schema, s):
+                    self.reader_branch = s
+                    break
+
+        if writers_schema.type in _RECORD_TYPES and readers_schema.type in _RECORD_TYPES:
+            writer_fields = writers_schema.fields_dict if six.PY2 else writers_schema.field_map
+            fields = []
+            for field in readers_schema.fields:
+                writers_field = writer_fields.get(field.name)
+                if writers_field is None:
+                    fields.append((field.name, None, field.type, field.has_default,
+                                   field.default if field.has_default else None))
+                else:
+                    fields.append((field.name, writers_field.type, field.type, writers_field.has_default,
+                                   writers_field.default if writers_field.has_default else None))
+            self.fields = tuple(fields)
+
+        if writers_schema.type in _UNION_TYPES:
+            self.writer_branches = {}
+            for s in writers_schema.schemas:
+                self.writer_branches.setdefault(union_branch_name(s), s)
+
+
+class PlanCache(object):
+    """
+    Bounded LRU cache of ResolutionPlan objects keyed by the identity of the (writer's, reader's) schema pair.
+    Cached plans keep their schemas alive, so identities cannot be reused while a plan is cached.
+
+    :param int maxsize: Maximum number of plans to keep
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._plans = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, writers_schema, readers_schema):
+        key = (id(writers_schema), id(readers_schema))
+        plan = self._plans.get(key)
+        if plan is not None:
+            try:
+                self._plans.move_to_end(key)
+            except KeyError:
+                pass
+            return plan
+
+        plan = ResolutionPlan(writers_schema, readers_schema)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def __len__(self):
+        return len(self._plans)
+
+
+DEFAULT_PLAN_CACHE = PlanCache()
+
+_DECODER_METHODS = {
+    'null': 'read_null',
+    'boolean': 'read_boolean',
+    'string': 'read_utf8',
+    'int': 'read_int',
+    'long': 'read_long',
+    'float': 'read_float',
+    'double': 'read_double',
+    'bytes': 'read_bytes',
+}
+
+_READER_METHODS = {
+    'fixed': 'read_fixed',
+    'enum': 'read_enum',
+    'array': 'read_array',
+    'map': 'read_map',
+    'union': 'read_union',
+    'error_union': 'read_union',
+    'record': 'read_record',
+    'error': 'read_record',
+    'request': 'read_record',
+}
+
+
+class PlannedDatumReader(io.DatumReader):
+    """
+    DatumReader which resolves the writer's and reader's schemas through cached ResolutionPlan objects instead of
+    matching them again for every datum. Data written with the reader's own schema needs no resolution at all.
+    """
+
+    plans = DEFAULT_PLAN_CACHE
+
+    def read_data(self, writers_schema, readers_schema, decoder):
+        if writers_schema is not readers_schema:
+            plan = self.plans.get(writers_schema, readers_schema)
+            if not plan.matches:
+                raise io.SchemaResolutionException('Schemas do not match.', writers_schema, readers_schema)
+            if plan.reader_branch is not None:
+                return self.read_data(writers_schema, plan.reader_branch, decoder)
+            if readers_schema.type in _UNION_TYPES and writers_schema.type not in _UNION_TYPES:
+                raise io.SchemaResolutionException('Schemas do not match.', writers_schema, readers_schema)
+
+        method = _DECODER_METHODS.get(writers_schema.type)
+        if method is not None:
+            return getattr(decoder, method)()
+        method = _READER_METHODS.get(writers_schema.type)
+        if method is None:
+            raise schema.AvroException('Cannot read unknown schema type: %s' % writers_schema.type)
+        return getattr(self, method)(writers_schema, readers_schema, decoder)
+
+
+class DecoderCache(object):
+    """
+    Bounded LRU cache of prepared resolving datum readers keyed by the writer's schema and the identity of the
+    reader's schema. Writer's schemas are keyed by the CRC-64-AVRO fingerprint of their Parsing Canonical Form
+    along with their full JSON, as canonical forms leave out logical types and defaults, which change how data is
+    read. Writer's schemas given as JSON text are parsed and keyed only the first time the text is seen, so
+    repeated writer's schemas are neither re-parsed nor re-resolved.
+
+    :param reader_factory: callable(writers_schema, readers_schema) returning a datum reader
+    :param int maxsize: Maximum number of readers to keep
+    """
+
+    def __init__(self, reader_factory, maxsize=256):
+        self.reader_factory = reader_factory
+        self.maxsize = maxsize
+        self._readers = collections.OrderedDict()
+        self._text_keys = collections.OrderedDict()
+        self._schema_keys = SchemaWeakCache()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def writer_key(writers_schema):
+        """
+        :param schema.Schema writers_schema:
+        :return tuple[bytes, str]: CRC-64-AVRO fingerprint and full JSON of the writer's schema
+        """
+        return (fingerprint.schema_fingerprint(writers_schema),
+                json.dumps(writers_schema.to_json(), sort_keys=True, separators=(',', ':'), default=dict))
+
+    def get(self, writers_schema, readers_schema=None):
+        """
+        :param schema.Schema|str writers_schema: Writer's schema object or JSON text
+        :param schema.Schema readers_schema: Reader's schema, None to read with the writer's schema
+        :return: Datum reader created by reader_factory
+        """
+        parsed = None
+        if isinstance(writers_schema, six.string_types):
+            key = self._text_keys.get(writers_schema)
+            if key is None:
+                parsed = schema.parse(writers_schema)
+                key = self.writer_key(parsed)
+                with self._lock:
+                    self._text_keys[writers_schema] = key
+                    while len(self._text_keys) > self.maxsize:
+                        self._text_keys.popitem(last=False)
+        else:
+            parsed = writers_schema
+            key = self._schema_keys.get(writers_schema)
+            if key is None:
+                key = self._schema_keys.set(writers_schema, self.writer_key(writers_schema))
+
+        reader = self.get_by_key(key, readers_schema)
+        if reader is None:
+            if parsed is None:
+                parsed = schema.parse(writers_schema)
+            reader = self.add(key, parsed, readers_schema)
+        return reader
+
+    def get_by_key(self, key, readers_schema=None):
+        """
+        :param tuple[bytes, str] key: Key of the writer's schema, see writer_key
+        :param schema.Schema readers_schema:
+        :return: Cached datum reader or None
+        """
+        key = (key, id(readers_schema))
+        entry = self._readers.get(key)
+        if entry is None:
+            return None
+        try:
+            self._readers.move_to_end(key)
+        except KeyError:
+            pass
+        return entry[1]
+
+    def add(self, key, writers_schema, readers_schema=None):
+        """
+        Prepares a reader for the writer's schema and caches it under the key
+        :param tuple[bytes, str] key: Key of the writer's schema, see writer_key
+        :param schema.Schema writers_schema:
+        :param schema.Schema readers_schema:
+        :return: Datum reader created by reader_factory
+        """
+        reader = self.reader_factory(writers_schema, readers_schema)
+        with self._lock:
+            # Keep the reader's schema alive so that its identity is not reused while cached
+            self._readers[(key, id(readers_schema))] = (readers_schema, reader)
+            while len(self._readers) > self.maxsize:
+                self._readers.popitem(last=False)
+        return reader
+
+    def clear(self):
+        with self._lock:
+            self._readers.clear()
+            self._text_keys.clear()
+        self._schema_keys.clear()
+
+    def __len__(self):
+        return len(self._readers)
@@ -0,0 +1,177 @@
+import copy
+from typing import Dict
+
+from avro import datafile, io
+
+from .dict_wrapper import DictWrapper
+from .resolution import DEFAULT_PLAN_CACHE
+
+_RECORD_TYPES = ('record', 'error')
+_UNION_TYPES = ('union', 'error_union')
+
+
+def _is_reusable(value, readers_schema):
+    """
+    Generated record can be decoded into if it is a mutable instance of the reader's record class
+    """
+    return isinstance(value, DictWrapper) and not getattr(value, '_frozen', False) and \
+        value.RECORD_SCHEMA.fullname == readers_schema.fullname
+
+
+class RecordReuseMixin(object):
+    """
+    Adds decoding into existing instances of generated classes to a DatumReader. Fields are overwritten in place,
+    nested records are decoded into the instances already held by the parent record and array fields reuse
+    their lists (and the records in them) when the shapes allow. Leaves and anything else are decoded as usual.
+
+    Decoded records must not be kept beyond the next read into the same instance.
+    """
+
+    SCHEMA_TYPES = {}  # type: Dict[str, type]
+
+    def read_into(self, record, decoder):
+        """
+        Decodes the next record into an existing instance of the generated class
+        :param dict_wrapper.DictWrapper record: Mutable instance of the reader's record class
+        :param io.BinaryDecoder decoder:
+        :return dict_wrapper.DictWrapper: The record
+        """
+        if self.reader_schema is None:
+            self.reader_schema = self.writer_schema
+        return self._read_into(record, self.writer_schema, self.reader_schema, decoder)
+
+    def _read_into(self, record, writers_schema, readers_schema, decoder):
+        if writers_schema.type not in _RECORD_TYPES or not _is_reusable(record, readers_schema):
+            raise TypeError('Cannot decode %s into %s' % (readers_schema.fullname, type(record).__name__))
+        return self._read_record_into(record, writers_schema, readers_schema, decoder)
+
+    def iter_records(self, fo, reuse=False, record=None):
+        """
+        Iterates over records of an Avro container file
+        :param fo: File object open for reading in binary mode
+        :param bool reuse: Decode every record into the same instance, valid only until the next iteration
+        :param dict_wrapper.DictWrapper record: Instance to decode into, a new one of the reader's class if not given
+        :return:
+        """
+        # DataFileReader sets the writer's schema of the file on its datum reader, which must not change this
+        # reader: it may be shared, e.g. by SpecificDatumReader.for_writer
+        if not reuse:
+            for datum in datafile.DataFileReader(fo, copy.copy(self)):
+                yield datum
+            return
+
+        datum_reader = _ReusingReader(self, record)
+        for datum in datafile.DataFileReader(fo, datum_reader):
+            yield datum
+
+    def _read_reusing(self, current, writers_schema, readers_schema, decoder):
+        writers_type = writers_schema.type
+        if writers_type in _UNION_TYPES:
+            index = int(decoder.read_long())
+            if index >= len(writers_schema.schemas):
+                raise io.SchemaResolutionException(
+                    "Can't access branch index %d for union with %d branches" % (index, len(writers_schema.schemas)),
+                    writers_schema, readers_schema)
+            return self._read_reusing(current, writers_schema.schemas[index], readers_schema, decoder)
+
+        if readers_schema.type in _UNION_TYPES:
+            readers_branch = DEFAULT_PLAN_CACHE.get(writers_schema, readers_schema).reader_branch
+            if readers_branch is None:
+                return self.read_data(writers_schema, readers_schema, decoder)
+            readers_schema = readers_branch
+
+        if writers_type in _RECORD_TYPES:
+            if readers_schema.type in _RECORD_TYPES and _is_reusable(current, readers_schema) and \
+                    DEFAULT_PLAN_CACHE.get(writers_schema, readers_schema).matches:
+                return self._read_record_into(current, writers_schema, readers_schema, decoder)
+        elif writers_type == 'array':
+            if readers_schema.type == 'array' and type(current) is list:
+                return self._read_array_into(current, writers_schema, readers_schema, decoder)
+
+        return self.read_data(writers_schema, readers_schema, decoder)
+
+    def _read_record_into(self, record, writers_schema, readers_schema, decoder):
+        # Copy-on-write records must not overwrite values they share with their copies
+        borrowed = getattr(record, '_borrowed', None)
+        if getattr(record, '_shared', False):
+            record._unshare()
+        inner_dict = record._inner_dict
+        readers_fields = readers_schema.field_map
+        read_count = 0
+        for field in writers_schema.fields:
+            readers_field = readers_fields.get(field.name)
+            if readers_field is not None:
+                current = inner_dict.get(field.name) if not borrowed or field.name not in borrowed else None
+                inner_dict[field.name] = self._read_reusing(current, field.type, readers_field.type, decoder)
+                read_count += 1
+            else:
+                self.skip_data(field.type, decoder)
+
+        if len(readers_fields) > read_count:
+            writers_fields = writers_schema.field_map
+            for name, field in readers_fields.items():
+                if name not in writers_fields:
+                    if not field.has_default:
+                        raise io.SchemaResolutionException('No default value for field %s' % name,
+                                                           writers_schema, readers_schema)
+                    inner_dict[name] = self._read_default_value(field.type, field.default)
+        if borrowed:
+            record._borrowed = None
+        return record
+
+    def _read_default_value(self, field_schema, default_value):
+        """
+        Converts default values through the package's JSON converter, so that record defaults become instances of
+        the generated classes and logical types are converted like decoded values
+        """
+        for klass in self.SCHEMA_TYPES.values():
+            converter = klass._get_json_converter()
+            if field_schema.type in _UNION_TYPES:
+                # Defaults of unions belong to their first branch
+                field_schema = field_schema.schemas[0]
+            return converter.from_json_object(default_value, field_schema)
+        return super(RecordReuseMixin, self)._read_default_value(field_schema, default_value)
+
+    def _read_array_into(self, current, writers_schema, readers_schema, decoder):
+        writers_items, readers_items = writers_schema.items, readers_schema.items
+        size = len(current)
+        i = 0
+        block_count = decoder.read_long()
+        while block_count != 0:
+            if block_count < 0:
+                block_count = -block_count
+                decoder.read_long()
+            for _ in range(block_count):
+                if i < size:
+                    current[i] = self._read_reusing(current[i], writers_items, readers_items, decoder)
+                else:
+                    current.append(self.read_data(writers_items, readers_items, decoder))
+                i += 1
+            block_count = decoder.read_long()
+        del current[i:]
+        return current
+
+
+class _ReusingReader(object):
+    """
+    Datum reader handed to a DataFileReader which decodes every record of the file into the same instance. Holds
+    the writer's schema of the file itself and passes the instance down to the wrapped reader.
+
+    :param RecordReuseMixin datum_reader:
+    :param dict_wrapper.DictWrapper record: Instance to decode into, a new one of the reader's class if None
+    """
+
+    def __init__(self, datum_reader, record=None):
+        self.datum_reader = datum_reader
+        self.record = record
+        self.writer_schema = None
+
+    def read_data(self, writers_schema, readers_schema, decoder):
+        # Used by DataFileReader for the file header
+        return self.datum_reader.read_data(writers_schema, readers_schema, decoder)
+
+    def read(self, decoder):
+        readers_schema = self.datum_reader.reader_schema or self.writer_schema
+        if self.record is None:
+            self.record = self.datum_reader.SCHEMA_TYPES[readers_schema.fullname]()
+        return self.datum_reader._read_into(self.record, self.writer_schema, readers_schema, decoder)
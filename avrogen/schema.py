@@ -12,19 +12,50 @@ from avro.schema import SchemaFromJSONData as make_avsc_object
 from .core_writer import generate_namespace_modules, clean_fullname
 from .tabbed_writer import TabbedWriter
 from .core_writer import write_preamble, start_namespace, write_schema_record, write_enum, write_read_file
-from .core_writer import write_get_schema, write_reader_impl
+from .core_writer import write_get_schema, write_reader_impl, write_writer_impl
+from .core_writer import write_stub_preamble, write_record_stub, write_enum_stub, find_compact_modes
 import logging
 
 logger = logging.getLogger('avrogen.schema')
 logger.setLevel(logging.INFO)
 
 
-def generate_schema(schema_json, use_logical_types=False, custom_imports=None, avro_json_converter=None):
+def _parse_names(schema_json):
+    """
+    Parses a schema and returns the named types it defines
+    :param str schema_json: JSON representing avro schema
+    :return schema.Names:
+    """
+    names = schema.Names()
+    make_avsc_object(json.loads(schema_json), names)
+    return names
+
+
+def _named_types(names):
+    """
+    Lists the record and enum schemas of parsed named types, sorted by full name
+    :param schema.Names names:
+    :return list[tuple[str, schema.NamedSchema]]:
+    """
+    names = [k for k in six.iteritems(names.names) if isinstance(k[1], (schema.RecordSchema, schema.EnumSchema))]
+    return sorted(names, key=lambda x: x[0])
+
+
+def generate_schema(schema_json, use_logical_types=False, custom_imports=None, avro_json_converter=None,
+                    frozen=False, copy_on_write=False, stubs=False, compact_arrays=None, names=None):
     """
     Generate file containing concrete classes for RecordSchemas in given avro schema json
     :param str schema_json: JSON representing avro schema
     :param list[str] custom_imports: Add additional import modules
     :param str avro_json_converter: AvroJsonConverter type to use for default values
+    :param bool frozen: Generate immutable, hashable record classes
+    :param bool copy_on_write: Generate record classes whose deep copies share nested values until modified
+    :param bool stubs: Leave typing overloads, type hints and field docs out of the classes, for use with the
+                       stub generated by generate_schema_stubs
+    :param str compact_arrays: Store arrays of int, long, float and double as "array" (array.array) or "numpy"
+                               (numpy.ndarray) instead of lists. Array schemas can override it with a compact
+                               property.
+    :param schema.Names names: Named types of schema_json if it was parsed already
     :return Dict[str, str]:
     """
 
@@ -32,19 +63,21 @@ def generate_schema(schema_json, use_logical_types=False, custom_imports=None, a
         avro_json_converter = 'avrojson.AvroJsonConverter'
 
     if '(' not in avro_json_converter:
-        avro_json_converter += f'(use_logical_types={use_logical_types}, schema_types=__SCHEMA_TYPES)'
+        avro_json_converter += f'(use_logical_types={use_logical_types}, schema_types=__SCHEMA_TYPES'
+        if compact_arrays:
+            avro_json_converter += f', compact_arrays={compact_arrays!r}'
+        avro_json_converter += ')'
 
     custom_imports = custom_imports or []
-    names = schema.Names()
-    make_avsc_object(json.loads(schema_json), names)
-
-    names = [k for k in six.iteritems(names.names) if isinstance(k[1], (schema.RecordSchema, schema.EnumSchema))]
-    names = sorted(names, key=lambda x: x[0])
+    names = _named_types(names if names is not None else _parse_names(schema_json))
+    compact_modes = find_compact_modes([n[1] for n in names], compact_arrays)
+    if frozen and compact_modes:
+        raise ValueError('Frozen records can not store arrays compactly')
 
     main_out = StringIO()
     writer = TabbedWriter(main_out)
 
-    write_preamble(writer, use_logical_types, custom_imports)
+    write_preamble(writer, use_logical_types, custom_imports, compact_modes)
     write_schema_preamble(writer)
     write_get_schema(writer)
     write_populate_schemas(writer)
@@ -58,7 +91,8 @@ def generate_schema(schema_json, use_logical_types=False, custom_imports=None, a
             current_namespace = namespace
         if isinstance(field_schema, schema.RecordSchema):
             logger.debug(f'Writing schema: {clean_fullname(field_schema.fullname)}')
-            write_schema_record(field_schema, writer, use_logical_types)
+            write_schema_record(field_schema, writer, use_logical_types, frozen, copy_on_write, stubs,
+                                compact_arrays)
         elif isinstance(field_schema, schema.EnumSchema):
             logger.debug(f'Writing enum: {field_schema.fullname}', field_schema.fullname)
             write_enum(field_schema, writer)
@@ -87,19 +121,47 @@ def generate_schema(schema_json, use_logical_types=False, custom_imports=None, a
     return value, [clean_fullname(name[0]) for name in names]
 
 
+def generate_schema_stubs(schema_json, use_logical_types=False, custom_imports=None, frozen=False,
+                          copy_on_write=False, compact_arrays=None, names=None):
+    """
+    Generate the .pyi stub of the file generated by generate_schema, which carries the typing surface of the
+    classes: constructor overloads, type hints and field docs
+    :param str schema_json: JSON representing avro schema
+    :param list[str] custom_imports: Add additional import modules
+    :param bool frozen: Whether the record classes are immutable
+    :param bool copy_on_write: Whether the record classes' deep copies are copy-on-write
+    :param str compact_arrays: Default storage of numeric arrays, see generate_schema
+    :param schema.Names names: Named types of schema_json if it was parsed already
+    :return str:
+    """
+    names = _named_types(names if names is not None else _parse_names(schema_json))
+    out = StringIO()
+    writer = TabbedWriter(out)
+    write_stub_preamble(writer, custom_imports, find_compact_modes([n[1] for n in names], compact_arrays))
+    for name, field_schema in names:
+        writer.write('\n\n')
+        if isinstance(field_schema, schema.RecordSchema):
+            write_record_stub(field_schema, writer, use_logical_types, frozen, copy_on_write, compact_arrays)
+        elif isinstance(field_schema, schema.EnumSchema):
+            write_enum_stub(field_schema, writer)
+    writer.write('\n\n_json_converter: avrojson.AvroJsonConverter\n')
+    value = out.getvalue()
+    out.close()
+    return value
+
+
 def write_schema_preamble(writer):
     """
     Writes a schema-specific preamble: __get_names_and_schema() which is used by concrete classes to resolve
-    their own RecordSchema
+    their own RecordSchema. Schemas are parsed through the process-wide schema cache, so named types defined
+    the same way by several generated packages share one schema object.
     :param writer:
     :return:
     """
     write_read_file(writer)
     writer.write('\n\ndef __get_names_and_schema(json_str):')
     with writer.indent():
-        writer.write('\nnames = avro_schema.Names()')
-        writer.write('\nschema = make_avsc_object(json.loads(json_str), names)')
-        writer.write('\nreturn names, schema')
+        writer.write('\nreturn schema_cache.DEFAULT_SCHEMA_CACHE.parse(json.loads(json_str))')
     writer.write('\n\n\nSCHEMA_JSON_STR = __read_file(os.path.join(os.path.dirname(__file__), "schema.avsc"))')
     writer.write('\n\n\n__NAMES, SCHEMA = __get_names_and_schema(SCHEMA_JSON_STR)')
 
@@ -135,11 +197,13 @@ def write_namespace_modules(ns_dict, output_folder):
                 f.write(f"{name} = {name}Class\n")
 
 
-def write_specific_reader(record_types, output_folder, use_logical_types):
+def write_specific_reader(record_types, output_folder, use_logical_types, compact_arrays=None, compact=False):
     """
     Writes specific reader for a avro schema into generated root module
     :param record_types:
     :param output_folder:
+    :param str compact_arrays: Default storage of numeric arrays, see generate_schema
+    :param bool compact: Whether any numeric arrays are stored compactly, by default or by their schema
     :return:
     """
     with open(os.path.join(output_folder, "__init__.py"), "a+") as f:
@@ -148,22 +212,35 @@ def write_specific_reader(record_types, output_folder, use_logical_types):
         writer.write('\nfrom .schema_classes import _json_converter as json_converter')
         for t in record_types:
             writer.write(f'\nfrom .schema_classes import {t.split(".")[-1]}Class')
-        writer.write('\nfrom avro.io import DatumReader')
-        if use_logical_types:
+        writer.write('\nfrom avro.io import DatumReader, DatumWriter')
+        writer.write('\nfrom avrogen import parallel, resolution, reuse')
+        if use_logical_types or compact:
             writer.write('\nfrom avrogen import logical')
+        if compact:
+            writer.write('\nfrom avrogen import numeric_arrays')
 
-        write_reader_impl(record_types, writer, use_logical_types)
+        write_reader_impl(record_types, writer, use_logical_types, compact_arrays, compact)
+        write_writer_impl(writer, use_logical_types, compact)
 
 
-def write_schema_files(schema_json, output_folder, use_logical_types=False, custom_imports=None):
+def write_schema_files(schema_json, output_folder, use_logical_types=False, custom_imports=None, frozen=False,
+                       copy_on_write=False, stubs=False, compact_arrays=None, names=None):
     """
     Generates concrete classes, namespace modules, and a SpecificRecordReader for a given avro schema
     :param str schema_json: JSON containing avro schema
     :param str output_folder: Folder in which to create generated files
     :param list[str] custom_imports: Add additional import modules
+    :param bool frozen: Generate immutable, hashable record classes
+    :param bool copy_on_write: Generate record classes whose deep copies share nested values until modified
+    :param bool stubs: Write type hints to schema_classes.pyi and keep schema_classes.py minimal
+    :param str compact_arrays: Store numeric arrays as "array" or "numpy" arrays, see generate_schema
+    :param schema.Names names: Named types of schema_json if it was parsed already
     :return:
     """
-    schema_py, names = generate_schema(schema_json, use_logical_types, custom_imports)
+    parsed = names if names is not None else _parse_names(schema_json)
+    schema_py, names = generate_schema(schema_json, use_logical_types, custom_imports, frozen=frozen,
+                                       copy_on_write=copy_on_write, stubs=stubs, compact_arrays=compact_arrays,
+                                       names=parsed)
     names = sorted(names)
 
     if not os.path.isdir(output_folder):
@@ -172,6 +249,11 @@ def write_schema_files(schema_json, output_folder, use_logical_types=False, cust
     with open(os.path.join(output_folder, "schema_classes.py"), "w+") as f:
         f.write(schema_py)
 
+    if stubs:
+        with open(os.path.join(output_folder, "schema_classes.pyi"), "w+") as f:
+            f.write(generate_schema_stubs(schema_json, use_logical_types, custom_imports, frozen, copy_on_write,
+                                          compact_arrays, parsed))
+
     with open(os.path.join(output_folder, "schema.avsc"), "w+") as f:
         f.write(schema_json)
 
@@ -181,4 +263,223 @@ def write_schema_files(schema_json, output_folder, use_logical_types=False, cust
         pass  # make sure we create this file from scratch
 
     write_namespace_modules(ns_dict, output_folder)
-    write_specific_reader(names, output_folder, use_logical_types)
+    compact = bool(find_compact_modes([n[1] for n in _named_types(parsed)], compact_arrays))
+    write_specific_reader(names, output_folder, use_logical_types, compact_arrays, compact)
+
+
+def find_schema_files(paths):
+    """
+    Lists schema files: files are taken as they are, directories are searched recursively for .avsc files
+    :param str|list[str] paths: Schema files and directories
+    :return list[str]:
+    """
+    if isinstance(paths, six.string_types):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, dirs, file_names in os.walk(path):
+            dirs.sort()
+            files.extend(os.path.join(root, f) for f in sorted(file_names) if f.endswith('.avsc'))
+    return files
+
+
+def _normalize(json_data, namespace, top=True):
+    """
+    Rewrites a schema so that equal definitions have equal JSON: names are made full, and named types
+    defined inside the schema are replaced by references to them
+    :param json_data: Schema JSON as returned by json.loads
+    :param str namespace: Enclosing namespace
+    :param bool top: Whether json_data is the definition being normalized rather than nested in it
+    :return: Schema JSON
+    """
+    if isinstance(json_data, list):
+        return [_normalize(s, namespace, False) for s in json_data]
+    if isinstance(json_data, six.string_types):
+        if json_data in schema.PRIMITIVE_TYPES:
+            return json_data
+        return schema.Name(json_data, namespace).fullname
+    if not isinstance(json_data, dict):
+        return json_data
+    schema_type = json_data.get('type')
+    if schema_type in ('record', 'error', 'enum', 'fixed'):
+        name = schema.Name(json_data.get('name'), json_data.get('namespace', namespace))
+        if not top:
+            return name.fullname
+        result = {k: v for k, v in six.iteritems(json_data) if k != 'namespace'}
+        result['name'] = name.fullname
+        if schema_type in ('record', 'error'):
+            result['fields'] = [dict(field, type=_normalize(field.get('type'), name.namespace, False))
+                                for field in json_data.get('fields', ())]
+        return result
+    if schema_type == 'array':
+        return dict(json_data, items=_normalize(json_data.get('items'), namespace, False))
+    if schema_type == 'map':
+        return dict(json_data, values=_normalize(json_data.get('values'), namespace, False))
+    return json_data
+
+
+def _definition_key(json_data, namespace):
+    """
+    Returns JSON text which is equal for equal definitions of a named type, see _normalize
+    """
+    return json.dumps(_normalize(json_data, namespace), sort_keys=True)
+
+
+def _reference_known_types(json_data, definitions, namespace, file_name):
+    """
+    Replaces definitions of named types which an earlier file defined already by references to them
+    :param json_data: Schema JSON as returned by json.loads
+    :param dict[str, str] definitions: Definitions of known named types as returned by _definition_key, by full
+                                       name
+    :param str namespace: Enclosing namespace
+    :param str file_name: Schema file, for error messages
+    :return: Schema JSON
+    """
+    if isinstance(json_data, list):
+        return [_reference_known_types(s, definitions, namespace, file_name) for s in json_data]
+    if not isinstance(json_data, dict):
+        return json_data
+    schema_type = json_data.get('type')
+    if schema_type in ('record', 'error', 'enum', 'fixed'):
+        name = schema.Name(json_data.get('name'), json_data.get('namespace', namespace))
+        fields = None
+        if schema_type in ('record', 'error'):
+            # Nested definitions are checked for conflicts even when the enclosing type is known
+            fields = [
+                dict(field, type=_reference_known_types(field.get('type'), definitions, name.namespace, file_name))
+                for field in json_data.get('fields', ())
+            ]
+        if name.fullname in definitions:
+            if definitions[name.fullname] != _definition_key(json_data, namespace):
+                raise schema.SchemaParseException(
+                    'Conflicting definitions of %s in %s' % (name.fullname, file_name))
+            return name.fullname
+        if fields is not None:
+            return dict(json_data, fields=fields)
+    elif schema_type == 'array':
+        return dict(json_data, items=_reference_known_types(json_data.get('items'), definitions, namespace,
+                                                            file_name))
+    elif schema_type == 'map':
+        return dict(json_data, values=_reference_known_types(json_data.get('values'), definitions, namespace,
+                                                             file_name))
+    return json_data
+
+
+def _scan_names(json_data, namespace, definitions, references):
+    """
+    Collects the named types a schema defines, as JSON text by full name, and the full names it references
+    """
+    if isinstance(json_data, list):
+        for s in json_data:
+            _scan_names(s, namespace, definitions, references)
+    elif isinstance(json_data, six.string_types):
+        if json_data not in schema.PRIMITIVE_TYPES:
+            references.add(schema.Name(json_data, namespace).fullname)
+    elif isinstance(json_data, dict):
+        schema_type = json_data.get('type')
+        if schema_type in ('record', 'error', 'enum', 'fixed'):
+            name = schema.Name(json_data.get('name'), json_data.get('namespace', namespace))
+            definitions.setdefault(name.fullname, _definition_key(json_data, namespace))
+            for field in json_data.get('fields', ()):
+                _scan_names(field.get('type'), name.namespace, definitions, references)
+        elif schema_type == 'array':
+            _scan_names(json_data.get('items'), namespace, definitions, references)
+        elif schema_type == 'map':
+            _scan_names(json_data.get('values'), namespace, definitions, references)
+
+
+def _dependency_order(files):
+    """
+    Orders schema files so that every file comes after the files defining the named types it references
+    :param list[tuple[str, object]] files: File names and their schema JSON
+    :return list[tuple[str, object]]:
+    """
+    scanned = []
+    defined_in = {}
+    for i, (file_name, json_data) in enumerate(files):
+        definitions, references = {}, set()
+        _scan_names(json_data, '', definitions, references)
+        scanned.append((definitions, references))
+        for fullname in definitions:
+            defined_in.setdefault(fullname, i)
+
+    order = []
+    state = {}
+
+    def visit(i):
+        if state.get(i) == 'done':
+            return
+        if state.get(i) == 'visiting':
+            raise schema.SchemaParseException('Circular references between schema files: %s' % files[i][0])
+        state[i] = 'visiting'
+        definitions, references = scanned[i]
+        for fullname in sorted(references):
+            j = defined_in.get(fullname)
+            if j is not None and fullname not in definitions:
+                visit(j)
+        state[i] = 'done'
+        order.append(files[i])
+
+    for i in range(len(files)):
+        visit(i)
+    return order
+
+
+def merge_schema_files(paths):
+    """
+    Merges schema files which reference named types of each other into one schema. Files are parsed once each
+    with one shared schema.Names, in an order in which every type is defined before it is referenced, and types
+    which several files define the same way are kept once.
+    :param str|list[str] paths: Schema files and directories of .avsc files
+    :return str: JSON of a union of the top-level schemas of all files, each named type defined exactly once
+    """
+    return _merge_schema_files(paths)[0]
+
+
+def _merge_schema_files(paths):
+    """
+    Merges schema files, see merge_schema_files
+    :param str|list[str] paths: Schema files and directories of .avsc files
+    :return tuple[str, schema.Names]: Merged schema JSON, and the named types parsed while merging
+    """
+    files = []
+    for file_name in find_schema_files(paths):
+        with open(file_name, 'r') as f:
+            files.append((file_name, json.load(f)))
+
+    names = schema.Names()
+    definitions = {}
+    merged = []
+    for file_name, json_data in _dependency_order(files):
+        json_data = _reference_known_types(json_data, definitions, '', file_name)
+        try:
+            make_avsc_object(json_data, names)
+        except schema.SchemaParseException as e:
+            raise schema.SchemaParseException('%s: %s' % (file_name, e))
+        _scan_names(json_data, '', definitions, set())
+        # References to types of other files add nothing to the union
+        merged.extend(s for s in (json_data if isinstance(json_data, list) else [json_data])
+                      if not isinstance(s, six.string_types))
+    return json.dumps(merged, indent=2), names
+
+
+def write_schema_set_files(paths, output_folder, use_logical_types=False, custom_imports=None, frozen=False,
+                           copy_on_write=False, stubs=False, compact_arrays=None):
+    """
+    Generates one package for a set of schema files which may reference named types defined in other files,
+    see merge_schema_files. Every named type is generated once.
+    :param str|list[str] paths: Schema files and directories of .avsc files
+    :param str output_folder: Folder in which to create generated files
+    :param list[str] custom_imports: Add additional import modules
+    :param bool frozen: Generate immutable, hashable record classes
+    :param bool copy_on_write: Generate record classes whose deep copies share nested values until modified
+    :param bool stubs: Write type hints to schema_classes.pyi and keep schema_classes.py minimal
+    :param str compact_arrays: Store numeric arrays as "array" or "numpy" arrays, see generate_schema
+    :return:
+    """
+    schema_json, names = _merge_schema_files(paths)
+    write_schema_files(schema_json, output_folder, use_logical_types, custom_imports, frozen=frozen,
+                       copy_on_write=copy_on_write, stubs=stubs, compact_arrays=compact_arrays, names=names)
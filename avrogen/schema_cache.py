@@ -0,0 +1,143 @@
+import json
+import threading
+
+import six
+from avro import schema
+from avro.schema import SchemaFromJSONData as make_avsc_object
+
+from . import fingerprint
+
+_NAMED_TYPES = ('record', 'error', 'enum', 'fixed')
+
+
+def _named_types(schema_, found):
+    """
+    Collects the named schemas reachable from a schema by full name
+    :param schema.Schema schema_:
+    :param dict[str, schema.NamedSchema] found:
+    :return dict[str, schema.NamedSchema]: found
+    """
+    if isinstance(schema_, schema.NamedSchema):
+        if schema_.fullname in found:
+            return found
+        found[schema_.fullname] = schema_
+        if isinstance(schema_, schema.RecordSchema):
+            for field in schema_.fields:
+                _named_types(field.type, found)
+    elif isinstance(schema_, schema.ArraySchema):
+        _named_types(schema_.items, found)
+    elif isinstance(schema_, schema.MapSchema):
+        _named_types(schema_.values, found)
+    elif isinstance(schema_, schema.UnionSchema):
+        for s in schema_.schemas:
+            _named_types(s, found)
+    return found
+
+
+class SchemaCache(object):
+    """
+    Process-wide registry of parsed named schemas, keyed by the fingerprint of their Parsing Canonical Form.
+    Generated packages parse their schemas through it, so a named type which several packages define the same
+    way is parsed once and the packages share the same schema object, which caches keyed by schema identity
+    then treat as one schema.
+
+    Canonical forms leave out docs, defaults, aliases and logical types, so schemas with the same fingerprint are
+    only shared if their full JSON is equal too.
+    """
+
+    def __init__(self):
+        self._entries = {}  # type: dict[bytes, list[tuple[str, schema.NamedSchema]]]
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(named):
+        return (fingerprint.schema_fingerprint(named),
+                json.dumps(named.to_json(), sort_keys=True, separators=(',', ':'), default=dict))
+
+    def lookup(self, named):
+        """
+        Returns the shared schema equal to a named schema, or None if there is none yet
+        :param schema.NamedSchema named:
+        :return schema.NamedSchema:
+        """
+        fp, full_json = self._key(named)
+        for candidate_json, candidate in self._entries.get(fp, ()):
+            if candidate_json == full_json:
+                return candidate
+        return None
+
+    def intern(self, named):
+        """
+        Returns the shared schema equal to a named schema, registering the schema itself if there is none yet
+        :param schema.NamedSchema named:
+        :return schema.NamedSchema:
+        """
+        fp, full_json = self._key(named)
+        with self._lock:
+            bucket = self._entries.setdefault(fp, [])
+            for candidate_json, candidate in bucket:
+                if candidate_json == full_json:
+                    return candidate
+            bucket.append((full_json, named))
+            return named
+
+    def parse(self, json_data):
+        """
+        Parses a schema, reusing the shared schemas of named types defined the same way by earlier parses, and
+        registers the named types it defines
+        :param json_data: Schema JSON as returned by json.loads
+        :return tuple[schema.Names, schema.Schema]: Names of all named types the schema defines, and the schema
+        """
+        names = schema.Names()
+        parsed = make_avsc_object(json_data, names)
+        with self._lock:
+            shared = {}
+            for fullname, named in six.iteritems(names.names):
+                existing = self.lookup(named)
+                if existing is not None:
+                    shared[fullname] = existing
+            if shared:
+                # Parse again with the definitions of shared types replaced by references to the shared schemas
+                known = {}
+                json_data = self._replace_shared(json_data, shared, known, '')
+                names = schema.Names(names=known)
+                parsed = make_avsc_object(json_data, names)
+            for named in list(six.itervalues(names.names)):
+                self.intern(named)
+        return names, parsed
+
+    def _replace_shared(self, json_data, shared, known, namespace):
+        if isinstance(json_data, list):
+            return [self._replace_shared(s, shared, known, namespace) for s in json_data]
+        if not isinstance(json_data, dict):
+            return json_data
+        schema_type = json_data.get('type')
+        if schema_type in _NAMED_TYPES:
+            name = schema.Name(json_data.get('name'), json_data.get('namespace', namespace))
+            # A reference to a type without namespace can't be written from within a namespace
+            if name.fullname in shared and (name.namespace or not namespace):
+                for fullname, named in six.iteritems(_named_types(shared[name.fullname], {})):
+                    known.setdefault(fullname, named)
+                return name.fullname
+            if schema_type in ('record', 'error'):
+                result = dict(json_data)
+                result['fields'] = [
+                    dict(field, type=self._replace_shared(field.get('type'), shared, known, name.namespace))
+                    for field in json_data.get('fields', ())
+                ]
+                return result
+        elif schema_type == 'array':
+            return dict(json_data, items=self._replace_shared(json_data.get('items'), shared, known, namespace))
+        elif schema_type == 'map':
+            return dict(json_data, values=self._replace_shared(json_data.get('values'), shared, known, namespace))
+        return json_data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in six.itervalues(self._entries))
+
+
+DEFAULT_SCHEMA_CACHE = SchemaCache()
@@ -0,0 +1,156 @@
+import io
+import threading
+
+from avro import io as avro_io
+
+from . import fingerprint as fingerprint_, numeric_arrays
+from .logical import LogicalDatumReader, LogicalDatumWriter
+
+MAGIC = b'\xc3\x01'
+FINGERPRINT_SIZE = 8
+HEADER_SIZE = len(MAGIC) + FINGERPRINT_SIZE
+
+
+class SpecificRecordReader(numeric_arrays.CompactArrayReaderMixin, LogicalDatumReader):
+    """
+    DatumReader which wraps decoded records into generated classes
+    :param schema.Schema writers_schema: Writer's schema
+    :param schema.Schema readers_schema: Reader's schema
+    :param dict[str, logical.LogicalTypeProcessor] logical_types: Logical types dict, None to disable conversion
+    :param dict[str, type] schema_types: Generated classes by schema name
+    :param str compact_arrays: Package-wide compact array mode, None for lists
+    """
+
+    def __init__(self, writers_schema=None, readers_schema=None, logical_types=None, schema_types=None,
+                 compact_arrays=None):
+        super(SpecificRecordReader, self).__init__(writers_schema, readers_schema, logical_types)
+        self.schema_types = schema_types or {}
+        self.compact_arrays = compact_arrays
+
+    def read_record(self, writers_schema, readers_schema, decoder):
+        result = super(SpecificRecordReader, self).read_record(writers_schema, readers_schema, decoder)
+        klass = self.schema_types.get(readers_schema.fullname) or \
+            self.schema_types.get(readers_schema.fullname.lstrip('.'))
+        return klass(result) if klass is not None else result
+
+
+class SingleObjectCodec(object):
+    """
+    Encodes generated records with the Avro single object encoding: the C3 01 marker, the CRC-64-AVRO
+    fingerprint of the writer's schema (little-endian) and the binary encoded record.
+
+    Canonical form and fingerprint of every class are computed once. Decoding looks the fingerprint up in
+    a table of all generated record classes, which is built on the first decode.
+
+    :param dict[str, type] schema_types: Generated classes by schema name
+    :param dict[str, logical.LogicalTypeProcessor] logical_types: Logical types dict, None to disable conversion
+    :param validation.ValidationPolicy|str validation_policy: Validation of encoded records
+    :param str compact_arrays: Package-wide compact array mode of decoded records, None for lists
+    """
+
+    def __init__(self, schema_types, logical_types=None, validation_policy=None, compact_arrays=None):
+        self.schema_types = schema_types
+        self.logical_types = logical_types or {}
+        self.validation_policy = validation_policy
+        self.compact_arrays = compact_arrays
+        self._fingerprints = {}
+        self._encoders = {}
+        self._decoders = None
+        self._lock = threading.Lock()
+
+    def canonical_form(self, klass):
+        """
+        :param type klass: Generated record class
+        :return str: Parsing Canonical Form of the class's schema
+        """
+        return self._fingerprint(klass)[0]
+
+    def fingerprint(self, klass):
+        """
+        :param type klass: Generated record class
+        :return bytes: CRC-64-AVRO fingerprint of the class's schema
+        """
+        return self._fingerprint(klass)[1]
+
+    def _fingerprint(self, klass):
+        entry = self._fingerprints.get(klass)
+        if entry is None:
+            # Classes generated with fingerprints carry them as constants
+            canonical_form = getattr(klass, 'CANONICAL_FORM', None)
+            if canonical_form is None:
+                canonical_form = fingerprint_.parsing_canonical_form(klass.RECORD_SCHEMA)
+            crc64 = getattr(klass, 'FINGERPRINT_CRC64', None) or fingerprint_.fingerprint(canonical_form)
+            entry = canonical_form, crc64
+            self._fingerprints[klass] = entry
+        return entry
+
+    def encode(self, record):
+        """
+        :param dict_wrapper.DictWrapper record: Instance of a generated record class
+        :return bytes:
+        """
+        klass = type(record)
+        entry = self._encoders.get(klass)
+        if entry is None:
+            writer = LogicalDatumWriter(klass.RECORD_SCHEMA, self.logical_types, self.validation_policy)
+            entry = self._encoders[klass] = (MAGIC + self.fingerprint(klass), writer)
+        header, writer = entry
+
+        out = io.BytesIO()
+        out.write(header)
+        writer.write(record, avro_io.BinaryEncoder(out))
+        return out.getvalue()
+
+    def decode(self, data):
+        """
+        Decodes a single object encoded record into the generated class its fingerprint belongs to
+        :param bytes data:
+        :return dict_wrapper.DictWrapper:
+        """
+        if data[:2] != MAGIC:
+            raise ValueError('Not a single object encoded record')
+        decoders = self._decoders
+        if decoders is None:
+            decoders = self._build_decoders()
+        reader = decoders.get(bytes(data[2:HEADER_SIZE]))
+        if reader is None:
+            raise ValueError('Unknown schema fingerprint: %s' % bytes(data[2:HEADER_SIZE]).hex())
+
+        stream = io.BytesIO(data)
+        stream.seek(HEADER_SIZE)
+        return reader.read(avro_io.BinaryDecoder(stream))
+
+    def _build_decoders(self):
+        with self._lock:
+            if self._decoders is None:
+                decoders = {}
+                for klass in set(self.schema_types.values()):
+                    record_schema = getattr(klass, 'RECORD_SCHEMA', None)
+                    if record_schema is None:
+                        continue
+                    decoders.setdefault(self.fingerprint(klass), SpecificRecordReader(
+                        record_schema, record_schema, self.logical_types, self.schema_types, self.compact_arrays))
+                self._decoders = decoders
+        return self._decoders
+
+
+_CODECS_LOCK = threading.Lock()
+
+
+def get_codec(converter):
+    """
+    Returns the SingleObjectCodec for the generated classes registered with the converter. The codec is kept on
+    the converter, so it lives exactly as long as the generated package it belongs to.
+    :param avrojson.AvroJsonConverter converter:
+    :return SingleObjectCodec:
+    """
+    codec = getattr(converter, '_single_object_codec', None)
+    if codec is None:
+        with _CODECS_LOCK:
+            codec = getattr(converter, '_single_object_codec', None)
+            if codec is None:
+                codec = SingleObjectCodec(converter.schema_types,
+                                          converter.logical_types if converter.use_logical_types else None,
+                                          converter.validation_policy, converter.compact_arrays)
+                converter._single_object_codec = codec
+    return codec
@@ -0,0 +1,265 @@
+import functools
+import struct
+
+from .weak_cache import CompiledSchemaCache
+
+_FLOAT = struct.Struct('<f')
+_DOUBLE = struct.Struct('<d')
+
+
+def _read_long(buf, pos):
+    b = buf[pos]
+    pos += 1
+    n = b & 0x7F
+    shift = 7
+    while b & 0x80:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        shift += 7
+    return (n >> 1) ^ -(n & 1), pos
+
+
+def _cmp(x, y):
+    return (x > y) - (x < y)
+
+
+class EncodedComparators(object):
+    """
+    Compiles schemas into functions which compare two Avro binary encoded values following the sort order of the
+    Avro specification, without decoding them. Records are compared field by field in schema order, respecting
+    the ascending, descending and ignore field orders, and comparison stops at the first differing field.
+    Compiled functions are cached per schema object.
+
+    Comparators have the signature cmp(a, i, b, j) -> (result, i, j): they compare the values starting at
+    offset i of a and offset j of b and return the offsets past both values. Once result is non-zero the
+    returned offsets are meaningless. Skippers have the signature skip(buf, i) -> i.
+    """
+
+    def __init__(self):
+        self._comparators = CompiledSchemaCache(self._compile_comparator)
+        self._skippers = CompiledSchemaCache(self._compile_skipper)
+
+    def comparator(self, schema_):
+        return self._comparators.get(schema_)
+
+    def skipper(self, schema_):
+        return self._skippers.get(schema_)
+
+    def _compile_comparator(self, schema_):
+        schema_type = schema_.type
+        if schema_type == 'null':
+            return lambda a, i, b, j: (0, i, j)
+        elif schema_type == 'boolean':
+            return lambda a, i, b, j: (_cmp(a[i], b[j]), i + 1, j + 1)
+        elif schema_type in ('int', 'long', 'enum'):
+            return _compare_long
+        elif schema_type == 'float':
+            return _make_compare_struct(_FLOAT)
+        elif schema_type == 'double':
+            return _make_compare_struct(_DOUBLE)
+        elif schema_type in ('bytes', 'string'):
+            return _compare_bytes
+        elif schema_type == 'fixed':
+            return _make_compare_fixed(schema_.size)
+        elif schema_type == 'array':
+            return self._compile_compare_array(schema_)
+        elif schema_type in ('union', 'error_union'):
+            return self._compile_compare_union(schema_)
+        elif schema_type in ('record', 'error', 'request'):
+            return self._compile_compare_record(schema_)
+        raise TypeError('Values of %s schemas cannot be compared' % schema_type)
+
+    def _compile_compare_array(self, schema_):
+        items = self.comparator(schema_.items)
+
+        def compare_array(a, i, b, j):
+            count_a, i = _read_long(a, i)
+            if count_a < 0:
+                count_a = -count_a
+                _, i = _read_long(a, i)
+            count_b, j = _read_long(b, j)
+            if count_b < 0:
+                count_b = -count_b
+                _, j = _read_long(b, j)
+            while count_a and count_b:
+                r, i, j = items(a, i, b, j)
+                if r:
+                    return r, i, j
+                count_a -= 1
+                if not count_a:
+                    count_a, i = _read_long(a, i)
+                    if count_a < 0:
+                        count_a = -count_a
+                        _, i = _read_long(a, i)
+                count_b -= 1
+                if not count_b:
+                    count_b, j = _read_long(b, j)
+                    if count_b < 0:
+                        count_b = -count_b
+                        _, j = _read_long(b, j)
+            # The shorter array is a prefix of the longer one
+            return _cmp(bool(count_a), bool(count_b)), i, j
+
+        return compare_array
+
+    def _compile_compare_union(self, schema_):
+        branches = [self.comparator(s) for s in schema_.schemas]
+
+        def compare_union(a, i, b, j):
+            index_a, i = _read_long(a, i)
+            index_b, j = _read_long(b, j)
+            if index_a != index_b:
+                return _cmp(index_a, index_b), i, j
+            return branches[index_a](a, i, b, j)
+
+        return compare_union
+
+    def _compile_compare_record(self, schema_):
+        fields = []
+        for field in schema_.fields:
+            if field.order == 'ignore':
+                fields.append((None, self.skipper(field.type), 1))
+            else:
+                fields.append((self.comparator(field.type), None, -1 if field.order == 'descending' else 1))
+        fields = tuple(fields)
+
+        def compare_record(a, i, b, j):
+            for cmp, skip, sign in fields:
+                if skip is not None:
+                    i = skip(a, i)
+                    j = skip(b, j)
+                    continue
+                r, i, j = cmp(a, i, b, j)
+                if r:
+                    return r * sign, i, j
+            return 0, i, j
+
+        return compare_record
+
+    def _compile_skipper(self, schema_):
+        schema_type = schema_.type
+        if schema_type == 'null':
+            return lambda buf, i: i
+        elif schema_type == 'boolean':
+            return lambda buf, i: i + 1
+        elif schema_type in ('int', 'long', 'enum'):
+            return lambda buf, i: _read_long(buf, i)[1]
+        elif schema_type == 'float':
+            return lambda buf, i: i + 4
+        elif schema_type == 'double':
+            return lambda buf, i: i + 8
+        elif schema_type in ('bytes', 'string'):
+            return _skip_bytes
+        elif schema_type == 'fixed':
+            size = schema_.size
+            return lambda buf, i: i + size
+        elif schema_type in ('array', 'map'):
+            return self._compile_skip_blocks(schema_)
+        elif schema_type in ('union', 'error_union'):
+            return self._compile_skip_union(schema_)
+        elif schema_type in ('record', 'error', 'request'):
+            return self._compile_skip_record(schema_)
+        raise TypeError('Unknown schema type: %s' % schema_type)
+
+    def _compile_skip_blocks(self, schema_):
+        if schema_.type == 'array':
+            items = self.skipper(schema_.items)
+        else:
+            values = self.skipper(schema_.values)
+
+            def items(buf, i):
+                return values(buf, _skip_bytes(buf, i))
+
+        def skip_blocks(buf, i):
+            count, i = _read_long(buf, i)
+            while count:
+                if count < 0:
+                    # Negative count is followed by the block size in bytes
+                    size, i = _read_long(buf, i)
+                    i += size
+                else:
+                    for _ in range(count):
+                        i = items(buf, i)
+                count, i = _read_long(buf, i)
+            return i
+
+        return skip_blocks
+
+    def _compile_skip_union(self, schema_):
+        branches = [self.skipper(s) for s in schema_.schemas]
+
+        def skip_union(buf, i):
+            index, i = _read_long(buf, i)
+            return branches[index](buf, i)
+
+        return skip_union
+
+    def _compile_skip_record(self, schema_):
+        fields = tuple(self.skipper(f.type) for f in schema_.fields)
+
+        def skip_record(buf, i):
+            for skip in fields:
+                i = skip(buf, i)
+            return i
+
+        return skip_record
+
+
+def _compare_long(a, i, b, j):
+    x, i = _read_long(a, i)
+    y, j = _read_long(b, j)
+    return _cmp(x, y), i, j
+
+
+def _make_compare_struct(fmt):
+    unpack_from = fmt.unpack_from
+    size = fmt.size
+
+    def compare_struct(a, i, b, j):
+        return _cmp(unpack_from(a, i)[0], unpack_from(b, j)[0]), i + size, j + size
+
+    return compare_struct
+
+
+def _compare_bytes(a, i, b, j):
+    len_a, i = _read_long(a, i)
+    len_b, j = _read_long(b, j)
+    return _cmp(a[i:i + len_a], b[j:j + len_b]), i + len_a, j + len_b
+
+
+def _make_compare_fixed(size):
+    def compare_fixed(a, i, b, j):
+        return _cmp(a[i:i + size], b[j:j + size]), i + size, j + size
+
+    return compare_fixed
+
+
+def _skip_bytes(buf, i):
+    size, i = _read_long(buf, i)
+    return i + size
+
+
+DEFAULT_COMPARATORS = EncodedComparators()
+
+
+def compare_encoded(schema_, a, b):
+    """
+    Compares two Avro binary encoded values of a schema following the Avro sort order
+    :param schema.Schema schema_:
+    :param bytes a:
+    :param bytes b:
+    :return int: Negative if a sorts before b, positive if after, 0 if they are equal
+    """
+    return DEFAULT_COMPARATORS.comparator(schema_)(a, 0, b, 0)[0]
+
+
+def sort_key_encoded(schema_):
+    """
+    Returns a key function for sorted() and list.sort() which orders Avro binary encoded values of a schema
+    following the Avro sort order
+    :param schema.Schema schema_:
+    :return:
+    """
+    cmp = DEFAULT_COMPARATORS.comparator(schema_)
+    return functools.cmp_to_key(lambda a, b: cmp(a, 0, b, 0)[0])
@@ -0,0 +1,240 @@
+import threading
+from typing import Dict, FrozenSet, Optional
+
+import six
+
+from . import numeric_arrays
+from .weak_cache import CompiledSchemaCache, SchemaWeakCache
+
+INT_MIN_VALUE = -(1 << 31)
+INT_MAX_VALUE = (1 << 31) - 1
+LONG_MIN_VALUE = -(1 << 63)
+LONG_MAX_VALUE = (1 << 63) - 1
+
+_PRIMITIVE_VALIDATORS = {
+    'null': lambda d: d is None,
+    'boolean': lambda d: isinstance(d, bool),
+    'string': lambda d: isinstance(d, six.string_types),
+    'bytes': lambda d: isinstance(d, bytes),
+    'int': lambda d: isinstance(d, six.integer_types) and INT_MIN_VALUE <= d <= INT_MAX_VALUE,
+    'long': lambda d: isinstance(d, six.integer_types) and LONG_MIN_VALUE <= d <= LONG_MAX_VALUE,
+    'float': lambda d: isinstance(d, six.integer_types + (float,)),
+    'double': lambda d: isinstance(d, six.integer_types + (float,)),
+}
+
+
+class SchemaValidators(object):
+    """
+    Compiles schemas into validator functions which return True if a datum conforms to the schema.
+    Validators stop at the first failing element and are cached per schema object.
+
+    If logical_types is given, schemas with a logical type whose processor can convert them are validated
+    with the processor's validate(); otherwise the logical type is ignored and the underlying type is validated.
+    """
+
+    def __init__(self, logical_types=None):
+        self.logical_types = dict(logical_types) if logical_types else {}
+        self._validators = CompiledSchemaCache(self._compile)
+
+    def get(self, schema_):
+        """
+        Returns a compiled validator for the schema
+        :param schema.Schema schema_:
+        :return: callable(datum) -> bool
+        """
+        return self._validators.get(schema_)
+
+    def validate(self, schema_, datum):
+        return self.get(schema_)(datum)
+
+    def _compile(self, schema_):
+        logical_type = schema_.props.get('logicalType') if self.logical_types else None
+        if logical_type:
+            lt = self.logical_types.get(logical_type)
+            if lt is not None and lt.can_convert(schema_):
+                return lambda d: lt.validate(schema_, d)
+
+        schema_type = schema_.type
+        if schema_type in _PRIMITIVE_VALIDATORS:
+            return _PRIMITIVE_VALIDATORS[schema_type]
+        elif schema_type == 'fixed':
+            size = schema_.size
+            return lambda d: isinstance(d, bytes) and len(d) == size
+        elif schema_type == 'enum':
+            symbols = schema_.symbols
+            return lambda d: isinstance(d, six.string_types) and d in symbols
+        elif schema_type == 'array':
+            return self._compile_array(schema_)
+        elif schema_type == 'map':
+            return self._compile_map(schema_)
+        elif schema_type in ('union', 'error_union'):
+            return self._compile_union(schema_)
+        elif schema_type in ('record', 'error', 'request'):
+            return self._compile_record(schema_)
+        return lambda d: False
+
+    def _compile_array(self, schema_):
+        items = self.get(schema_.items)
+        items_type = schema_.items.type
+        if items_type not in numeric_arrays.TYPECODES or schema_.items.props.get('logicalType'):
+            items_type = None
+
+        def validate_array(datum):
+            if not isinstance(datum, list):
+                return items_type is not None and numeric_arrays.matches(datum, items_type)
+            for item in datum:
+                if not items(item):
+                    return False
+            return True
+
+        return validate_array
+
+    def _compile_map(self, schema_):
+        values = self.get(schema_.values)
+
+        def validate_map(datum):
+            if not isinstance(datum, dict):
+                return False
+            for key, value in six.iteritems(datum):
+                if not isinstance(key, six.string_types) or not values(value):
+                    return False
+            return True
+
+        return validate_map
+
+    def _compile_union(self, schema_):
+        branches = [self.get(s) for s in schema_.schemas]
+
+        def validate_union(datum):
+            for branch in branches:
+                if branch(datum):
+                    return True
+            return False
+
+        return validate_union
+
+    def _compile_record(self, schema_):
+        fields = tuple((f.name, self.get(f.type)) for f in schema_.fields)
+
+        def validate_record(datum):
+            if not isinstance(datum, dict):
+                return False
+            get = datum.get
+            for name, validator in fields:
+                if not validator(get(name)):
+                    return False
+            return True
+
+        return validate_record
+
+
+VALIDATION_FULL = 'full'
+VALIDATION_SAMPLED = 'sampled'
+VALIDATION_OFF = 'off'
+VALIDATION_LEVELS = frozenset([VALIDATION_FULL, VALIDATION_SAMPLED, VALIDATION_OFF])
+
+
+class ValidationPolicy(object):
+    """
+    Decides which top level records get validated before they are converted or written, and counts
+    the outcome.
+
+    - full: every record is validated
+    - sampled: the first record of every schema and then every sample_rate-th record of that schema
+    - off: records are never validated
+
+    :param str level: One of full, sampled, off
+    :param int sample_rate: Validate 1 in sample_rate records when level is sampled
+    """
+
+    def __init__(self, level=VALIDATION_FULL, sample_rate=100):
+        if level not in VALIDATION_LEVELS:
+            raise ValueError('Unknown validation level: %r' % level)
+        if sample_rate < 1:
+            raise ValueError('sample_rate must be positive')
+        self.level = level
+        self.sample_rate = sample_rate
+        self.validated = 0
+        self.failed = 0
+        self.skipped = 0
+        self._seen = SchemaWeakCache()
+
+    def should_validate(self, schema_):
+        if self.level == VALIDATION_FULL:
+            return True
+        elif self.level == VALIDATION_OFF:
+            return False
+        seen = self._seen.get(schema_)
+        if seen is None:
+            seen = self._seen.set(schema_, [0])
+        count = seen[0]
+        seen[0] = count + 1
+        return count % self.sample_rate == 0
+
+    def check(self, validator, schema_, datum):
+        """
+        Validates the datum if the policy selects it
+        :param validator: callable(datum) -> bool
+        :param schema.Schema schema_: Schema of the datum, used for per schema sampling
+        :param datum:
+        :return bool: False only if the datum was validated and failed
+        """
+        if not self.should_validate(schema_):
+            self.skipped += 1
+            return True
+        self.validated += 1
+        if validator(datum):
+            return True
+        self.failed += 1
+        return False
+
+    def stats(self):
+        return {'level': self.level, 'validated': self.validated, 'failed': self.failed, 'skipped': self.skipped}
+
+    def reset(self):
+        self.validated = 0
+        self.failed = 0
+        self.skipped = 0
+        self._seen.clear()
+
+
+def make_policy(policy=None):
+    """
+    Returns a ValidationPolicy for a policy instance, a level name, or None (full validation)
+    :param ValidationPolicy|str policy:
+    :return ValidationPolicy:
+    """
+    if policy is None:
+        return ValidationPolicy()
+    if isinstance(policy, six.string_types):
+        return ValidationPolicy(policy)
+    return policy
+
+
+def logical_types_key(logical_types):
+    """
+    Returns a hashable key of a logical types mapping by value, equal for mappings holding the same processors
+    :param dict[str, avrogen.logical.LogicalTypeProcessor] logical_types:
+    :return frozenset:
+    """
+    return frozenset(six.iteritems(logical_types)) if logical_types else None
+
+
+_SHARED = {}  # type: Dict[Optional[FrozenSet], SchemaValidators]
+_SHARED_LOCK = threading.Lock()
+
+
+def get_validators(logical_types=None):
+    """
+    Returns process-wide SchemaValidators for the logical types mapping, so that every converter and writer
+    configured with the same logical types shares compiled validators. Mappings are compared by value, so
+    mappings created over and over for the same processors share one entry.
+    :param dict[str, avrogen.logical.LogicalTypeProcessor] logical_types:
+    :return SchemaValidators:
+    """
+    key = logical_types_key(logical_types)
+    validators = _SHARED.get(key)
+    if validators is None:
+        with _SHARED_LOCK:
+            validators = _SHARED.setdefault(key, SchemaValidators(logical_types))
+    return validators
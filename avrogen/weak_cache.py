@@ -0,0 +1,106 @@
+import threading
+import weakref
+
+import six
+
+
+class SchemaWeakCache(object):
+    """
+    Maps schema objects to precomputed values by identity. Avro schema objects define __eq__ without __hash__,
+    so they cannot be used with WeakKeyDictionary; entries are keyed by id() instead and removed when the
+    schema object is garbage collected.
+    """
+
+    __slots__ = ['_entries', '__weakref__']
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, schema_, default=None):
+        entry = self._entries.get(id(schema_))
+        if entry is None:
+            return default
+        return entry[1]
+
+    def set(self, schema_, value):
+        key = id(schema_)
+        entries = self._entries
+        entries[key] = (weakref.ref(schema_, lambda _, key=key: entries.pop(key, None)), value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, schema_):
+        return id(schema_) in self._entries
+
+
+class CompiledSchemaCache(object):
+    """
+    Caches functions compiled from schema objects, which may refer to themselves through named types. Functions
+    are published only once they are complete: compilation holds a lock, a schema reached again while it is being
+    compiled resolves to a stub which forwards calls to the finished function, and the functions of all schemas
+    compiled along the way are published together when the outermost compilation succeeds, or discarded if it
+    fails. Other threads never see half-built functions.
+
+    :param compile_: callable(schema) returning the function for a schema, getting those of nested schemas from
+                     this cache
+    """
+
+    __slots__ = ['_compile', '_functions', '_pending', '_compiled', '_lock']
+
+    def __init__(self, compile_):
+        self._compile = compile_
+        self._functions = SchemaWeakCache()
+        self._pending = {}
+        self._compiled = {}
+        self._lock = threading.RLock()
+
+    def get(self, schema_):
+        function = self._functions.get(schema_)
+        if function is None:
+            with self._lock:
+                function = self._functions.get(schema_)
+                if function is None:
+                    key = id(schema_)
+                    entry = self._compiled.get(key)
+                    function = entry[1] if entry is not None else self._pending.get(key)
+                if function is None:
+                    function = self._compile_complete(schema_)
+        return function
+
+    def _compile_complete(self, schema_):
+        key = id(schema_)
+        compiled = []
+        outermost = not self._pending
+
+        def forward(*args):
+            return compiled[0](*args)
+
+        self._pending[key] = forward
+        try:
+            function = self._compile(schema_)
+            compiled.append(function)
+            # Keep the schema alive so that its identity is not reused before the function is published
+            self._compiled[key] = (schema_, function)
+            if outermost:
+                for nested_schema, nested_function in six.itervalues(self._compiled):
+                    self._functions.set(nested_schema, nested_function)
+        finally:
+            del self._pending[key]
+            if outermost:
+                self._compiled.clear()
+        return function
+
+    def clear(self):
+        with self._lock:
+            self._functions.clear()
+
+    def __len__(self):
+        return len(self._functions)
+
+    def __contains__(self, schema_):
+        return schema_ in self._functions
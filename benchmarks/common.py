@@ -0,0 +1,227 @@
+import datetime
+import decimal
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from avro import datafile
+
+import avrogen.schema
+from avrogen import logical
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'schemas')
+
+
+def read_schema(file_name):
+    """
+    Reads a bundled test schema. Protocols are reduced to their named types, compiled as a union schema.
+    :param str file_name:
+    :return str:
+    """
+    with open(os.path.join(SCHEMA_DIR, file_name)) as f:
+        schema_json = f.read()
+    if file_name.endswith('.avpr'):
+        protocol = json.loads(schema_json)
+        types = [dict(t, namespace=t.get('namespace', protocol.get('namespace'))) for t in protocol['types']]
+        schema_json = json.dumps(types)
+    return schema_json
+
+
+def make_tweet(module, i):
+    ns = importlib.import_module('.com.bifflabs.grok.model.common.avro', module.__name__)
+    tweet = importlib.import_module('.com.bifflabs.grok.model.twitter.avro', module.__name__).AvroTweet()
+    tweet.ID = i
+    tweet.text = 'Benchmark tweet %d' % i
+    tweet.authorScreenName = 'author%d' % (i % 100)
+    tweet.authorProfileImageURL = 'http://example.com/%d.png' % i
+    tweet.authorUserID = i % 1000
+    tweet.location = ns.AvroPoint(latitude=i / 1000.0, longitude=-i / 1000.0)
+    tweet.placeID = 'place%d' % (i % 10)
+    tweet.createdAt = ns.AvroDateTime(dateTimeString='2016-10-10 10:10:10')
+    tweet.metadata.mentionedScreenNames = ns.AvroKnowableListString(known=True, data=['a', 'b', 'c'])
+    tweet.metadata.hashtags = ns.AvroKnowableListString(known=True, data=['#%d' % i])
+    tweet.metadata.isRetweet = ns.AvroKnowableBoolean(known=True, data=bool(i % 2))
+    return tweet
+
+
+def make_logical(module, i):
+    record = module.LogicalTypesTest()
+    record.decimalField = decimal.Decimal(i) / 7
+    record.dateField = datetime.date(2000, 1, 1) + datetime.timedelta(days=i % 10000)
+    record.timeMillisField = datetime.time(i % 24, i % 60, i % 60, (i % 1000) * 1000)
+    record.timeMicrosField = datetime.time(i % 24, i % 60, i % 60, i % 1000000)
+    record.timestampMillisField = datetime.datetime(2000, 1, 1, tzinfo=logical.local_timezone()) + \
+        datetime.timedelta(milliseconds=i)
+    record.timestampMicrosField = datetime.datetime(2000, 1, 1, tzinfo=logical.local_timezone()) + \
+        datetime.timedelta(microseconds=i)
+    # timestamp-micros is not converted on an int schema
+    record.timestampMicrosFieldWithDefault = i
+    return record
+
+
+def make_linked_list(module, i, depth=5):
+    record = None
+    for j in range(depth):
+        record = module.LongList(value=i * depth + j, next=record)
+    return record
+
+
+def make_array_record(module, i):
+    return module.LongList(value=i, next=float(i) if i % 2 else i, hello=[float(j) for j in range(i % 16)])
+
+
+def make_account(module, i):
+    return importlib.import_module('.org.sample', module.__name__).Account(id=i, name='account%d' % i,
+                                                                          description=None if i % 2 else 'desc')
+
+
+# name: (schema file, use_logical_types, record factory)
+CASES = {
+    'tweet': ('tweet.json', False, make_tweet),
+    'logical': ('logical_types.json', True, make_logical),
+    'recursive': ('recursive_record.json', False, make_linked_list),
+    'array': ('record_with_array.json', False, make_array_record),
+    'account': ('sample.avpr', False, make_account),
+}
+
+
+class GeneratedPackages(object):
+    """
+    Generates the benchmark packages into a temporary directory which is added to sys.path
+    """
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='avrogen_bench')
+        sys.path.insert(0, self.directory)
+        self._modules = {}
+
+    def load(self, name):
+        """
+        Generates and imports the package of a case
+        :param str name: Case name
+        :return: Root module of the generated package
+        """
+        module = self._modules.get(name)
+        if module is None:
+            schema_file, use_logical_types = CASES[name][:2]
+            package = 'avrogen_bench_' + name
+            avrogen.schema.write_schema_files(read_schema(schema_file), os.path.join(self.directory, package),
+                                              use_logical_types=use_logical_types)
+            module = self._modules[name] = importlib.import_module(package)
+        return module
+
+    def close(self):
+        if self.directory in sys.path:
+            sys.path.remove(self.directory)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def make_records(name, module, count):
+    factory = CASES[name][2]
+    return [factory(module, i) for i in range(count)]
+
+
+def encode_container(module, records, codec='null', parallel=False):
+    """
+    Writes records to an in-memory container file
+    :param bool parallel: Write with the generated SpecificDataFileWriter, compressing blocks in a thread pool
+    :return bytes:
+    """
+    out = io.BytesIO()
+    schema_ = type(records[0]).RECORD_SCHEMA
+    if parallel:
+        df = module.SpecificDataFileWriter(out, schema_, logical.LogicalDatumWriter(), codec=codec)
+    else:
+        df = datafile.DataFileWriter(out, logical.LogicalDatumWriter(), schema_, codec=codec)
+    for record in records:
+        df.append(record)
+    df.flush()
+    data = out.getvalue()
+    if parallel:
+        df.close()
+    return data
+
+
+def decode_container(module, data):
+    return list(datafile.DataFileReader(io.BytesIO(data), module.SpecificDatumReader()))
+
+
+def best_time(func, repeat):
+    """
+    Runs func repeat times and returns the fastest run in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+    }
+
+
+def write_results(path, results):
+    """
+    Writes benchmark results with a description of the environment to a JSON file, or stdout if path is -
+    """
+    document = {'environment': environment(), 'results': results}
+    if path == '-':
+        json.dump(document, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+        return
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare(baseline, current, metric, threshold):
+    """
+    Compares benchmark results against a baseline
+    :param dict baseline: Results by benchmark name
+    :param dict current: Results by benchmark name
+    :param str metric: Result field compared, lower is better
+    :param float threshold: Relative increase reported as a regression, 0.1 for 10%
+    :return: List of (name, baseline value, current value, ratio, regressed) for benchmarks in both results
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name][metric], current[name][metric]
+        ratio = after / before if before else float('inf') if after else 1.0
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_comparison(rows, metric, out=sys.stdout):
+    width = max([len(row[0]) for row in rows] + [9])
+    out.write('%-*s %14s %14s %8s\n' % (width, 'benchmark', 'baseline', 'current', 'ratio'))
+    for name, before, after, ratio, regressed in rows:
+        out.write('%-*s %14.6g %14.6g %7.2fx%s\n' % (width, name, before, after, ratio,
+                                                    '  REGRESSION' if regressed else ''))
+    regressions = sum(1 for row in rows if row[4])
+    out.write('%d of %d benchmarks regressed (%s)\n' % (regressions, len(rows), metric))
+    return regressions
@@ -0,0 +1,165 @@
+"""
+Memory footprint benchmarks of generated classes over the bundled test schemas.
+
+    python -m benchmarks.memory run -o memory.json
+    python -m benchmarks.memory compare baseline.json memory.json --threshold 0.05
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from avrogen.dict_wrapper import DictWrapper
+from . import common
+
+DEFAULT_SIZES = (1000, 10000)
+PATHS = ('construct', 'decode', 'from_obj')
+BREAKDOWN_SAMPLE = 100
+
+
+def traced_bytes(func):
+    """
+    Calls func with tracemalloc running and returns its result and the bytes still allocated after it returns
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def breakdown(record):
+    """
+    Splits the memory held by a record, including nested records, between the dict the record class derives
+    from, the _inner_dict holding field values, the instance __dict__ and the field values themselves.
+    Values referenced several times within the record are counted once; values shared between records are
+    counted for every record.
+    :param DictWrapper record:
+    :return dict[str, int]:
+    """
+    sizes = {'base_dict': 0, 'inner_dict': 0, '__dict__': 0, 'values': 0}
+    seen = set()
+
+    def visit(value):
+        if id(value) in seen:
+            return
+        seen.add(id(value))
+        if isinstance(value, DictWrapper):
+            # The dict object itself; GC headers and preallocated attribute storage end up in 'other'
+            sizes['base_dict'] += dict.__sizeof__(value)
+            sizes['inner_dict'] += sys.getsizeof(value._inner_dict)
+            # Classes without __slots__ allow a __dict__; count it only when attributes were stored in it
+            if type(value).__dictoffset__ and value.__dict__:
+                sizes['__dict__'] += sys.getsizeof(value.__dict__)
+            for item in value._inner_dict.values():
+                visit(item)
+            return
+        sizes['values'] += sys.getsizeof(value)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                visit(key)
+                visit(item)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            for item in value:
+                visit(item)
+
+    visit(record)
+    return sizes
+
+
+def bench_case(name, module, size):
+    """
+    Measures the memory retained by records of one case built in every supported way
+    :return dict[str, dict]: Measurements by path
+    """
+    sample = common.make_records(name, module, min(size, 10))
+    klass = type(sample[0])
+    objs = [r.to_obj() for r in common.make_records(name, module, size)]
+    data = common.encode_container(module, common.make_records(name, module, size))
+
+    builders = {
+        'construct': lambda: common.make_records(name, module, size),
+        'decode': lambda: common.decode_container(module, data),
+        'from_obj': lambda: [klass.from_obj(o) for o in objs],
+    }
+    # Warm up compiled validators, resolution plans and other caches outside of the traced sections
+    common.decode_container(module, common.encode_container(module, sample))
+    [klass.from_obj(r.to_obj()) for r in sample]
+
+    results = {}
+    for path in PATHS:
+        records, retained = traced_bytes(builders[path])
+        retained -= sys.getsizeof(records)
+        totals = {}
+        sample_size = min(len(records), BREAKDOWN_SAMPLE)
+        for record in records[:sample_size]:
+            for part, value in breakdown(record).items():
+                totals[part] = totals.get(part, 0) + value
+        per_instance = retained / float(size)
+        parts = {part: value / float(sample_size) for part, value in totals.items()}
+        # GC headers, allocator rounding and attribute storage not visible to sys.getsizeof()
+        parts['other'] = per_instance - sum(parts.values())
+        results[path] = {
+            'records': size,
+            'bytes_per_instance': per_instance,
+            'bytes_per_million': per_instance * 1e6,
+            'getsizeof': sys.getsizeof(records[0]),
+            'breakdown': parts,
+        }
+        del records
+    return results
+
+
+def run(cases, sizes, log=sys.stderr):
+    """
+    Runs the memory benchmarks
+    :param list[str] cases: Case names
+    :param list[int] sizes: Numbers of records
+    :return dict[str, dict]: Results by benchmark name (case.path.size)
+    """
+    results = {}
+    with common.GeneratedPackages() as packages:
+        for name in cases:
+            module = packages.load(name)
+            for size in sizes:
+                for path, result in sorted(bench_case(name, module, size).items()):
+                    key = '%s.%s.%d' % (name, path, size)
+                    results[key] = result
+                    log.write('%-32s %10.0f B/instance  %s\n' % (
+                        key, result['bytes_per_instance'],
+                        ' '.join('%s=%.0f' % item for item in sorted(result['breakdown'].items()))))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory', description=__doc__.strip().split('\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='Run benchmarks and write results as JSON')
+    run_parser.add_argument('-o', '--output', default='-', help='Results file, stdout by default')
+    run_parser.add_argument('--cases', nargs='+', choices=sorted(common.CASES), default=sorted(common.CASES))
+    run_parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    compare_parser = commands.add_parser('compare', help='Compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.05,
+                                help='Relative growth reported as a regression (default 0.05)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        common.write_results(args.output, run(args.cases, args.sizes))
+        return 0
+    if args.command == 'compare':
+        rows = common.compare(common.load_results(args.baseline), common.load_results(args.current),
+                              'bytes_per_instance', args.threshold)
+        return 1 if common.print_comparison(rows, 'bytes_per_instance') else 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
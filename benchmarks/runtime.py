@@ -0,0 +1,106 @@
+"""
+Runtime benchmarks of generated classes over the bundled test schemas.
+
+    python -m benchmarks.runtime run -o results.json
+    python -m benchmarks.runtime compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import sys
+
+from . import common
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+
+def bench_case(name, module, size, repeat):
+    """
+    Runs the runtime benchmarks of one case and data size
+    :return dict[str, float]: Best time in seconds by operation
+    """
+    records = common.make_records(name, module, size)
+    klass = type(records[0])
+    field_names = [f.name for f in klass.RECORD_SCHEMA.fields]
+    objs = [r.to_obj() for r in records]
+    data = common.encode_container(module, records)
+
+    def access():
+        for r in records:
+            for f in field_names:
+                getattr(r, f)
+
+    timings = {
+        'construct': common.best_time(lambda: common.make_records(name, module, size), repeat),
+        'access': common.best_time(access, repeat),
+        'to_obj': common.best_time(lambda: [r.to_obj() for r in records], repeat),
+        'from_obj': common.best_time(lambda: [klass.from_obj(o) for o in objs], repeat),
+        'write_container': common.best_time(lambda: common.encode_container(module, records), repeat),
+        'write_deflate': common.best_time(lambda: common.encode_container(module, records, 'deflate'), repeat),
+        'write_deflate_parallel': common.best_time(
+            lambda: common.encode_container(module, records, 'deflate', parallel=True), repeat),
+        'read_container': common.best_time(lambda: common.decode_container(module, data), repeat),
+    }
+    if klass._get_json_converter().use_logical_types:
+        timings['logical_convert'] = common.best_time(lambda: bench_logical(klass, records), repeat)
+    return timings
+
+
+def bench_logical(klass, records):
+    converter = klass._get_json_converter()
+    handlers = []
+    for field in klass.RECORD_SCHEMA.fields:
+        lt = converter.logical_types.get(field.type.props.get('logicalType'))
+        if lt is not None and lt.can_convert(field.type):
+            handlers.append((field.name, field.type, lt))
+    for r in records:
+        for field_name, field_schema, lt in handlers:
+            lt.convert_back(field_schema, field_schema, lt.convert(field_schema, getattr(r, field_name)))
+
+
+def run(cases, sizes, repeat, log=sys.stderr):
+    """
+    Runs the runtime benchmarks
+    :param list[str] cases: Case names
+    :param list[int] sizes: Numbers of records
+    :param int repeat: Runs of every benchmark, the fastest is kept
+    :return dict[str, dict]: Results by benchmark name (case.operation.size)
+    """
+    results = {}
+    with common.GeneratedPackages() as packages:
+        for name in cases:
+            module = packages.load(name)
+            for size in sizes:
+                for op, seconds in sorted(bench_case(name, module, size, repeat).items()):
+                    key = '%s.%s.%d' % (name, op, size)
+                    results[key] = {'seconds': seconds, 'records': size, 'us_per_record': seconds * 1e6 / size}
+                    log.write('%-40s %12.1f us/record\n' % (key, seconds * 1e6 / size))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.runtime', description=__doc__.strip().split('\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='Run benchmarks and write results as JSON')
+    run_parser.add_argument('-o', '--output', default='-', help='Results file, stdout by default')
+    run_parser.add_argument('--cases', nargs='+', choices=sorted(common.CASES), default=sorted(common.CASES))
+    run_parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    run_parser.add_argument('--repeat', type=int, default=3)
+    compare_parser = commands.add_parser('compare', help='Compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='Relative slowdown reported as a regression (default 0.1)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        common.write_results(args.output, run(args.cases, args.sizes, args.repeat))
+        return 0
+    if args.command == 'compare':
+        rows = common.compare(common.load_results(args.baseline), common.load_results(args.current),
+                              'us_per_record', args.threshold)
+        return 1 if common.print_comparison(rows, 'us_per_record') else 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -53,11 +53,15 @@ setup(
 
     # You can just specify the packages manually here if your project is
     # simple. Or you can use find_packages().
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),
+    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'benchmarks']),
     package_data={
         'avrogen': ['py.typed'],
     },
     install_requires=["avro >= 1.8.0 ; python_version<'3.0'",
                       "avro_python3 >= 1.8.0 ; python_version>'3.0'",
                       'six', 'frozendict', 'tzlocal', 'pytz'],
+    extras_require={
+        'numpy': ['numpy'],
+        'dev': ['mypy'],
+    },
 )
@@ -0,0 +1,103 @@
+import asyncio
+import io as _io
+import socket
+import unittest
+
+from avro import datafile, io, schema
+
+from avrogen import aio
+
+if not hasattr(schema, 'parse'):
+    # Older versions of avro used a capital P in Parse.
+    schema.parse = schema.Parse
+
+RECORD_SCHEMA = schema.parse('''{"type": "record", "name": "test_record", "fields": [
+    {"name": "field1", "type": "int"},
+    {"name": "field2", "type": "string"}
+]}''')
+
+
+class _NoCloseBytesIO(_io.BytesIO):
+    def close(self):
+        pass
+
+
+class AsyncContainerTest(unittest.TestCase):
+    records = [dict(field1=i, field2=str(i)) for i in range(2500)]
+
+    def _write_sync(self, codec):
+        buf = _NoCloseBytesIO()
+        writer = datafile.DataFileWriter(buf, io.DatumWriter(), RECORD_SCHEMA, codec=codec)
+        for r in self.records:
+            writer.append(r)
+        writer.close()
+        return buf.getvalue()
+
+    def _read_async(self, data, **kwargs):
+        async def run():
+            stream = asyncio.StreamReader()
+            stream.feed_data(data)
+            stream.feed_eof()
+            return [r async for r in aio.AsyncSpecificReader(stream, **kwargs)]
+        return asyncio.run(run())
+
+    def _write_async(self, **kwargs):
+        async def run():
+            rsock, wsock = socket.socketpair()
+            reader, reader_side_writer = await asyncio.open_connection(sock=rsock)
+            writer_side_reader, writer = await asyncio.open_connection(sock=wsock)
+            async with aio.AsyncSpecificWriter(writer, RECORD_SCHEMA, **kwargs) as w:
+                for r in self.records:
+                    await w.append(r)
+            data = await reader.read()
+            reader_side_writer.close()
+            return data
+        return asyncio.run(run())
+
+    def test_read(self):
+        for codec in ('null', 'deflate', 'bzip2', 'xz'):
+            self.assertEqual(self._read_async(self._write_sync(codec)), self.records)
+
+    def test_read_offload(self):
+        self.assertEqual(self._read_async(self._write_sync('deflate'), offload=True), self.records)
+
+    def test_write(self):
+        for codec in ('null', 'deflate'):
+            data = self._write_async(codec=codec, block_size=300, offload=codec == 'deflate')
+            reader = datafile.DataFileReader(_io.BytesIO(data), io.DatumReader())
+            self.assertEqual(list(reader), self.records)
+
+    def test_roundtrip(self):
+        self.assertEqual(self._read_async(self._write_async(codec='xz')), self.records)
+
+    def test_bad_magic(self):
+        with self.assertRaises(schema.AvroException):
+            self._read_async(b'Nope' + b'\x00' * 20)
+
+    def test_default_reader_logical_types(self):
+        import datetime
+        from avrogen import logical
+        stamp_schema = schema.parse('''{"type": "record", "name": "stamped", "fields": [
+            {"name": "day", "type": {"type": "int", "logicalType": "date"}}
+        ]}''')
+        buf = _NoCloseBytesIO()
+        writer = datafile.DataFileWriter(buf, logical.LogicalDatumWriter(), stamp_schema)
+        writer.append({'day': datetime.date(2020, 2, 29)})
+        writer.close()
+        self.assertEqual(self._read_async(buf.getvalue()), [{'day': datetime.date(2020, 2, 29)}])
+
+    def test_write_error(self):
+        async def run():
+            rsock, wsock = socket.socketpair()
+            reader, reader_side_writer = await asyncio.open_connection(sock=rsock)
+            writer_side_reader, writer = await asyncio.open_connection(sock=wsock)
+            with self.assertRaises(ValueError):
+                async with aio.AsyncSpecificWriter(writer, RECORD_SCHEMA, block_size=300) as w:
+                    for r in self.records[:10]:
+                        await w.append(r)
+                    raise ValueError('failed')
+            data = await reader.read()
+            reader_side_writer.close()
+            return data
+        # Buffered records are not written when the block is left with an error
+        self.assertEqual(asyncio.run(run()), b'')
@@ -1,5 +1,6 @@
 from avrogen import avrojson
 from avrogen import logical
+from avrogen import resolution
 from avro import schema
 import unittest
 import six
@@ -114,6 +115,39 @@ class AvroJsonTest(unittest.TestCase):
                                                                 writers_schema, readers_schema),
                              output2)
 
+    def test_logical_type_array(self):
+        test_schema = make_avsc_object({'type': 'array', 'items': {'type': 'int', 'logicalType': 'date'}})
+        dates = [datetime.date(2012, 3, 4), datetime.date(1970, 2, 12)]
+
+        self.assertEquals(self.converter_lt.to_json_object(dates, test_schema), [15403, 42])
+        self.assertEquals(self.converter_lt.from_json_object([15403, 42], test_schema), dates)
+
+    def test_resolution_plans(self):
+        writers_schema = make_avsc_object({'type': 'record', 'name': 'test_record', 'fields': [
+            {'name': 'field1', 'type': 'int'},
+            {'name': 'skipped', 'type': 'string'},
+            {'name': 'field2', 'type': ['null', 'int']},
+        ]})
+
+        readers_schema = make_avsc_object({'type': 'record', 'name': 'test_record', 'fields': [
+            {'name': 'field2', 'type': ['null', 'long']},
+            {'name': 'field1', 'type': ['null', 'long']},
+            {'name': 'field3', 'type': 'double', 'default': 3.0}
+        ]})
+
+        plans = resolution.PlanCache(maxsize=2)
+        converter = avrojson.AvroJsonConverter(plans=plans)
+        json_obj = dict(field1=2, skipped='x', field2=dict(int=5))
+        for _ in range(3):
+            self.assertDictEqual(converter.from_json_object(json_obj, writers_schema, readers_schema),
+                                 dict(field1=2, field2=5, field3=3.0))
+        self.assertEqual(len(plans), 2)
+        self.assertIs(plans.get(writers_schema, readers_schema), plans.get(writers_schema, readers_schema))
+
+        plan = plans.get(writers_schema, readers_schema)
+        self.assertEqual([f[0] for f in plan.fields], ['field2', 'field1', 'field3'])
+        self.assertIsNone(plan.fields[2][1])
+
     @unittest.expectedFailure
     def test_schema_mismatch(self):
         self.converter.from_json_object(42, make_avsc_object('int'), make_avsc_object('string'))
@@ -128,4 +162,48 @@ class AvroJsonTest(unittest.TestCase):
             def __init__(self, **kwargs):
                 super(DD, self).__init__(kwargs)
 
-        self.assertDictEqual(self.converter.to_json_object(DD(f1=42)), dict(f1=42))
\ No newline at end of file
+        self.assertDictEqual(self.converter.to_json_object(DD(f1=42)), dict(f1=42))
+    def test_json_text_encoders(self):
+        import json
+        from avrogen import json_text
+        test_schema = make_avsc_object({'type': 'record', 'name': 'node', 'fields': [
+            {'name': 'value', 'type': 'int'},
+            {'name': 'next', 'type': ['null', 'node'], 'default': None},
+        ]})
+        datum = dict(value=1, next=dict(value=2, next=None))
+        parts = []
+        json_text.get_encoders(self.converter).get(test_schema)(datum, parts)
+        self.assertEqual(''.join(parts), json.dumps(self.converter.to_json_object(datum, test_schema),
+                                                    separators=(',', ':')))
+
+        # Converters with the same logical types share encoders, which do not keep the converters alive
+        converter = avrojson.AvroJsonConverter(use_logical_types=True,
+                                               logical_types=dict(logical.DEFAULT_LOGICAL_TYPES))
+        encoders = json_text.get_encoders(converter)
+        self.assertIs(json_text.get_encoders(self.converter_lt), encoders)
+        self.assertIsNot(encoders.converter, converter)
+        self.assertIsNot(json_text.get_encoders(self.converter_lt, tuples=True), encoders)
+
+    def test_json_text_numbers(self):
+        import json
+        from avrogen import json_text
+        test_schema = make_avsc_object({'type': 'record', 'name': 'numbers', 'fields': [
+            {'name': 'i', 'type': 'int'},
+            {'name': 'l', 'type': 'long'},
+            {'name': 'd', 'type': 'double'},
+            {'name': 'f', 'type': 'float'},
+        ]})
+        encode = json_text.get_encoders(self.converter).get(test_schema)
+        for datum in (dict(i=True, l=False, d=1, f=True), dict(i=-3, l=1 << 40, d=0.1, f=float('nan'))):
+            parts = []
+            encode(datum, parts)
+            self.assertEqual(''.join(parts), json.dumps(self.converter.to_json_object(datum, test_schema),
+                                                        separators=(',', ':')))
+
+        try:
+            import numpy
+        except ImportError:
+            return
+        parts = []
+        encode(dict(i=numpy.int32(-3), l=numpy.int64(1 << 40), d=numpy.int64(2), f=numpy.float32(0.5)), parts)
+        self.assertEqual(''.join(parts), '{"i":-3,"l":1099511627776,"d":2,"f":0.5}')
@@ -0,0 +1,31 @@
+import io
+import unittest
+
+from benchmarks import common, memory, runtime
+
+
+class BenchmarksTest(unittest.TestCase):
+    def test_run(self):
+        results = runtime.run(['recursive', 'logical'], [3], 1, log=io.StringIO())
+        self.assertIn('recursive.read_container.3', results)
+        self.assertIn('logical.logical_convert.3', results)
+        self.assertEqual(results['recursive.to_obj.3']['records'], 3)
+
+    def test_memory(self):
+        results = memory.run(['account'], [20], log=io.StringIO())
+        result = results['account.from_obj.20']
+        self.assertGreater(result['bytes_per_instance'], 0)
+        self.assertEqual(set(result['breakdown']), {'base_dict', 'inner_dict', '__dict__', 'values', 'other'})
+        self.assertAlmostEqual(sum(result['breakdown'].values()), result['bytes_per_instance'])
+        self.assertIn('account.decode.20', results)
+
+    def test_compare(self):
+        baseline = {'a': {'us_per_record': 1.0}, 'b': {'us_per_record': 2.0}, 'c': {'us_per_record': 1.0}}
+        current = {'a': {'us_per_record': 1.05}, 'b': {'us_per_record': 3.0}}
+        rows = common.compare(baseline, current, 'us_per_record', 0.1)
+        self.assertEqual([(name, regressed) for name, _, _, _, regressed in rows], [('a', False), ('b', True)])
+        self.assertEqual(common.print_comparison(rows, 'us_per_record', io.StringIO()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
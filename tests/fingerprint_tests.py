@@ -0,0 +1,61 @@
+import unittest
+
+from avro import schema
+
+from avrogen import fingerprint
+
+if not hasattr(schema, 'parse'):
+    # Older versions of avro used a capital P in Parse.
+    schema.parse = schema.Parse
+
+try:
+    from avro import schemanormalization
+except ImportError:
+    schemanormalization = None
+
+SCHEMAS = [
+    '"null"',
+    '{"type": "int", "logicalType": "date"}',
+    '{"type": "array", "items": "string"}',
+    '{"type": "map", "values": ["null", "long"]}',
+    '{"type": "fixed", "name": "md5", "namespace": "org.sample", "size": 16}',
+    '{"type": "enum", "name": "Suit", "symbols": ["SPADES", "HEARTS"], "doc": "ignored"}',
+    '''{"type": "record", "name": "Node", "namespace": "org.sample", "fields": [
+        {"name": "value", "type": "string", "default": "x"},
+        {"name": "children", "type": {"type": "array", "items": "Node"}},
+        {"name": "kind", "type": {"type": "enum", "name": "Kind", "symbols": ["A", "B"]}},
+        {"name": "other", "type": ["null", "Kind"]}
+    ]}''',
+]
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_canonical_form(self):
+        self.assertEqual(fingerprint.parsing_canonical_form(schema.parse(SCHEMAS[1])), '"int"')
+        self.assertEqual(fingerprint.parsing_canonical_form(schema.parse(SCHEMAS[5])),
+                         '{"name":"Suit","type":"enum","symbols":["SPADES","HEARTS"]}')
+        self.assertEqual(
+            fingerprint.parsing_canonical_form(schema.parse(SCHEMAS[6])),
+            '{"name":"org.sample.Node","type":"record","fields":[{"name":"value","type":"string"},'
+            '{"name":"children","type":{"type":"array","items":"org.sample.Node"}},'
+            '{"name":"kind","type":{"name":"org.sample.Kind","type":"enum","symbols":["A","B"]}},'
+            '{"name":"other","type":["null","org.sample.Kind"]}]}')
+
+    def test_crc64(self):
+        # Values from the Avro specification's test suite
+        self.assertEqual(fingerprint.crc64_avro(b'"null"'), 7195948357588979594)
+        self.assertEqual(fingerprint.fingerprint('"null"'), (7195948357588979594).to_bytes(8, 'little'))
+
+    @unittest.skipIf(schemanormalization is None, 'avro.schemanormalization is not available')
+    def test_matches_avro(self):
+        for s in SCHEMAS:
+            parsed = schema.parse(s)
+            canonical_form = fingerprint.parsing_canonical_form(parsed)
+            self.assertEqual(canonical_form, schemanormalization.ToParsingCanonicalForm(parsed))
+            for algorithm in (fingerprint.CRC_64_AVRO, fingerprint.MD5, fingerprint.SHA_256):
+                self.assertEqual(fingerprint.fingerprint(canonical_form, algorithm),
+                                 schemanormalization.Fingerprint(canonical_form, algorithm))
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            fingerprint.fingerprint('"null"', 'SHA-1')
@@ -1,3 +1,6 @@
+import ast
+import asyncio
+import json
 import os
 import unittest
 import avrogen
@@ -9,11 +12,17 @@ from avro import datafile, schema
 import tempfile
 import avrogen.schema
 import avrogen.protocol
+import avrogen.logical
 import logging
 import sys
 import datetime
 import six
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 if not hasattr(schema, 'parse'):
     # Older versions of avro used a capital P in Parse.
     schema.parse = schema.Parse
@@ -82,6 +91,275 @@ class GeneratorTestCase(unittest.TestCase):
         self.assertTrue(hasattr(long_list, 'value'))
         self.assertTrue(hasattr(long_list, 'next'))
 
+    def _sample_tweet(self):
+        """
+        Generates the tweet schema classes and returns (root module, twitter namespace, common namespace, tweet)
+        """
+        schema_json = self.read_schema('tweet.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, _ = self.load_gen(self.test_name)
+        twitter_ns = importlib.import_module('.com.bifflabs.grok.model.twitter.avro', self.test_name)
+        common_ns = importlib.import_module('.com.bifflabs.grok.model.common.avro', self.test_name)
+
+        tweet = twitter_ns.AvroTweet()
+        tweet.ID = 1
+        tweet.text = "AvroGenTest"
+        tweet.authorScreenName = 'AvrogenTestName'
+        tweet.authorProfileImageURL = 'http://'
+        tweet.authorUserID = 2
+        tweet.location = common_ns.AvroPoint(latitude=1.0, longitude=2.0)
+        tweet.placeID = "Ether"
+        tweet.createdAt = common_ns.AvroDateTime(dateTimeString="2016-10-10 10:10:10")
+        tweet.metadata.mentionedScreenNames.known = True
+        tweet.metadata.mentionedScreenNames.data = ['Avro', 'Gen', 'Test']
+        tweet.metadata.hashtags.data = ['###']
+        tweet.metadata.isRetweet.known = True
+        tweet.metadata.isRetweet.data = True
+        return root_module, twitter_ns, common_ns, tweet
+
+    def test_to_bytes(self):
+        _, twitter_ns, common_ns, tweet = self._sample_tweet()
+
+        tweet1 = twitter_ns.AvroTweet.from_bytes(tweet.to_bytes())
+        self.assertIsInstance(tweet1, twitter_ns.AvroTweet)
+        self.assertIsInstance(tweet1.metadata.venuePoint, common_ns.AvroKnowableOptionPoint)
+        self.assertEqual(tweet1.to_obj(), tweet.to_obj())
+        with self.assertRaises(ValueError):
+            common_ns.AvroPoint.from_bytes(tweet.to_bytes())
+
+    def test_to_json_str(self):
+        _, twitter_ns, _, tweet = self._sample_tweet()
+
+        self.assertEqual(json.loads(tweet.to_json_str()), tweet.to_obj())
+        self.assertEqual(json.loads(tweet.to_json_str(tuples=True)), json.loads(json.dumps(tweet.to_obj(tuples=True))))
+        self.assertEqual(twitter_ns.AvroTweet.from_obj(json.loads(tweet.to_json_str())).to_obj(), tweet.to_obj())
+
+    def test_ndjson_round_trip(self):
+        from avrogen import json_text
+        _, twitter_ns, common_ns, tweet = self._sample_tweet()
+        AvroTweet = twitter_ns.AvroTweet
+
+        out = six.StringIO()
+        self.assertEqual(json_text.write_ndjson(out, [tweet, tweet.location, tweet], batch_size=2), 3)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [tweet.to_obj(), tweet.location.to_obj(), tweet.to_obj()])
+
+        tweets = []
+        for i in range(20):
+            t = AvroTweet.from_obj(tweet.to_obj())
+            t.ID = i
+            tweets.append(t)
+        tmp_file = tempfile.mktemp()
+        with open(tmp_file, 'w') as f:
+            json_text.write_ndjson(f, tweets, tuples=True)
+        for workers in (0, 2):
+            tweets1 = list(AvroTweet.read_ndjson(tmp_file, workers=workers, chunk_bytes=1000, tuples=True))
+            self.assertEqual([t.ID for t in tweets1], list(range(20)))
+            self.assertIsInstance(tweets1[0].metadata.venuePoint, common_ns.AvroKnowableOptionPoint)
+            self.assertEqual([t.to_obj() for t in tweets1], [t.to_obj() for t in tweets])
+        os.remove(tmp_file)
+
+    def test_ndjson_blocks(self):
+        from avrogen import container, json_text
+        root_module, twitter_ns, _, tweet = self._sample_tweet()
+        AvroTweet = twitter_ns.AvroTweet
+
+        tmp_file = tempfile.mktemp()
+        with open(tmp_file, 'w') as f:
+            for i in range(20):
+                tweet.ID = i
+                json_text.write_ndjson(f, [tweet], tuples=True)
+
+        sync_marker = container.make_sync_marker()
+        blocks = list(AvroTweet.read_ndjson(tmp_file, workers=2, chunk_bytes=1000, tuples=True, output='blocks',
+                                            codec='deflate', sync_marker=sync_marker))
+        self.assertGreater(len(blocks), 1)
+        avro_file = tempfile.mktemp()
+        with open(avro_file, 'wb') as f:
+            f.write(container.encode_header(AvroTweet.RECORD_SCHEMA, 'deflate', sync_marker))
+            for block in blocks:
+                f.write(block)
+        with open(avro_file, 'rb') as f:
+            self.assertEqual([t.ID for t in datafile.DataFileReader(f, root_module.SpecificDatumReader())],
+                             list(range(20)))
+        os.remove(avro_file)
+        os.remove(tmp_file)
+
+    def test_ndjson_blank_chunks(self):
+        schema_json = self.read_schema('simple_record.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+        LongList = root_module.LongList
+
+        from avrogen import container
+        tmp_file = tempfile.mktemp()
+        with open(tmp_file, 'w') as f:
+            f.write('{"value": 1, "next": 2}\n' + '\n' * 40 + '{"value": 3, "next": 4}\n')
+        sync_marker = container.make_sync_marker()
+        blocks = list(LongList.read_ndjson(tmp_file, workers=0, chunk_bytes=10, output='blocks',
+                                           sync_marker=sync_marker))
+        os.remove(tmp_file)
+
+        # Chunks of blank lines yield no block, since a block of no records ends the data
+        self.assertEqual(len(blocks), 2)
+        data = container.encode_header(LongList.RECORD_SCHEMA, 'null', sync_marker) + b''.join(blocks)
+        records = list(datafile.DataFileReader(six.BytesIO(data), root_module.SpecificDatumReader()))
+        self.assertEqual([r.value for r in records], [1, 3])
+
+    def test_fingerprints(self):
+        schema_json = self.read_schema('simple_record.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        from avrogen import fingerprint
+
+        LongList = root_module.LongList
+        self.assertEqual(LongList.CANONICAL_FORM,
+                         '{"name":"LongList","type":"record","fields":[{"name":"value","type":"long"},'
+                         '{"name":"next","type":"int"}]}')
+        self.assertEqual(LongList.FINGERPRINT_CRC64, fingerprint.fingerprint(LongList.CANONICAL_FORM))
+        self.assertEqual(LongList.FINGERPRINT_MD5, fingerprint.fingerprint(LongList.CANONICAL_FORM, fingerprint.MD5))
+        self.assertEqual(LongList.FINGERPRINT_SHA256,
+                         fingerprint.fingerprint(LongList.CANONICAL_FORM, fingerprint.SHA_256))
+
+        # Data written with an older schema is resolved by a reader cached per writer's fingerprint
+        old_schema_json = '{"type": "record", "name": "LongList", "fields": [{"name": "value", "type": "long"}]}'
+        new_schema_json = json.dumps({"type": "record", "name": "LongList", "fields": [
+            {"name": "value", "type": "long"}, {"name": "next", "type": "int", "default": 7}]})
+        out = six.BytesIO()
+        io.DatumWriter(schema.parse(old_schema_json)).write({'value': 42}, io.BinaryEncoder(out))
+
+        readers_schema = schema.parse(new_schema_json)
+        reader = root_module.SpecificDatumReader.for_writer(old_schema_json, readers_schema)
+        self.assertIs(root_module.SpecificDatumReader.for_writer(old_schema_json, readers_schema), reader)
+        self.assertIs(root_module.SpecificDatumReader.for_writer(schema.parse(old_schema_json), readers_schema),
+                      reader)
+        record = reader.read(io.BinaryDecoder(six.BytesIO(out.getvalue())))
+        self.assertIsInstance(record, LongList)
+        self.assertEqual(record.value, 42)
+        self.assertEqual(record.next, 7)
+
+        # Cached readers decode through their resolution plans without matching schemas for every datum
+        from unittest import mock
+        with mock.patch.object(io.DatumReader, 'match_schemas', side_effect=io.DatumReader.match_schemas) as match:
+            for _ in range(5):
+                reader.read(io.BinaryDecoder(six.BytesIO(out.getvalue())))
+        self.assertEqual(match.call_count, 0)
+
+    def test_shared_schema_cache(self):
+        address = {"type": "record", "name": "Address", "namespace": "shared.common",
+                   "fields": [{"name": "city", "type": "string"}]}
+        first_json = json.dumps({"type": "record", "name": "Person", "namespace": "shared.people",
+                                 "fields": [{"name": "home", "type": address}]})
+        second_json = json.dumps({"type": "record", "name": "Company", "namespace": "shared.companies",
+                                  "fields": [{"name": "offices", "type": {"type": "array", "items": address}}]})
+        avrogen.schema.write_schema_files(first_json, self.output_dir)
+        first_module, first_classes = self.load_gen(self.test_name)
+        self.setUp()
+        avrogen.schema.write_schema_files(second_json, self.output_dir)
+        second_module, second_classes = self.load_gen(self.test_name)
+
+        # Each package has its own classes, built on one shared schema
+        self.assertIsNot(first_classes.AddressClass, second_classes.AddressClass)
+        self.assertIs(first_classes.AddressClass.RECORD_SCHEMA, second_classes.AddressClass.RECORD_SCHEMA)
+        self.assertIs(second_classes.CompanyClass.RECORD_SCHEMA.fields[0].type.items,
+                      first_classes.PersonClass.RECORD_SCHEMA.fields[0].type)
+        company = second_classes.CompanyClass.from_obj({'offices': [{'city': 'Oslo'}]})
+        self.assertIsInstance(company.offices[0], second_classes.AddressClass)
+
+    def test_schema_set_files(self):
+        schema_dir = self.output_dir + '_schemas'
+        os.makedirs(os.path.join(schema_dir, 'common'))
+        address = {"type": "record", "name": "Address", "namespace": "set.common",
+                   "fields": [{"name": "zone", "type": {"type": "enum", "name": "Zone", "symbols": ["A", "B"]}}]}
+        schemas = {
+            'a_person.avsc': {"type": "record", "name": "Person", "namespace": "set.people", "fields": [
+                {"name": "home", "type": "set.common.Address"},
+                {"name": "employer", "type": ["null", "set.companies.Company"]}]},
+            'company.avsc': {"type": "record", "name": "Company", "namespace": "set.companies", "fields": [
+                {"name": "offices", "type": {"type": "array", "items": address}}]},
+            os.path.join('common', 'address.avsc'): address,
+        }
+        for file_name, schema_data in schemas.items():
+            with open(os.path.join(schema_dir, file_name), 'w') as f:
+                json.dump(schema_data, f)
+        try:
+            merged = json.loads(avrogen.schema.merge_schema_files(schema_dir))
+            self.assertEqual([s['name'] for s in merged], ['Company', 'Person'])
+
+            avrogen.schema.write_schema_set_files([schema_dir], self.output_dir)
+            root_module, schema_classes = self.load_gen(self.test_name)
+            person = schema_classes.PersonClass.from_obj({'home': {'zone': 'B'}, 'employer': {'offices': []}})
+            self.assertIsInstance(person.home, schema_classes.AddressClass)
+            self.assertIsInstance(person.employer, schema_classes.CompanyClass)
+            with open(os.path.join(self.output_dir, 'schema_classes.py')) as f:
+                self.assertEqual(f.read().count('class AddressClass('), 1)
+
+            # The same name may not be defined differently
+            address['fields'][0]['default'] = 'A'
+            with open(os.path.join(schema_dir, 'common', 'address.avsc'), 'w') as f:
+                json.dump(address, f)
+            with self.assertRaises(schema.SchemaParseException):
+                avrogen.schema.merge_schema_files(schema_dir)
+        finally:
+            shutil.rmtree(schema_dir)
+
+    def test_schema_set_files_identical_definitions(self):
+        from unittest import mock
+        schema_dir = self.output_dir + '_schemas'
+        os.makedirs(schema_dir)
+        zone = {"type": "enum", "name": "Zone", "namespace": "common", "symbols": ["A", "B"]}
+        address = {"type": "record", "name": "Address", "namespace": "common",
+                   "fields": [{"name": "zone", "type": zone}]}
+        schemas = {
+            'a_zone.avsc': zone,
+            'b_person.avsc': {"type": "record", "name": "Person", "namespace": "people",
+                              "fields": [{"name": "home", "type": address}]},
+            'c_company.avsc': {"type": "record", "name": "Company", "namespace": "companies",
+                               "fields": [{"name": "office", "type": address}]},
+        }
+        for file_name, schema_data in schemas.items():
+            with open(os.path.join(schema_dir, file_name), 'w') as f:
+                json.dump(schema_data, f)
+        try:
+            merged = json.loads(avrogen.schema.merge_schema_files(schema_dir))
+            self.assertEqual([s['name'] for s in merged], ['Zone', 'Person', 'Company'])
+            self.assertEqual(merged[2]['fields'][0]['type'], 'common.Address')
+
+            # Every file is parsed once, and the generator reuses the parsed names
+            with mock.patch.object(avrogen.schema, 'make_avsc_object', wraps=avrogen.schema.make_avsc_object) as parse:
+                avrogen.schema.write_schema_set_files(schema_dir, self.output_dir, stubs=True)
+            self.assertEqual(parse.call_count, 3)
+            root_module, schema_classes = self.load_gen(self.test_name)
+            company = schema_classes.CompanyClass.from_obj({'office': {'zone': 'B'}})
+            self.assertIsInstance(company.office, schema_classes.AddressClass)
+        finally:
+            shutil.rmtree(schema_dir)
+
+    def test_stubs(self):
+        schema_json = self.read_schema('tweet.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, stubs=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        with open(os.path.join(self.output_dir, 'schema_classes.py')) as f:
+            runtime_source = f.read()
+        with open(os.path.join(self.output_dir, 'schema_classes.pyi')) as f:
+            stub_source = f.read()
+        self.assertNotIn('@overload', runtime_source)
+        self.assertNotIn(' -> ', runtime_source)
+        stub = ast.parse(stub_source)
+        stub_classes = {node.name: node for node in stub.body if isinstance(node, ast.ClassDef)}
+        self.assertEqual(set(stub_classes), {name for name in dir(schema_classes) if name.endswith('Class')})
+        tweet_stub = [node for node in stub_classes['AvroTweetClass'].body if isinstance(node, ast.FunctionDef)]
+        self.assertEqual(sum(1 for node in tweet_stub if node.name == '__init__'), 2)
+        self.assertIn('ID', [node.name for node in tweet_stub])
+
+        tweet = schema_classes.AvroTweetClass(ID=1, text='hi')
+        self.assertEqual(schema_classes.AvroTweetClass.from_obj(tweet.to_obj()), tweet)
+        with self.assertRaises(AttributeError):
+            schema_classes.AvroTweetClass(unknown=1)
+
     def test_record_with_array(self):
         schema_json = self.read_schema('record_with_array.json')
         avrogen.schema.write_schema_files(schema_json, self.output_dir)
@@ -95,6 +373,44 @@ class GeneratorTestCase(unittest.TestCase):
         self.assertTrue(hasattr(long_list, 'next'))
         self.assertTrue(hasattr(long_list, 'hello'))
 
+    def test_frozen_record(self):
+        schema_json = self.read_schema('record_with_array.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, frozen=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        a = LongList(value=1, next=2, hello=[1.0, 2.0])
+        b = LongList({'value': 1, 'next': 2, 'hello': [1.0, 2.0]})
+        c = LongList(value=1, next=2, hello=[3.0])
+
+        with self.assertRaises(TypeError):
+            a.value = 2
+        with self.assertRaises(TypeError):
+            a.hello.append(3.0)
+        self.assertEqual(a.value, 1)
+        self.assertEqual(a.hello, [1.0, 2.0])
+
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertEqual(len({a, b, c}), 2)
+        self.assertEqual({a: 'a'}[b], 'a')
+        self.assertEqual(LongList.from_obj(a.to_obj()), a)
+
+    def test_frozen_nested_record(self):
+        schema_json = self.read_schema('recursive_record.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, frozen=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        a = LongList(value=1, next=LongList(value=2))
+        b = LongList.from_obj({'value': 1, 'next': {'value': 2, 'next': None}})
+        self.assertIsInstance(b.next, LongList)
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, LongList(value=1, next=LongList(value=3)))
+        self.assertEqual(LongList.from_bytes(a.to_bytes()), a)
+
     def test_recursive_record(self):
         schema_json = self.read_schema('recursive_record.json')
         avrogen.schema.write_schema_files(schema_json, self.output_dir)
@@ -107,6 +423,326 @@ class GeneratorTestCase(unittest.TestCase):
         self.assertTrue(hasattr(long_list, 'value'))
         self.assertTrue(hasattr(long_list, 'next'))
 
+    def test_reuse_records(self):
+        schema_json = self.read_schema('recursive_record.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        records = [LongList(value=i, next=LongList(value=i * 10, next=None)) for i in range(5)]
+        records.append(LongList(value=5, next=None))
+
+        tmp_file = tempfile.mktemp()
+        with open(tmp_file, "w+b") as f:
+            df = datafile.DataFileWriter(f, io.DatumWriter(), LongList.RECORD_SCHEMA)
+            for r in records:
+                df.append(r)
+            df.close()
+
+        with open(tmp_file, "rb") as f:
+            self.assertEqual([r.to_obj() for r in root_module.SpecificDatumReader().iter_records(f)],
+                             [r.to_obj() for r in records])
+
+        with open(tmp_file, "rb") as f:
+            seen = set()
+            nested = set()
+            decoded = []
+            for r in root_module.SpecificDatumReader().iter_records(f, reuse=True):
+                self.assertIsInstance(r, LongList)
+                seen.add(id(r))
+                if r.next is not None:
+                    nested.add(id(r.next))
+                decoded.append(r.to_obj())
+            self.assertEqual(len(seen), 1)
+            self.assertEqual(len(nested), 1)
+            self.assertEqual(decoded, [r.to_obj() for r in records])
+
+        out = six.BytesIO()
+        io.DatumWriter(LongList.RECORD_SCHEMA).write(records[1], io.BinaryEncoder(out))
+        target = LongList()
+        reader = root_module.SpecificDatumReader(LongList.RECORD_SCHEMA)
+        self.assertIs(reader.read_into(target, io.BinaryDecoder(six.BytesIO(out.getvalue()))), target)
+        self.assertEqual(target.to_obj(), records[1].to_obj())
+
+        # Union branch indexes out of range are rejected like avro's read_union does
+        with self.assertRaises(io.SchemaResolutionException):
+            reader.read_into(target, io.BinaryDecoder(six.BytesIO(b'\x02\x04')))
+
+    def test_reuse_arrays(self):
+        schema_json = self.read_schema('record_with_array.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        reader = root_module.SpecificDatumReader(LongList.RECORD_SCHEMA)
+        target = LongList(value=0, next=0, hello=[9.0, 9.0, 9.0])
+        hello = target.hello
+        for values in ([1.0, 2.0], [1.0, 2.0, 3.0, 4.0], []):
+            out = six.BytesIO()
+            io.DatumWriter(LongList.RECORD_SCHEMA).write(LongList(value=1, next=2, hello=values),
+                                                           io.BinaryEncoder(out))
+            reader.read_into(target, io.BinaryDecoder(six.BytesIO(out.getvalue())))
+            self.assertIs(target.hello, hello)
+            self.assertEqual(target.hello, values)
+
+    def test_reuse_defaults(self):
+        inner = {"type": "record", "name": "Inner", "fields": [{"name": "x", "type": "int"}]}
+        schema_json = json.dumps({"type": "record", "name": "Outer", "namespace": "reuse", "fields": [
+            {"name": "id", "type": "long"}, {"name": "inner", "type": inner, "default": {"x": 3}}]})
+        old_schema_json = json.dumps({"type": "record", "name": "Outer", "namespace": "reuse",
+                                      "fields": [{"name": "id", "type": "long"}]})
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+        Outer = schema_classes.OuterClass
+
+        tmp_file = tempfile.mktemp()
+        with open(tmp_file, "w+b") as f:
+            df = datafile.DataFileWriter(f, io.DatumWriter(), schema.parse(old_schema_json))
+            for i in range(3):
+                df.append({'id': i})
+            df.close()
+
+        # Defaults of missing fields are instances of the generated classes
+        reader = root_module.SpecificDatumReader.for_writer(old_schema_json, Outer.RECORD_SCHEMA)
+        writers_schema = reader.writer_schema
+        for reuse in (False, True):
+            with open(tmp_file, "rb") as f:
+                decoded = [(r.id, r.inner) for r in reader.iter_records(f, reuse=reuse)]
+            self.assertEqual(decoded, [(i, schema_classes.InnerClass(x=3)) for i in range(3)])
+            self.assertTrue(all(isinstance(r, schema_classes.InnerClass) for _, r in decoded))
+        os.remove(tmp_file)
+
+        # Iterating leaves the cached reader untouched
+        self.assertIs(reader.writer_schema, writers_schema)
+        out = six.BytesIO()
+        io.DatumWriter(schema.parse(old_schema_json)).write({'id': 7}, io.BinaryEncoder(out))
+        first = reader.read(io.BinaryDecoder(six.BytesIO(out.getvalue())))
+        second = reader.read(io.BinaryDecoder(six.BytesIO(out.getvalue())))
+        self.assertIsNot(first, second)
+        self.assertIsInstance(first.inner, schema_classes.InnerClass)
+        target = Outer(id=0, inner=schema_classes.InnerClass(x=1))
+        reader.read_into(target, io.BinaryDecoder(six.BytesIO(out.getvalue())))
+        self.assertEqual(target.id, 7)
+        self.assertIsInstance(target.inner, schema_classes.InnerClass)
+        self.assertEqual(target.inner.x, 3)
+
+    def test_parallel_writer(self):
+        schema_json = self.read_schema('record_with_array.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        records = [LongList(value=i, next=i, hello=[float(j) for j in range(i % 10)]) for i in range(500)]
+        for codec in ('null', 'deflate', 'bzip2', 'xz'):
+            out = six.BytesIO()
+            writer = root_module.SpecificDataFileWriter(out, LongList.RECORD_SCHEMA, codec=codec, block_bytes=512,
+                                                        workers=2, max_pending=3)
+            for r in records:
+                writer.append(r)
+            writer.flush()
+            data = out.getvalue()
+            writer.close()
+
+            reader = datafile.DataFileReader(six.BytesIO(data), root_module.SpecificDatumReader())
+            self.assertEqual(reader.GetMeta('avro.codec'), codec.encode('utf-8'))
+            self.assertEqual([r.to_obj() for r in reader], [r.to_obj() for r in records])
+            self.assertGreater(data.count(writer.sync_marker), 10)
+
+        # Blocks in flight follow workers, for executors passed in as well
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(3) as executor:
+            writer = root_module.SpecificDataFileWriter(six.BytesIO(), LongList.RECORD_SCHEMA, executor=executor,
+                                                        workers=3)
+            self.assertEqual(writer.max_pending, 6)
+            writer = root_module.SpecificDataFileWriter(six.BytesIO(), LongList.RECORD_SCHEMA, executor=executor)
+            self.assertEqual(writer.max_pending, 2 * (os.cpu_count() or 1))
+
+    def test_compact_arrays(self):
+        import array
+        schema_json = self.read_schema('record_with_array.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, compact_arrays='array', stubs=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        self.assertEqual(LongList().hello, array.array('f'))
+        with open(os.path.join(self.output_dir, 'schema_classes.pyi')) as f:
+            self.assertIn('def hello(self) -> array.array:', f.read())
+
+        records = [LongList(value=i, next=i, hello=array.array('f', [j + 0.5 for j in range(i)])) for i in range(5)]
+        out = six.BytesIO()
+        writer = root_module.SpecificDataFileWriter(out, LongList.RECORD_SCHEMA)
+        for r in records:
+            writer.append(r)
+        writer.flush()
+        data = out.getvalue()
+        writer.close()
+        decoded = list(datafile.DataFileReader(six.BytesIO(data), root_module.SpecificDatumReader()))
+        self.assertEqual(decoded, records)
+        self.assertIsInstance(decoded[3].hello, array.array)
+
+        # Lists are still accepted and encode the same way
+        out = six.BytesIO()
+        io.DatumWriter(LongList.RECORD_SCHEMA).write(LongList(value=1, next=2, hello=[1.5, 2.5]),
+                                                       io.BinaryEncoder(out))
+        record = root_module.SpecificDatumReader(LongList.RECORD_SCHEMA).read(
+            io.BinaryDecoder(six.BytesIO(out.getvalue())))
+        self.assertEqual(record.hello, array.array('f', [1.5, 2.5]))
+
+        self.assertEqual(record.to_obj()['hello'], [1.5, 2.5])
+        self.assertEqual(LongList.from_obj(record.to_obj()), record)
+        self.assertEqual(json.loads(record.to_json_str())['hello'], [1.5, 2.5])
+        self.assertTrue(root_module.json_converter.validate(LongList.RECORD_SCHEMA, record))
+        self.assertFalse(root_module.json_converter.validate(
+            LongList.RECORD_SCHEMA, LongList(value=1, next=2, hello=array.array('q', [1]))))
+
+        copied = record.copy(deep=True)
+        self.assertIsNot(copied.hello, record.hello)
+        copied.hello.append(3.5)
+        self.assertEqual(record.hello, array.array('f', [1.5, 2.5]))
+
+        # Compact arrays equal lists of the same numbers
+        self.assertEqual(record, LongList(value=1, next=2, hello=[1.5, 2.5]))
+        self.assertEqual(LongList(value=1, next=2, hello=[1.5, 2.5]), record)
+        self.assertNotEqual(record, LongList(value=1, next=2, hello=[1.5]))
+
+        # Every reader of the package decodes compact arrays
+        decoded = LongList.from_bytes(record.to_bytes())
+        self.assertIsInstance(decoded.hello, array.array)
+        self.assertEqual(decoded, record)
+
+        from avrogen import aio, json_text
+        tmp_file = tempfile.mktemp()
+        with open(tmp_file, 'w') as f:
+            json_text.write_ndjson(f, records)
+        decoded = list(LongList.read_ndjson(tmp_file, workers=0))
+        os.remove(tmp_file)
+        self.assertEqual(decoded, records)
+        self.assertIsInstance(decoded[3].hello, array.array)
+
+        async def read_async():
+            stream = asyncio.StreamReader()
+            stream.feed_data(data)
+            stream.feed_eof()
+            return [r async for r in aio.AsyncSpecificReader(stream, root_module.SpecificDatumReader())]
+        decoded = asyncio.run(read_async())
+        self.assertEqual(decoded, records)
+        self.assertIsInstance(decoded[3].hello, array.array)
+
+        with self.assertRaises(ValueError):
+            avrogen.schema.generate_schema(schema_json, frozen=True, compact_arrays='array')
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_compact_numpy_arrays(self):
+        schema_json = self.read_schema('record_with_array.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, compact_arrays='numpy')
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        record = LongList(value=1, next=2, hello=numpy.array([1.5, 2.5], dtype='<f4'))
+        out = six.BytesIO()
+        writer = root_module.SpecificDataFileWriter(out, LongList.RECORD_SCHEMA)
+        writer.append(record)
+        writer.flush()
+        data = out.getvalue()
+        writer.close()
+        decoded, = datafile.DataFileReader(six.BytesIO(data), root_module.SpecificDatumReader())
+        self.assertIsInstance(decoded.hello, numpy.ndarray)
+        self.assertEqual(decoded, record)
+        self.assertNotEqual(decoded, LongList(value=1, next=2, hello=numpy.array([1.5], dtype='<f4')))
+        self.assertEqual(LongList.from_obj(decoded.to_obj()), record)
+
+    def test_copy(self):
+        schema_json = self.read_schema('recursive_record.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        import copy
+
+        LongList = root_module.LongList
+        a = LongList(value=1, next=LongList(value=2, next=None))
+
+        shallow = a.copy()
+        self.assertIsInstance(shallow, LongList)
+        self.assertIs(shallow.next, a.next)
+
+        for deep in (a.copy(deep=True), copy.deepcopy(a)):
+            self.assertIsInstance(deep, LongList)
+            self.assertEqual(deep, a)
+            self.assertIsNot(deep.next, a.next)
+            deep.next.value = 3
+            self.assertEqual(a.next.value, 2)
+
+    def test_copy_on_write(self):
+        schema_json = self.read_schema('recursive_record.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, copy_on_write=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        a = LongList(value=1, next=LongList(value=2, next=LongList(value=3, next=None)))
+        b = a.copy(deep=True)
+        self.assertIs(b._inner_dict, a._inner_dict)
+
+        b.next.next.value = 30
+        a.value = 10
+        self.assertEqual((a.value, a.next.value, a.next.next.value), (10, 2, 3))
+        self.assertEqual((b.value, b.next.value, b.next.next.value), (1, 2, 30))
+
+        c = b.copy(deep=True)
+        b.next.value = 20
+        self.assertEqual(c.next.value, 2)
+        self.assertEqual(c.next.next.value, 30)
+
+    def test_copy_on_write_arrays(self):
+        schema_json = self.read_schema('record_with_array.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, copy_on_write=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        a = LongList(value=1, next=2, hello=[1.0])
+        b = a.copy(deep=True)
+        b.hello.append(2.0)
+        a.hello.append(3.0)
+        self.assertEqual(a.hello, [1.0, 3.0])
+        self.assertEqual(b.hello, [1.0, 2.0])
+
+        # Shallow copies are isolated from deep copies sharing the same values
+        a = LongList(value=1, next=2, hello=[1.0])
+        b = a.copy(deep=True)
+        c = a.copy()
+        c.hello.append(9.0)
+        self.assertEqual((a.hello, b.hello, c.hello), ([1.0], [1.0], [1.0, 9.0]))
+
+        # The dict accessors take private copies like the getters
+        a = LongList(value=1, next=2, hello=[1.0])
+        b = a.copy(deep=True)
+        a['hello'].append(7.0)
+        a.get('hello').append(8.0)
+        self.assertEqual(b.hello, [1.0])
+        self.assertEqual(b['hello'], [1.0])
+        c = b.copy(deep=True)
+        dict(b.items())['hello'].append(5.0)
+        list(c.values())[2].append(6.0)
+        self.assertEqual((a.hello, b.hello, c.hello), ([1.0, 7.0, 8.0], [1.0, 5.0], [1.0, 6.0]))
+
+    def test_compare_encoded(self):
+        schema_json = self.read_schema('record_with_array.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        LongList = root_module.LongList
+        records = [LongList(value=v, next=n, hello=h) for v, n, h in
+                   [(2, 1, []), (1, 2.5, [1.0]), (1, 2, [2.0]), (1, 2, [1.0, 0.0])]]
+        encoded = []
+        for r in records:
+            out = six.BytesIO()
+            io.DatumWriter(LongList.RECORD_SCHEMA).write(r, io.BinaryEncoder(out))
+            encoded.append(out.getvalue())
+
+        self.assertEqual(LongList.compare_encoded(encoded[0], encoded[1]), 1)
+        self.assertEqual(LongList.compare_encoded(encoded[2], encoded[2]), 0)
+        self.assertEqual(sorted(encoded, key=LongList.sort_key_encoded()),
+                         [encoded[3], encoded[2], encoded[1], encoded[0]])
+
     def test_array_record(self):
         self.primitive_type_tester('array.json')
 
@@ -122,6 +758,8 @@ class GeneratorTestCase(unittest.TestCase):
         root_module, _ = self.load_gen(self.test_name)
 
         self.assertTrue(hasattr(root_module, 'myenum'))
+        self.assertEqual(root_module.myenum.CANONICAL_FORM,
+                         '{"name":"myenum","type":"enum","symbols":["zero","int","two","three"]}')
 
     def test_tweet(self):
         schema_json = self.read_schema('tweet.json')
@@ -236,6 +874,83 @@ class GeneratorTestCase(unittest.TestCase):
             tzlocal.get_localzone().localize(instance.timestampMillisFieldWithDefault).astimezone(pytz.UTC),
             datetime.datetime(1970, 1, 1, 0, 0, 42, tzinfo=pytz.UTC))
 
+    def test_binary_decimal(self):
+        schema_json = self.read_schema('decimal_types.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, use_logical_types=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+        sample_ns = importlib.import_module('.org.sample', self.test_name)
+
+        import decimal
+        from avrogen import logical
+
+        instance = sample_ns.DecimalTypesTest()
+        self.assertEqual(instance.bytesField, decimal.Decimal(0))
+        self.assertEqual(instance.bytesFieldWithDefault, decimal.Decimal('12.34'))
+
+        instance.bytesField = decimal.Decimal('-1.5')
+        instance.fixedField = decimal.Decimal('3.14159')
+
+        tmp_file = tempfile.mktemp()
+        with open(tmp_file, "w+b") as f:
+            df = datafile.DataFileWriter(f, logical.LogicalDatumWriter(), sample_ns.DecimalTypesTest.RECORD_SCHEMA)
+            df.append(instance)
+            df.close()
+
+        with open(tmp_file, "rb") as f:
+            df = datafile.DataFileReader(f, root_module.SpecificDatumReader())
+            instance1 = next(df)
+            df.close()
+
+        self.assertIsInstance(instance1, sample_ns.DecimalTypesTest)
+        self.assertEqual(instance1.bytesField, decimal.Decimal('-1.50'))
+        self.assertEqual(instance1.bytesFieldWithDefault, decimal.Decimal('12.34'))
+        self.assertEqual(instance1.fixedField, decimal.Decimal('3.1416'))
+
+    def test_single_object_encoding(self):
+        schema_json = self.read_schema('decimal_types.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, use_logical_types=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+        sample_ns = importlib.import_module('.org.sample', self.test_name)
+
+        import decimal
+        from avrogen import fingerprint
+
+        instance = sample_ns.DecimalTypesTest()
+        instance.bytesField = decimal.Decimal('-1.5')
+        instance.fixedField = decimal.Decimal('3.14159')
+
+        data = instance.to_bytes()
+        self.assertEqual(data[:2], b'\xc3\x01')
+        self.assertEqual(data[2:10], fingerprint.schema_fingerprint(sample_ns.DecimalTypesTest.RECORD_SCHEMA))
+
+        instance1 = sample_ns.DecimalTypesTest.from_bytes(data)
+        self.assertIsInstance(instance1, sample_ns.DecimalTypesTest)
+        self.assertEqual(instance1.bytesField, decimal.Decimal('-1.50'))
+        self.assertEqual(instance1.bytesFieldWithDefault, decimal.Decimal('12.34'))
+        self.assertEqual(instance1.fixedField, decimal.Decimal('3.1416'))
+
+        obj = instance.to_obj()
+        obj = {k: v.decode('latin-1') if isinstance(v, bytes) else v for k, v in obj.items()}
+        self.assertEqual(json.loads(instance.to_json_str()), obj)
+
+        with self.assertRaises(ValueError):
+            sample_ns.DecimalTypesTest.from_bytes(b'\x00' + data[1:])
+        with self.assertRaises(ValueError):
+            sample_ns.DecimalTypesTest.from_bytes(data[:2] + b'\x00' * 8 + data[10:])
+
+        # Codecs belong to their converter and are dropped with it
+        import gc
+        import weakref
+        from avrogen import avrojson, single_object
+        self.assertIs(single_object.get_codec(root_module.json_converter),
+                      single_object.get_codec(root_module.json_converter))
+        converter = avrojson.AvroJsonConverter(schema_types={})
+        single_object.get_codec(converter)
+        converter_ref = weakref.ref(converter)
+        del converter
+        gc.collect()
+        self.assertIsNone(converter_ref())
+
     @unittest.skip("don't care about protocol tests")
     def test_simple_protocol(self):
         schema_json = self.read_schema('sample.avpr')
@@ -447,7 +1162,6 @@ class GeneratorTestCase(unittest.TestCase):
         self.assertEqual(tweet.metadata.venuePoint.known, tweet1.metadata.venuePoint.known)
         self.assertEqual(tweet.metadata.venuePoint.data, tweet1.metadata.venuePoint.data)
 
-    @unittest.skip
     def test_defaults(self):
         schema_json = self.read_schema('record_with_default_nested.json')
         avrogen.schema.write_schema_files(schema_json, self.output_dir, use_logical_types=True)
@@ -462,6 +1176,48 @@ class GeneratorTestCase(unittest.TestCase):
         self.assertEquals(record.nullableWithLogicalType, datetime.date(1970, 2, 12))
         self.assertEquals(record.multiNullable, 42)
 
+    def test_lazy_defaults(self):
+        schema_json = self.read_schema('record_with_default_nested.json')
+        avrogen.schema.write_schema_files(schema_json, self.output_dir, use_logical_types=True)
+        root_module, schema_classes = self.load_gen(self.test_name)
+
+        # Nested defaults are created on first read only
+        record = root_module.sample_recordClass()
+        self.assertNotIn('withDefault', record._inner_dict)
+        self.assertIn('withDefault', record)
+        self.assertEqual(record.copy(deep=True)._inner_dict, record._inner_dict)
+        self.assertEqual(record.withDefault.field1, 42)
+        self.assertIs(record.withDefault, record._inner_dict['withDefault'])
+
+        # and not at all when a value is assigned first
+        other = root_module.sample_recordClass(withDefault=schema_classes.recordWithDefaultClass(field1=1))
+        self.assertEqual(other.withDefault.field1, 1)
+        self.assertNotIn('nullableWithDefault', other._inner_dict)
+
+        # Serialization and comparisons see the defaults
+        obj = root_module.sample_recordClass().to_obj()
+        self.assertEqual(obj['withDefault'], {'field1': 42})
+        self.assertEqual(obj['nullableWithDefault'], {'nullableRecordWithDefault': {'field1': 42}})
+        self.assertEqual(root_module.sample_recordClass(), root_module.sample_recordClass.from_obj(obj))
+        self.assertEqual(len(root_module.sample_recordClass()), 5)
+
+        # Read-only introspection does not create the defaults
+        record = root_module.sample_recordClass()
+        self.assertEqual(len(record), 5)
+        self.assertTrue(record)
+        self.assertEqual(sorted(record), sorted(obj))
+        self.assertEqual(sorted(record.keys()), sorted(obj))
+        self.assertIn('field1', repr(record))
+        self.assertEqual(record, root_module.sample_recordClass.from_obj(obj))
+        self.assertNotIn('withDefault', record._inner_dict)
+
+        out = six.BytesIO()
+        avrogen.logical.LogicalDatumWriter(root_module.sample_recordClass.RECORD_SCHEMA).write(
+            root_module.sample_recordClass(), io.BinaryEncoder(out))
+        record = root_module.SpecificDatumReader(root_module.sample_recordClass.RECORD_SCHEMA).read(
+            io.BinaryDecoder(six.BytesIO(out.getvalue())))
+        self.assertEqual(record.nullableRecordWithLogicalType.field1, datetime.date(1970, 2, 12))
+
     def primitive_type_tester(self, schema_name):
         schema_json = self.read_schema(schema_name)
         avrogen.schema.write_schema_files(schema_json, self.output_dir)
@@ -0,0 +1,95 @@
+import datetime
+import io
+import unittest
+
+from avro import io as avro_io
+from avro import schema
+
+from avrogen import avrojson, logical
+from avrogen.instrumentation import Instrumentation
+
+if not hasattr(schema, 'parse'):
+    # Older versions of avro used a capital P in Parse.
+    schema.parse = schema.Parse
+
+RECORD_SCHEMA = schema.parse('''{
+    "type": "record", "name": "Event", "namespace": "org.sample", "fields": [
+        {"name": "day", "type": {"type": "int", "logicalType": "date"}},
+        {"name": "value", "type": ["null", "string", "long"]},
+        {"name": "child", "type": ["null", {"type": "record", "name": "Child", "fields": [
+            {"name": "id", "type": "long"}
+        ]}]}
+    ]
+}''')
+
+DATUM = {'day': datetime.date(2020, 1, 2), 'value': 5, 'child': {'id': 1}}
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_converter(self):
+        instrumentation = Instrumentation()
+        converter = avrojson.AvroJsonConverter(use_logical_types=True, instrumentation=instrumentation)
+        obj = converter.to_json_object(DATUM, RECORD_SCHEMA)
+        self.assertEqual(converter.from_json_object(obj, RECORD_SCHEMA), DATUM)
+
+        counters = instrumentation.snapshot()
+        self.assertEqual(counters['org.sample.Event']['calls'], 2)
+        self.assertEqual(counters['org.sample.Event']['datums'], 2)
+        self.assertGreaterEqual(counters['org.sample.Event']['time'], 0)
+        self.assertEqual(counters['org.sample.Child']['datums'], 2)
+        self.assertEqual(counters['org.sample.Child']['calls'], 0)
+        # Unnamed schemas are counted by field path, and union probes against the union
+        self.assertEqual(counters['org.sample.Event.day']['logical_conversions'], 2)
+        self.assertEqual(counters['org.sample.Event.value']['union_probes'], 3)
+        self.assertEqual(counters['org.sample.Event.child']['union_probes'], 2)
+        self.assertNotIn('date', counters)
+        self.assertNotIn('long', counters)
+
+        converter.with_tuple_union().to_json_object(DATUM, RECORD_SCHEMA)
+        self.assertEqual(instrumentation.snapshot()['org.sample.Event']['calls'], 3)
+
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {})
+
+    def test_disabled(self):
+        converter = avrojson.AvroJsonConverter(use_logical_types=True)
+        self.assertIsNone(converter.instrumentation)
+        self.assertEqual(converter.from_json_object(converter.to_json_object(DATUM, RECORD_SCHEMA), RECORD_SCHEMA),
+                         DATUM)
+
+    def test_reader_writer(self):
+        instrumentation = Instrumentation()
+        out = io.BytesIO()
+        writer = logical.LogicalDatumWriter(RECORD_SCHEMA, instrumentation=instrumentation)
+        encoder = avro_io.BinaryEncoder(out)
+        writer.write(DATUM, encoder)
+        writer.write(DATUM, encoder)
+
+        reader = logical.LogicalDatumReader(RECORD_SCHEMA, RECORD_SCHEMA, instrumentation=instrumentation)
+        decoder = avro_io.BinaryDecoder(io.BytesIO(out.getvalue()))
+        self.assertEqual(reader.read(decoder), DATUM)
+
+        counters = instrumentation.snapshot()
+        self.assertEqual(counters['org.sample.Event']['calls'], 3)
+        self.assertEqual(counters['org.sample.Event']['datums'], 3)
+        self.assertEqual(counters['org.sample.Child']['datums'], 3)
+        self.assertEqual(counters['org.sample.Event.day']['logical_conversions'], 3)
+        self.assertGreater(counters['org.sample.Event.value']['union_probes'], 0)
+
+    def test_field_paths(self):
+        instrumentation = Instrumentation()
+        record_schema = schema.parse('''{"type": "record", "name": "Days", "fields": [
+            {"name": "first", "type": {"type": "int", "logicalType": "date"}},
+            {"name": "others", "type": {"type": "array", "items": {"type": "int", "logicalType": "date"}}}
+        ]}''')
+        converter = avrojson.AvroJsonConverter(use_logical_types=True, instrumentation=instrumentation)
+        day = datetime.date(2020, 1, 2)
+        converter.to_json_object({'first': day, 'others': [day, day]}, record_schema)
+
+        counters = instrumentation.snapshot()
+        self.assertEqual(counters['Days.first']['logical_conversions'], 1)
+        self.assertEqual(counters['Days.others[]']['logical_conversions'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
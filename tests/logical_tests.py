@@ -2,7 +2,13 @@ from __future__ import division
 from avrogen.logical import DecimalLogicalTypeProcessor, DateLogicalTypeProcessor
 from avrogen.logical import TimestampMicrosLogicalTypeProcessor, TimestampMillisLogicalTypeProcessor
 from avrogen.logical import TimeMicrosLogicalTypeProcessor, TimeMillisLogicalTypeProcessor
+from avrogen.logical import LogicalDatumReader, LogicalDatumWriter, UTC_LOGICAL_TYPES
+from avrogen.resolution import DecoderCache
+from avrogen.weak_cache import SchemaWeakCache
 from avro import schema
+from avro import io as avro_io
+import io
+import gc
 import unittest
 import decimal
 import contextlib
@@ -12,6 +18,11 @@ import tzlocal
 import time
 import six
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 if six.PY3:
     make_avsc_object = schema.SchemaFromJSONData
 else:
@@ -51,6 +62,35 @@ class LogicalTypeTest(unittest.TestCase):
 
         self.assertEquals(p.convert_back(test_schema1, test_schema1, '123456.789'), decimal.Decimal('123456.789'))
 
+    def test_decimal_binary(self):
+        p = DecimalLogicalTypeProcessor()
+
+        bytes_schema = make_avsc_object({'type': 'bytes', 'logicalType': 'decimal', 'precision': 10, 'scale': 2})
+        fixed_schema = make_avsc_object({'type': 'fixed', 'name': 'dec', 'size': 4, 'logicalType': 'decimal',
+                                         'precision': 9, 'scale': 3})
+
+        self.assertTrue(p.can_convert(bytes_schema))
+        self.assertTrue(p.can_convert(fixed_schema))
+        self.assertTrue(p.does_match(bytes_schema, bytes_schema))
+        self.assertTrue(p.does_match(fixed_schema, fixed_schema))
+
+        self.assertEquals(p.convert(bytes_schema, decimal.Decimal('12.34')), b'\x04\xd2')
+        self.assertEquals(p.convert(bytes_schema, -1), b'\x9c')
+        self.assertEquals(p.convert(bytes_schema, decimal.Decimal('-1.28')), b'\x80')
+        self.assertEquals(p.convert(bytes_schema, 0.125), b'\x0c')
+        self.assertEquals(p.convert(fixed_schema, decimal.Decimal('-1.5')), b'\xff\xff\xfa\x24')
+
+        self.assertEquals(p.convert_back(bytes_schema, bytes_schema, b'\x04\xd2'), decimal.Decimal('12.34'))
+        self.assertEquals(p.convert_back(bytes_schema, bytes_schema, u'\x04\xd2'), decimal.Decimal('12.34'))
+        self.assertEquals(p.convert_back(fixed_schema, fixed_schema, b'\xff\xff\xfa\x24'),
+                          decimal.Decimal('-1.500'))
+
+        # Integers and decimals are checked against the precision the same way
+        self.assertEquals(p.convert(bytes_schema, 99999999), p.convert(bytes_schema, decimal.Decimal(99999999)))
+        for value in (decimal.Decimal('123456789.1'), decimal.Decimal(100000000), 100000000, -100000000):
+            with self.assertRaises(decimal.InvalidOperation):
+                p.convert(bytes_schema, value)
+
     def test_date(self):
         p = DateLogicalTypeProcessor()
 
@@ -183,6 +223,124 @@ class LogicalTypeTest(unittest.TestCase):
             p.convert_back(test_schema2, test_schema2, p.convert(test_schema2, datetime.datetime(2016, 1, 1))),
             datetime.datetime(2016, 1, 1))
 
+    def test_timestamp_utc(self):
+        p = TimestampMicrosLogicalTypeProcessor(utc=True)
+        test_schema = make_avsc_object('long')
+
+        self.assertEquals(p.convert(test_schema, datetime.datetime(2015, 5, 1, microsecond=123456)), 1430438400123456)
+        self.assertEquals(p.convert(test_schema, datetime.date(2015, 5, 1)), 1430438400000000)
+        self.assertEquals(p.convert(test_schema,
+                                    pytz.timezone('America/New_York').localize(
+                                        datetime.datetime(2015, 5, 1, 0, 0, 0, microsecond=123456))),
+                          1430452800123456)
+        self.assertEquals(p.convert_back(test_schema, test_schema, 1430438400123456),
+                          datetime.datetime(2015, 5, 1, microsecond=123456))
+
+        p = TimestampMillisLogicalTypeProcessor(utc=True)
+        self.assertEquals(p.convert(test_schema, datetime.datetime(2015, 5, 1, microsecond=123456)), 1430438400123)
+        self.assertEquals(p.convert_back(test_schema, test_schema, 1430438400123),
+                          datetime.datetime(2015, 5, 1, microsecond=123000))
+
+    def test_timestamp_precision(self):
+        p = TimestampMicrosLogicalTypeProcessor(utc=True)
+        test_schema = make_avsc_object('long')
+
+        value = datetime.datetime(9999, 12, 31, 23, 59, 59, 999999)
+        self.assertEquals(p.convert_back(test_schema, test_schema, p.convert(test_schema, value)), value)
+        value = datetime.datetime(1, 1, 1, 0, 0, 0, 1)
+        self.assertEquals(p.convert_back(test_schema, test_schema, p.convert(test_schema, value)), value)
+
+    def test_convert_many(self):
+        test_schema = make_avsc_object('long')
+        p = TimestampMicrosLogicalTypeProcessor(utc=True)
+        values = [datetime.datetime(2015, 5, 1, microsecond=123456), datetime.datetime(1969, 12, 31, 23, 59, 59)]
+        self.assertEquals(p.convert_many(test_schema, values), [1430438400123456, -1000000])
+        self.assertEquals(p.convert_back_many(test_schema, test_schema, [1430438400123456, -1000000]), values)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_convert_many_numpy(self):
+        test_schema = make_avsc_object('long')
+        stamps = numpy.array(['2015-05-01T00:00:00.123456', '1969-12-31T23:59:59'], dtype='datetime64[us]')
+
+        p = TimestampMicrosLogicalTypeProcessor(utc=True)
+        converted = p.convert_many(test_schema, stamps)
+        self.assertEquals(converted.tolist(), [1430438400123456, -1000000])
+        self.assertTrue((p.convert_back_many(test_schema, test_schema, converted) == stamps).all())
+
+        p = TimestampMillisLogicalTypeProcessor(utc=True)
+        self.assertEquals(p.convert_many(test_schema, stamps).tolist(), [1430438400123, -1000])
+
+        # Local time processors treat datetime64 values like naive datetimes
+        for p in (TimestampMicrosLogicalTypeProcessor(), TimestampMillisLogicalTypeProcessor()):
+            converted = p.convert_many(test_schema, stamps)
+            self.assertEquals(converted.tolist(), p.convert_many(test_schema, stamps.tolist()))
+            self.assertEquals(p.convert_back_many(test_schema, test_schema, converted).tolist(),
+                              p.convert_back_many(test_schema, test_schema, converted.tolist()))
+
+        p = DateLogicalTypeProcessor()
+        days = p.convert_many(test_schema, stamps)
+        self.assertEquals(days.tolist(), [16556, -1])
+        self.assertEquals(p.convert_back_many(test_schema, test_schema, days).tolist(),
+                          [datetime.date(2015, 5, 1), datetime.date(1969, 12, 31)])
+
+        p = TimeMillisLogicalTypeProcessor()
+        times = numpy.array([84265123456], dtype='timedelta64[us]')
+        self.assertEquals(p.convert_many(test_schema, times).tolist(), [84265123])
+        self.assertEquals(p.convert_back_many(test_schema, test_schema, numpy.array([84265123])).tolist(),
+                          [datetime.timedelta(microseconds=84265123000)])
+
+    def test_datum_reader_writer(self):
+        test_schema = make_avsc_object({'type': 'record', 'name': 'test_record', 'fields': [
+            {'name': 'field1', 'type': 'long'},
+            {'name': 'date1', 'type': {'type': 'int', 'logicalType': 'date'}},
+            {'name': 'times', 'type': {'type': 'array', 'items': {'type': 'int', 'logicalType': 'time-millis'}}},
+        ]})
+        record = dict(field1=42, date1=datetime.date(2015, 3, 4), times=[datetime.time(23, 24, 25, 123000)])
+
+        buf = io.BytesIO()
+        writer = LogicalDatumWriter(test_schema)
+        writer.write(record, avro_io.BinaryEncoder(buf))
+        reader = LogicalDatumReader(test_schema, test_schema)
+        self.assertEquals(reader.read(avro_io.BinaryDecoder(io.BytesIO(buf.getvalue()))), record)
+
+        # Whether a handler matches the writer's schema is resolved once per schema pair
+        from unittest import mock
+        does_match = TimeMillisLogicalTypeProcessor.does_match
+        with mock.patch.object(TimeMillisLogicalTypeProcessor, 'does_match', autospec=True,
+                               side_effect=does_match) as match:
+            reader = LogicalDatumReader(test_schema, test_schema)
+            for _ in range(2):
+                self.assertEquals(reader.read(avro_io.BinaryDecoder(io.BytesIO(buf.getvalue()))), record)
+            self.assertEquals(match.call_count, 1)
+
+        with self._exception():
+            writer.write(dict(record, date1='2015-03-04'), avro_io.BinaryEncoder(io.BytesIO()))
+
+    def test_decoder_cache_logical_types(self):
+        cache = DecoderCache(lambda w, r: LogicalDatumReader(w, r or w, logical_types=UTC_LOGICAL_TYPES))
+        plain = '{"type": "record", "name": "Stamp", "fields": [{"name": "t", "type": "long"}]}'
+        logical = '{"type": "record", "name": "Stamp", "fields": [' \
+                  '{"name": "t", "type": {"type": "long", "logicalType": "timestamp-millis"}}]}'
+        data = b'\x02'
+
+        # Both schemas have the same fingerprint, but are read differently
+        self.assertIsNot(cache.get(plain), cache.get(logical))
+        self.assertIs(cache.get(logical), cache.get(logical))
+        self.assertEquals(cache.get(plain).read(avro_io.BinaryDecoder(io.BytesIO(data))), {'t': 1})
+        self.assertEquals(cache.get(logical).read(avro_io.BinaryDecoder(io.BytesIO(data))),
+                          {'t': datetime.datetime(1970, 1, 1, 0, 0, 0, 1000)})
+
+    def test_schema_weak_cache(self):
+        cache = SchemaWeakCache()
+        test_schema = make_avsc_object({'type': 'int', 'logicalType': 'date'})
+        cache.set(test_schema, 'value')
+        self.assertEquals(cache.get(test_schema), 'value')
+        self.assertIsNone(cache.get(make_avsc_object('int')))
+
+        del test_schema
+        gc.collect()
+        self.assertEquals(len(cache), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
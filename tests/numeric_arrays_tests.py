@@ -0,0 +1,153 @@
+import array
+import json
+import unittest
+
+import six
+from avro import io, schema
+
+from avrogen import logical, numeric_arrays
+from avrogen.avrojson import AvroJsonConverter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def parse(schema_json):
+    return schema.SchemaFromJSONData(schema_json, schema.Names())
+
+
+def encode(writers_schema, datum):
+    out = six.BytesIO()
+    logical.LogicalDatumWriter(writers_schema, logical_types=None).write(datum, io.BinaryEncoder(out))
+    return out.getvalue()
+
+
+class CompactReader(numeric_arrays.CompactArrayReaderMixin, io.DatumReader):
+    compact_arrays = numeric_arrays.COMPACT_ARRAY
+
+
+def decode(writers_schema, readers_schema, data, reader_class=CompactReader):
+    return reader_class(writers_schema, readers_schema).read(io.BinaryDecoder(six.BytesIO(data)))
+
+
+class NumericArraysTest(unittest.TestCase):
+    def test_compact_mode(self):
+        doubles = parse({'type': 'array', 'items': 'double'})
+        self.assertIsNone(numeric_arrays.compact_mode(doubles))
+        self.assertEqual(numeric_arrays.compact_mode(doubles, 'array'), 'array')
+        self.assertEqual(numeric_arrays.compact_mode(parse({'type': 'array', 'items': 'int', 'compact': True})),
+                         'array')
+        self.assertIsNone(numeric_arrays.compact_mode(parse({'type': 'array', 'items': 'int', 'compact': False}),
+                                                      'array'))
+        self.assertIsNone(numeric_arrays.compact_mode(parse({'type': 'array', 'items': 'string'}), 'array'))
+        dates = parse({'type': 'array', 'items': {'type': 'int', 'logicalType': 'date'}})
+        self.assertIsNone(numeric_arrays.compact_mode(dates, 'array'))
+        self.assertEqual(numeric_arrays.requested_mode(doubles, 'numpy'), 'numpy')
+        self.assertEqual(numeric_arrays.compact_mode(doubles, 'numpy'), 'numpy' if numpy is not None else 'array')
+
+    def test_round_trip(self):
+        for items_type, values in (('int', [0, -1, 2 ** 31 - 1, -2 ** 31]),
+                                   ('long', [0, -1, 2 ** 63 - 1, -2 ** 63]),
+                                   ('float', [0.0, -1.5, 3.25]),
+                                   ('double', [0.0, -1.5, 1e300])):
+            array_schema = parse({'type': 'array', 'items': items_type})
+            compact = numeric_arrays.from_list(values, items_type, numeric_arrays.COMPACT_ARRAY)
+            # Compact arrays encode to the same bytes as lists
+            data = encode(array_schema, compact)
+            self.assertEqual(data, encode(array_schema, values))
+            decoded = decode(array_schema, array_schema, data)
+            self.assertEqual(decoded, compact)
+            self.assertEqual(decoded.typecode, numeric_arrays.TYPECODES[items_type])
+        self.assertEqual(decode(array_schema, array_schema, encode(array_schema, [])), array.array('d'))
+
+    def test_blocks(self):
+        array_schema = parse({'type': 'array', 'items': 'double'})
+        out = six.BytesIO()
+        encoder = io.BinaryEncoder(out)
+        # One block with a count, one with a negative count and size
+        encoder.write_long(2)
+        encoder.write_double(1.0)
+        encoder.write_double(2.0)
+        encoder.write_long(-1)
+        encoder.write_long(8)
+        encoder.write_double(3.0)
+        encoder.write_long(0)
+        self.assertEqual(decode(array_schema, array_schema, out.getvalue()), array.array('d', [1.0, 2.0, 3.0]))
+
+    def test_promotion(self):
+        def read(data, writers_items_type, readers_items_type):
+            return numeric_arrays.read_array(io.BinaryDecoder(six.BytesIO(data)), writers_items_type,
+                                             readers_items_type, numeric_arrays.COMPACT_ARRAY)
+
+        ints = encode(parse({'type': 'array', 'items': 'int'}), [1, -2, 3])
+        for items_type in ('long', 'float', 'double'):
+            decoded = read(ints, 'int', items_type)
+            self.assertEqual(decoded.typecode, numeric_arrays.TYPECODES[items_type])
+            self.assertEqual(decoded.tolist(), [1, -2, 3])
+        floats = encode(parse({'type': 'array', 'items': 'float'}), [0.5, 1.5])
+        self.assertEqual(read(floats, 'float', 'double'), array.array('d', [0.5, 1.5]))
+
+    def test_nested_and_schema_property(self):
+        record = parse({'type': 'record', 'name': 'Samples', 'fields': [
+            {'name': 'rows', 'type': {'type': 'array', 'items': {'type': 'array', 'items': 'long'}}},
+            {'name': 'tags', 'type': {'type': 'array', 'items': 'string'}},
+            {'name': 'weights', 'type': {'type': 'array', 'items': 'float', 'compact': 'array'}},
+        ]})
+        datum = {'rows': [[1, 2], []], 'tags': ['a'], 'weights': [0.5]}
+        decoded = decode(record, record, encode(record, datum), io.DatumReader)
+        self.assertEqual(decoded, datum)
+
+        class PropertyReader(numeric_arrays.CompactArrayReaderMixin, io.DatumReader):
+            pass
+
+        decoded = decode(record, record, encode(record, datum), PropertyReader)
+        self.assertEqual(decoded['rows'], [[1, 2], []])
+        self.assertEqual(decoded['weights'], array.array('f', [0.5]))
+        decoded = decode(record, record, encode(record, datum))
+        self.assertEqual(decoded['rows'], [array.array('q', [1, 2]), array.array('q')])
+        self.assertEqual(decoded['tags'], ['a'])
+
+    def test_json(self):
+        array_schema = parse({'type': 'array', 'items': 'int'})
+        converter = AvroJsonConverter(compact_arrays='array')
+        compact = converter.from_json_object([1, 2, 3], array_schema)
+        self.assertEqual(compact, array.array(numeric_arrays.TYPECODES['int'], [1, 2, 3]))
+        self.assertEqual(converter.to_json_object(compact, array_schema), [1, 2, 3])
+        self.assertEqual(converter.with_tuple_union().compact_arrays, 'array')
+        self.assertEqual(AvroJsonConverter().from_json_object([1, 2, 3], array_schema), [1, 2, 3])
+
+    def test_validation(self):
+        converter = AvroJsonConverter()
+        ints = parse({'type': 'array', 'items': 'int'})
+        doubles = parse({'type': 'array', 'items': 'double'})
+        self.assertTrue(converter.validate(ints, array.array('h', [1])))
+        self.assertFalse(converter.validate(ints, array.array('q', [1])))
+        self.assertFalse(converter.validate(ints, array.array('d', [1.0])))
+        self.assertTrue(converter.validate(doubles, array.array('f', [1.0])))
+        self.assertFalse(converter.validate(parse({'type': 'array', 'items': 'string'}), array.array('d')))
+        with self.assertRaises(io.AvroTypeException):
+            encode(ints, array.array('q', [1]))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        array_schema = parse({'type': 'array', 'items': 'double'})
+
+        class NumpyReader(numeric_arrays.CompactArrayReaderMixin, io.DatumReader):
+            compact_arrays = numeric_arrays.COMPACT_NUMPY
+
+        values = numpy.arange(5, dtype='<f8')
+        data = encode(array_schema, values)
+        self.assertEqual(data, encode(array_schema, values.tolist()))
+        decoded = decode(array_schema, array_schema, data, NumpyReader)
+        self.assertIsInstance(decoded, numpy.ndarray)
+        self.assertEqual(decoded.tolist(), values.tolist())
+        self.assertEqual(json.loads(json.dumps(AvroJsonConverter().to_json_object(decoded, array_schema))),
+                         values.tolist())
+        self.assertFalse(AvroJsonConverter().validate(parse({'type': 'array', 'items': 'int'}),
+                                                      numpy.zeros(1, dtype='<i8')))
+
+
+if __name__ == '__main__':
+    unittest.main()
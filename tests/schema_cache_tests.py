@@ -0,0 +1,64 @@
+import copy
+import unittest
+
+from avrogen.schema_cache import SchemaCache
+
+ADDRESS = {'type': 'record', 'name': 'Address', 'namespace': 'common', 'fields': [
+    {'name': 'city', 'type': 'string'},
+    {'name': 'zone', 'type': {'type': 'enum', 'name': 'Zone', 'symbols': ['A', 'B']}},
+]}
+
+PERSON = {'type': 'record', 'name': 'Person', 'namespace': 'people', 'fields': [
+    {'name': 'home', 'type': ADDRESS},
+    {'name': 'zones', 'type': {'type': 'array', 'items': 'common.Zone'}},
+]}
+
+COMPANY = {'type': 'record', 'name': 'Company', 'namespace': 'companies', 'fields': [
+    {'name': 'offices', 'type': {'type': 'map', 'values': ['null', ADDRESS]}},
+    {'name': 'headquarters', 'type': 'common.Address'},
+]}
+
+
+class SchemaCacheTest(unittest.TestCase):
+    def test_shares_identical_types(self):
+        cache = SchemaCache()
+        person_names, person = cache.parse(PERSON)
+        company_names, company = cache.parse(COMPANY)
+
+        address = person.fields[0].type
+        self.assertIs(company_names.names['common.Address'], address)
+        self.assertIs(company_names.names['common.Zone'], person_names.names['common.Zone'])
+        self.assertIs(company.fields[0].type.values.schemas[1], address)
+        self.assertIs(company.fields[1].type, address)
+        self.assertEqual(len(cache), 4)
+
+        # A schema which only defines a shared type is the shared schema
+        self.assertIs(cache.parse(ADDRESS)[1], address)
+        self.assertIs(cache.parse(PERSON)[1], person)
+
+    def test_keeps_types_which_differ_outside_canonical_form(self):
+        cache = SchemaCache()
+        address = cache.parse(ADDRESS)[1]
+
+        documented = copy.deepcopy(ADDRESS)
+        documented['fields'][0]['doc'] = 'City name'
+        other = cache.parse(documented)[1]
+        self.assertIsNot(other, address)
+        self.assertEqual(other.fields[0].doc, 'City name')
+        # Nested types which are the same are still shared
+        self.assertIs(other.fields[1].type, address.fields[1].type)
+
+    def test_intern(self):
+        cache = SchemaCache()
+        names, address = cache.parse(ADDRESS)
+        other = SchemaCache().parse(ADDRESS)[1]
+        self.assertIsNot(other, address)
+        self.assertIs(cache.intern(other), address)
+        self.assertIs(cache.lookup(other), address)
+        cache.clear()
+        self.assertIsNone(cache.lookup(other))
+        self.assertIs(cache.intern(other), other)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import io
+import random
+import unittest
+
+from avro import io as avro_io
+from avro import schema
+
+from avrogen import sort_order
+
+if not hasattr(schema, 'parse'):
+    # Older versions of avro used a capital P in Parse.
+    schema.parse = schema.Parse
+
+RECORD_SCHEMA = schema.parse('''{
+    "type": "record", "name": "Sorted", "namespace": "org.sample", "fields": [
+        {"name": "flag", "type": "boolean"},
+        {"name": "count", "type": "long"},
+        {"name": "name", "type": "string"},
+        {"name": "score", "type": "double", "order": "ignore"},
+        {"name": "tags", "type": {"type": "array", "items": "int"}},
+        {"name": "extra", "type": {"type": "map", "values": "string"}, "order": "ignore"},
+        {"name": "opt", "type": ["null", "float"]},
+        {"name": "suit", "type": {"type": "enum", "name": "Suit", "symbols": ["SPADES", "HEARTS", "CLUBS"]}},
+        {"name": "id", "type": {"type": "fixed", "name": "Id", "size": 2}},
+        {"name": "child", "type": ["null", "Sorted"]}
+    ]
+}''')
+
+
+def encode(schema_, datum):
+    out = io.BytesIO()
+    avro_io.DatumWriter(schema_).write(datum, avro_io.BinaryEncoder(out))
+    return out.getvalue()
+
+
+def reference_key(datum):
+    opt = datum['opt']
+    child = datum['child']
+    return (datum['flag'], datum['count'], datum['name'].encode('utf-8'), datum['tags'],
+            (0,) if opt is None else (1, opt), ['SPADES', 'HEARTS', 'CLUBS'].index(datum['suit']), datum['id'],
+            (0,) if child is None else (1, reference_key(child)))
+
+
+def random_datum(rnd, depth=0):
+    return {
+        'flag': rnd.random() < 0.5,
+        'count': rnd.choice([-(1 << 40), -3, 0, 1, 2, 1 << 40]),
+        'name': rnd.choice(['', 'a', 'ab', 'b', u'é', u'\U0001f600']),
+        'score': rnd.random(),
+        'tags': [rnd.randint(-2, 2) for _ in range(rnd.randint(0, 3))],
+        'extra': {'k': str(rnd.random())},
+        'opt': rnd.choice([None, -1.5, 0.0, 2.5]),
+        'suit': rnd.choice(['SPADES', 'HEARTS', 'CLUBS']),
+        'id': bytes(bytearray([rnd.randint(0, 255), rnd.randint(0, 1)])),
+        'child': random_datum(rnd, depth + 1) if depth < 2 and rnd.random() < 0.3 else None,
+    }
+
+
+class SortOrderTest(unittest.TestCase):
+    def test_matches_decoded_order(self):
+        rnd = random.Random(42)
+        data = [random_datum(rnd) for _ in range(300)]
+        encoded = [encode(RECORD_SCHEMA, d) for d in data]
+
+        expected = sorted(range(len(data)), key=lambda k: reference_key(data[k]))
+        actual = sorted(range(len(data)), key=lambda k: sort_order.sort_key_encoded(RECORD_SCHEMA)(encoded[k]))
+        self.assertEqual([reference_key(data[k]) for k in actual], [reference_key(data[k]) for k in expected])
+
+        for _ in range(300):
+            x, y = rnd.randrange(len(data)), rnd.randrange(len(data))
+            kx, ky = reference_key(data[x]), reference_key(data[y])
+            self.assertEqual(sort_order.compare_encoded(RECORD_SCHEMA, encoded[x], encoded[y]),
+                             (kx > ky) - (kx < ky))
+
+    def test_ignore_and_descending(self):
+        schema_ = schema.parse('''{"type": "record", "name": "R", "fields": [
+            {"name": "ignored", "type": "string", "order": "ignore"},
+            {"name": "down", "type": "int", "order": "descending"}
+        ]}''')
+        a = encode(schema_, {'ignored': 'zzz', 'down': 1})
+        b = encode(schema_, {'ignored': 'a', 'down': 2})
+        c = encode(schema_, {'ignored': 'b', 'down': 1})
+        self.assertEqual(sort_order.compare_encoded(schema_, a, b), 1)
+        self.assertEqual(sort_order.compare_encoded(schema_, b, a), -1)
+        self.assertEqual(sort_order.compare_encoded(schema_, a, c), 0)
+
+    def test_array_blocks(self):
+        schema_ = schema.parse('{"type": "array", "items": "long"}')
+        # [1, 2, 3] written as a block of two items with a byte size and a block of one item
+        blocks = b'\x03\x04\x02\x04' + b'\x02\x06' + b'\x00'
+        self.assertEqual(sort_order.compare_encoded(schema_, blocks, encode(schema_, [1, 2, 3])), 0)
+        self.assertEqual(sort_order.compare_encoded(schema_, blocks, encode(schema_, [1, 2])), 1)
+        self.assertEqual(sort_order.compare_encoded(schema_, blocks, encode(schema_, [1, 2, 3, 0])), -1)
+        self.assertEqual(sort_order.compare_encoded(schema_, blocks, encode(schema_, [1, 3])), -1)
+
+    def test_maps_are_not_comparable(self):
+        with self.assertRaises(TypeError):
+            sort_order.compare_encoded(schema.parse('{"type": "map", "values": "int"}'), b'\x00', b'\x00')
+
+    def test_recursive_published_complete(self):
+        comparators = sort_order.EncodedComparators()
+        compile_ = comparators._compile_comparator
+        published = []
+
+        def spy(schema_):
+            # Nothing is published while the record is being compiled
+            published.append(RECORD_SCHEMA in comparators._comparators)
+            return compile_(schema_)
+
+        comparators._comparators._compile = spy
+        cmp = comparators.comparator(RECORD_SCHEMA)
+        self.assertTrue(published)
+        self.assertFalse(any(published))
+        a = encode(RECORD_SCHEMA, random_datum(random.Random(1)))
+        self.assertEqual(cmp(a, 0, a, 0), (0, len(a), len(a)))
+
+    def test_failed_compile_discards_nested(self):
+        outer = schema.parse('''{"type": "record", "name": "Outer", "fields": [
+            {"name": "inner", "type": {"type": "record", "name": "Inner", "fields": [
+                {"name": "outer", "type": ["null", "Outer"]}
+            ]}},
+            {"name": "values", "type": {"type": "map", "values": "int"}}
+        ]}''')
+        inner = outer.fields[0].type
+        comparators = sort_order.EncodedComparators()
+        with self.assertRaises(TypeError):
+            comparators.comparator(outer)
+        # Inner was compiled along with Outer, whose comparator failed, so it is not kept either
+        self.assertNotIn(inner, comparators._comparators)
+        for _ in range(2):
+            with self.assertRaises(TypeError):
+                comparators.comparator(inner)(b'\x02\x00\x00', 0, b'\x02\x00\x00', 0)
@@ -0,0 +1,138 @@
+from avrogen import avrojson
+from avrogen import logical
+from avrogen import validation
+from avro import schema
+from avro import io
+import io as _io
+import unittest
+import datetime
+import six
+
+if six.PY3:
+    make_avsc_object = schema.SchemaFromJSONData
+else:
+    make_avsc_object = schema.make_avsc_object
+
+
+class ValidationTest(unittest.TestCase):
+    validators = validation.SchemaValidators()
+    validators_lt = validation.SchemaValidators(logical.DEFAULT_LOGICAL_TYPES)
+
+    def test_primitives(self):
+        self.assertTrue(self.validators.validate(make_avsc_object('int'), 1))
+        self.assertFalse(self.validators.validate(make_avsc_object('int'), 1 << 40))
+        self.assertTrue(self.validators.validate(make_avsc_object('long'), 1 << 40))
+        self.assertTrue(self.validators.validate(make_avsc_object('double'), 1))
+        self.assertFalse(self.validators.validate(make_avsc_object('string'), b'a'))
+        self.assertTrue(self.validators.validate(make_avsc_object('null'), None))
+
+    def test_containers(self):
+        test_schema = make_avsc_object({'type': 'record', 'name': 'test_record', 'fields': [
+            {'name': 'ints', 'type': {'type': 'array', 'items': 'int'}},
+            {'name': 'strings', 'type': {'type': 'map', 'values': 'string'}},
+            {'name': 'nullable', 'type': ['null', 'string']},
+        ]})
+
+        self.assertTrue(self.validators.validate(test_schema, dict(ints=[1, 2], strings=dict(a='b'), nullable=None)))
+        self.assertFalse(self.validators.validate(test_schema, dict(ints=[1, 'x'], strings={}, nullable=None)))
+        self.assertFalse(self.validators.validate(test_schema, dict(ints=[], strings={1: 'b'}, nullable=None)))
+        self.assertFalse(self.validators.validate(test_schema, dict(ints=[], strings={}, nullable=1)))
+        self.assertFalse(self.validators.validate(test_schema, [1]))
+
+    def test_short_circuit(self):
+        calls = []
+
+        class CountingDate(logical.DateLogicalTypeProcessor):
+            def validate(self, expected_schema, datum):
+                calls.append(datum)
+                return super(CountingDate, self).validate(expected_schema, datum)
+
+        validators = validation.SchemaValidators({'date': CountingDate()})
+        test_schema = make_avsc_object({'type': 'array', 'items': {'type': 'int', 'logicalType': 'date'}})
+        self.assertFalse(validators.validate(test_schema, [datetime.date(2020, 1, 1), 1] + [datetime.date.today()] * 1000))
+        self.assertEqual(len(calls), 2)
+
+    def test_recursive(self):
+        test_schema = make_avsc_object({'type': 'record', 'name': 'LongList', 'fields': [
+            {'name': 'value', 'type': 'long'},
+            {'name': 'next', 'type': ['null', 'LongList']},
+        ]})
+        self.assertTrue(self.validators.validate(test_schema, dict(value=1, next=dict(value=2, next=None))))
+        self.assertFalse(self.validators.validate(test_schema, dict(value=1, next=dict(value='2', next=None))))
+
+    def test_logical_types(self):
+        test_schema = make_avsc_object({'type': 'array', 'items': {'type': 'int', 'logicalType': 'date'}})
+        self.assertTrue(self.validators_lt.validate(test_schema, [datetime.date(2020, 1, 1)]))
+        self.assertFalse(self.validators_lt.validate(test_schema, [1]))
+        self.assertTrue(self.validators.validate(test_schema, [1]))
+
+        # decimal cannot be stored as an int, so the logical type is ignored
+        test_schema = make_avsc_object({'type': 'int', 'logicalType': 'decimal'})
+        self.assertTrue(self.validators_lt.validate(test_schema, 1))
+
+    def test_cached(self):
+        test_schema = make_avsc_object({'type': 'array', 'items': 'int'})
+        self.assertIs(self.validators.get(test_schema), self.validators.get(test_schema))
+        self.assertIs(validation.get_validators(logical.DEFAULT_LOGICAL_TYPES),
+                      validation.get_validators(logical.DEFAULT_LOGICAL_TYPES))
+        # Mappings holding the same processors share validators
+        self.assertIs(validation.get_validators(dict(logical.DEFAULT_LOGICAL_TYPES)),
+                      validation.get_validators(logical.DEFAULT_LOGICAL_TYPES))
+
+    def test_recursive_published_complete(self):
+        test_schema = make_avsc_object({'type': 'record', 'name': 'node', 'fields': [
+            {'name': 'value', 'type': 'int'},
+            {'name': 'next', 'type': ['null', 'node']},
+        ]})
+        validators = validation.SchemaValidators()
+        compile_ = validators._compile
+        published = []
+
+        def spy(schema_):
+            # Nothing is published while the record is being compiled
+            published.append(test_schema in validators._validators)
+            return compile_(schema_)
+
+        validators._validators._compile = spy
+        validator = validators.get(test_schema)
+        self.assertEqual(published, [False] * len(published))
+        self.assertIs(validators.get(test_schema), validator)
+        self.assertTrue(validator(dict(value=1, next=dict(value=2, next=None))))
+        self.assertFalse(validator(dict(value=1, next=dict(value='2', next=None))))
+
+
+class ValidationPolicyTest(unittest.TestCase):
+    test_schema = make_avsc_object({'type': 'record', 'name': 'test_record', 'fields': [
+        {'name': 'field1', 'type': 'int'},
+    ]})
+
+    def test_full(self):
+        converter = avrojson.AvroJsonConverter()
+        converter.to_json_object(dict(field1=1), self.test_schema)
+        with self.assertRaises(io.AvroTypeException):
+            converter.to_json_object(dict(field1='1'), self.test_schema)
+        self.assertEqual(converter.validation_policy.stats(),
+                         dict(level='full', validated=2, failed=1, skipped=0))
+
+    def test_sampled(self):
+        converter = avrojson.AvroJsonConverter(validation_policy=validation.ValidationPolicy('sampled', 10))
+        other_schema = make_avsc_object({'type': 'record', 'name': 'other_record', 'fields': []})
+        for i in range(25):
+            converter.with_tuple_union().to_json_object(dict(field1=i), self.test_schema)
+        converter.to_json_object(dict(), other_schema)
+        self.assertEqual(converter.validation_policy.stats(),
+                         dict(level='sampled', validated=4, failed=0, skipped=22))
+
+        converter.validation_policy.reset()
+        self.assertEqual(converter.validation_policy.validated, 0)
+
+    def test_off(self):
+        buf = _io.BytesIO()
+        writer = logical.LogicalDatumWriter(self.test_schema, validation_policy='off')
+        writer.write(dict(field1=1), io.BinaryEncoder(buf))
+        self.assertEqual(writer.validation_policy.stats(), dict(level='off', validated=0, failed=0, skipped=1))
+
+        writer = logical.LogicalDatumWriter(self.test_schema)
+        with self.assertRaises(io.AvroTypeException):
+            writer.write(dict(field1='1'), io.BinaryEncoder(buf))
+        self.assertEqual(writer.validation_policy.failed, 1)